@@ -0,0 +1,253 @@
+"""
+Бенчмарк обработчиков розыгрышей с подменой TeleBot.
+
+Моделирует N чатов × M объявлений × K нажатий: объявления проходят через
+handle_text_message (классификатор подменен, GigaChat не вызывается), затем
+handle_callback, update_raffle_message (тик обратного отсчета) и finish_raffle.
+Подмена TeleBot записывает каждый запрос к API и может добавлять задержку сети.
+
+Выводит задержки каждого обработчика (p50/p95/p99), количество запросов к API,
+пик потоков и пик памяти (отдельным прогоном под tracemalloc, чтобы он не искажал
+задержки). Результаты можно сохранить в JSON (--output) и сравнить с прогоном
+другой версии (--baseline).
+
+Запуск:
+    python benchmarks/bench_handlers.py [--chats 20] [--announcements 5] [--clicks 10] [--latency-ms 0]
+    python benchmarks/bench_handlers.py --output before.json
+    python benchmarks/bench_handlers.py --baseline before.json
+"""
+import argparse
+import json
+import logging
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Добавляем корень проекта в PYTHONPATH
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src import handlers
+from src.gigachat_client import RULE_PARKING, RULE_NOT_PARKING
+from src.outbound import OutboundQueue
+from src.scheduler import Scheduler
+
+HANDLERS = ("handle_text_message", "handle_callback", "update_raffle_message", "finish_raffle")
+
+
+class RecordingBot:
+    """Подмена TeleBot: считает запросы к API и ждет latency секунд на каждый"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = Counter()
+        self._lock = threading.Lock()
+
+    def _request(self, method: str):
+        with self._lock:
+            self.calls[method] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def reply_to(self, message, text, reply_markup=None):
+        self._request("reply_to")
+        return SimpleNamespace(message_id=message.message_id + 1)
+
+    def answer_callback_query(self, callback_id, text=None, show_alert=False):
+        self._request("answer_callback_query")
+
+    def edit_message_text(self, text, chat_id=None, message_id=None, reply_markup=None):
+        self._request("edit_message_text")
+
+    def get_chat_member(self, chat_id, user_id):
+        self._request("get_chat_member")
+        return SimpleNamespace(user=SimpleNamespace(id=user_id, username=f"user{user_id}", first_name=""))
+
+    def send_message(self, chat_id, text):
+        self._request("send_message")
+
+    def delete_message(self, chat_id, message_id):
+        self._request("delete_message")
+
+
+class StubClassifier:
+    """Подмена клиента GigaChat: объявления распознаются сразу, остальное — не объявления"""
+
+    def check_without_llm(self, message_text, places=None):
+        if message_text.startswith("Свободно место"):
+            return RULE_PARKING, int(message_text.rsplit(" ", 1)[1]), 0
+        return RULE_NOT_PARKING, None, 0
+
+
+def make_message(chat_id: int, message_id: int, text: str):
+    return SimpleNamespace(
+        chat=SimpleNamespace(id=chat_id, type="supergroup", title=f"Дом {chat_id}"),
+        message_id=message_id,
+        text=text,
+        from_user=SimpleNamespace(id=message_id, username=None, first_name="Сосед"),
+    )
+
+
+def make_click(raffle_id: str, user_id: int):
+    return SimpleNamespace(
+        id=f"{raffle_id}:{user_id}",
+        data=f"want_{raffle_id}",
+        from_user=SimpleNamespace(id=user_id, username=f"user{user_id}", first_name="Сосед"),
+    )
+
+
+def percentiles(latencies: list[float]) -> dict:
+    """Сводка задержек в микросекундах"""
+    values = sorted(latencies)
+
+    def at(fraction):
+        return round(values[min(len(values) - 1, int(fraction * len(values)))] * 1e6, 1)
+
+    return {'count': len(values), 'p50_us': at(0.5), 'p95_us': at(0.95), 'p99_us': at(0.99), 'max_us': at(1.0)}
+
+
+def run_scenario(chats: int, announcements: int, clicks: int, latency: float = 0.0) -> dict:
+    """
+    Прогоняет сценарий и возвращает задержки обработчиков, запросы к API и пик потоков.
+
+    На каждое объявление приходит одно сообщение болтовни, чтобы handle_text_message
+    измерялся и на отбрасываемых сообщениях.
+    """
+    bot = RecordingBot(latency)
+    scheduler = Scheduler("bench-scheduler")
+    outbound = OutboundQueue(handlers.OUTBOUND_WORKERS, 100000, 1e9, 1e9, 1e9, 1e9)
+    latencies = {name: [] for name in HANDLERS}
+    peak_threads = threading.active_count()
+
+    def timed(name, func, *args):
+        started = time.perf_counter()
+        func(*args)
+        latencies[name].append(time.perf_counter() - started)
+
+    handlers.raffle_store.clear()
+    handlers.user_cache.clear()
+    handlers.set_gigachat_client(StubClassifier())
+    try:
+        with patch.object(handlers, 'scheduler', scheduler), \
+             patch.object(handlers, 'outbound', outbound), \
+             patch.object(handlers, 'MAX_ACTIVE_RAFFLES', announcements + 1), \
+             patch.object(handlers, 'PARKING_PLACES', None), \
+             patch.object(handlers, 'PARKING_PLACES_BY_CHAT', {}):
+            raffle_ids = []
+            for number in range(announcements):
+                for chat in range(chats):
+                    chat_id = -1000 - chat
+                    message_id = number * 2
+                    timed("handle_text_message", handlers.handle_text_message, bot,
+                          make_message(chat_id, message_id + 1, "Всем привет!"))
+                    timed("handle_text_message", handlers.handle_text_message, bot,
+                          make_message(chat_id, message_id, f"Свободно место {number + 1}"))
+                    raffle_ids.append(f"{chat_id}_{message_id}_{number + 1}")
+            peak_threads = max(peak_threads, threading.active_count())
+
+            for user in range(clicks):
+                for raffle_id in raffle_ids:
+                    timed("handle_callback", handlers.handle_callback, bot, make_click(raffle_id, user))
+            peak_threads = max(peak_threads, threading.active_count())
+
+            for raffle_id in raffle_ids:
+                timed("update_raffle_message", handlers.update_raffle_message, bot, raffle_id)
+            for raffle_id in raffle_ids:
+                timed("finish_raffle", handlers.finish_raffle, bot, raffle_id)
+            outbound.wait_idle(timeout=60)
+            peak_threads = max(peak_threads, threading.active_count())
+    finally:
+        handlers.set_gigachat_client(None)
+        for raffle in handlers.raffle_store.all():
+            handlers.cancel_raffle_timers(raffle)
+        handlers.raffle_store.clear()
+
+    return {
+        'handlers': {name: percentiles(values) for name, values in latencies.items() if values},
+        'api_calls': dict(sorted(bot.calls.items())),
+        'peak_threads': peak_threads,
+    }
+
+
+def measure_memory(chats: int, announcements: int, clicks: int) -> int:
+    """Пик памяти сценария в байтах (отдельный прогон под tracemalloc)"""
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        run_scenario(chats, announcements, clicks)
+        return tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+
+
+def print_report(result: dict):
+    params = result['params']
+    print(f"Чатов: {params['chats']}, объявлений в чате: {params['announcements']}, "
+          f"нажатий на розыгрыш: {params['clicks']}, задержка запроса: {params['latency_ms']:.0f} мс")
+    print(f"{'Обработчик':<24}{'вызовов':>9}{'p50, мкс':>11}{'p95, мкс':>11}{'p99, мкс':>11}{'max, мкс':>11}")
+    for name, stats in result['handlers'].items():
+        print(f"{name:<24}{stats['count']:>9}{stats['p50_us']:>11.1f}{stats['p95_us']:>11.1f}"
+              f"{stats['p99_us']:>11.1f}{stats['max_us']:>11.1f}")
+    calls = ", ".join(f"{method} {count}" for method, count in result['api_calls'].items())
+    print(f"Запросы к API ({sum(result['api_calls'].values())}): {calls}")
+    print(f"Пик потоков: {result['peak_threads']}, пик памяти: {result['peak_memory_bytes'] / 1024:.0f} КБ")
+
+
+def print_diff(result: dict, baseline_path: str):
+    """Сравнивает с сохраненным прогоном; рост задержки больше чем на 10% помечается"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline['params'] != result['params']:
+        print(f"\nВнимание: параметры базового прогона другие: {baseline['params']}")
+    print(f"\nСравнение с {baseline_path}:")
+    for name, stats in result['handlers'].items():
+        old = baseline['handlers'].get(name)
+        if old is None:
+            continue
+        changes = []
+        for key in ('p50_us', 'p99_us'):
+            change = (stats[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+            mark = " ⚠" if change > 10 else ""
+            changes.append(f"{key[:3]} {old[key]:.1f} → {stats[key]:.1f} ({change:+.0f}%){mark}")
+        print(f"  {name:<24}" + ", ".join(changes))
+    old_calls, new_calls = sum(baseline['api_calls'].values()), sum(result['api_calls'].values())
+    print(f"  Запросы к API: {old_calls} → {new_calls}")
+    print(f"  Пик потоков: {baseline['peak_threads']} → {result['peak_threads']}")
+    print(f"  Пик памяти: {baseline['peak_memory_bytes'] / 1024:.0f} → {result['peak_memory_bytes'] / 1024:.0f} КБ")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк обработчиков розыгрышей")
+    parser.add_argument("--chats", type=int, default=20, help="Количество чатов")
+    parser.add_argument("--announcements", type=int, default=5, help="Объявлений в каждом чате")
+    parser.add_argument("--clicks", type=int, default=10, help="Нажатий на каждый розыгрыш")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Задержка одного запроса к Telegram")
+    parser.add_argument("--output", help="Сохранить результаты в JSON для последующего сравнения")
+    parser.add_argument("--baseline", help="JSON с результатами другой версии для сравнения")
+    args = parser.parse_args()
+
+    # Записи логов исказили бы задержки и замер памяти
+    logging.disable(logging.CRITICAL)
+    result = {'params': {
+        'chats': args.chats, 'announcements': args.announcements,
+        'clicks': args.clicks, 'latency_ms': args.latency_ms,
+    }}
+    result.update(run_scenario(args.chats, args.announcements, args.clicks, args.latency_ms / 1000))
+    result['peak_memory_bytes'] = measure_memory(args.chats, args.announcements, args.clicks)
+
+    print_report(result)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"\nРезультаты сохранены в {args.output}")
+    if args.baseline:
+        print_diff(result, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
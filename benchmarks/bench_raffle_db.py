@@ -0,0 +1,71 @@
+"""
+Бенчмарк сохранения розыгрышей в SQLite: задержка нажатия с базой и без нее.
+
+Нажатие только ставит запись в очередь, в базу ее пишет фоновый поток;
+бенчмарк показывает задержку join() (p50/p99) и время, за которое поток
+записывает накопленные нажатия.
+
+Запуск:
+    python benchmarks/bench_raffle_db.py [--joins 20000]
+"""
+import argparse
+import logging
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Добавляем корень проекта в PYTHONPATH
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.raffle_db import RaffleDB
+from src.raffle_store import Raffle, RaffleStore
+
+
+def measure_joins(store: RaffleStore, joins: int) -> list[float]:
+    """Задержки join() в секундах; нажатия распределены по 10 розыгрышам"""
+    for i in range(10):
+        store.add(Raffle(f"r{i}", i + 1, -100, i))
+    latencies = []
+    for user_id in range(joins):
+        started = time.perf_counter()
+        store.join(f"r{user_id % 10}", user_id)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def describe(latencies: list[float]) -> str:
+    quantiles = statistics.quantiles(latencies, n=100)
+    return f"p50 {quantiles[49] * 1e6:.1f} мкс, p99 {quantiles[98] * 1e6:.1f} мкс"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк сохранения розыгрышей в SQLite")
+    parser.add_argument("--joins", type=int, default=20000, help="Количество нажатий")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+
+    in_memory = measure_joins(RaffleStore(), args.joins)
+    with tempfile.TemporaryDirectory() as directory:
+        db = RaffleDB(str(Path(directory) / "raffles.db"))
+        with_db = measure_joins(RaffleStore(db), args.joins)
+        started = time.perf_counter()
+        db.flush(timeout=60)
+        flushed = time.perf_counter() - started
+        stats = dict(db.stats)
+        db.close()
+
+    added = statistics.median(with_db) - statistics.median(in_memory)
+    print(f"Нажатий: {args.joins}")
+    print(f"В памяти: {describe(in_memory)}")
+    print(f"С базой:  {describe(with_db)}")
+    print(f"Добавленная задержка (медиана): {added * 1e6:.1f} мкс")
+    print(f"Запись в базу: {stats['written']} операций в {stats['batches']} транзакциях, "
+          f"остаток дописан за {flushed * 1000:.0f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Микробенчмарк правил распознавания сообщений (первый уровень классификатора).
+
+Сравнивает прежнюю реализацию (несколько регулярных выражений и байтовых
+поисков на каждое сообщение) с однопроходным RULES_PATTERN и проверяет,
+что вердикты совпадают. Сообщения со временем и датами не сравниваются:
+прежняя реализация принимала их числа за номера мест.
+
+Запуск:
+    python benchmarks/bench_rules.py [--rounds 20]
+"""
+import argparse
+import logging
+import re
+import sys
+import time
+from pathlib import Path
+
+# Добавляем корень проекта в PYTHONPATH
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.gigachat_client import match_rules, TIME_PATTERN, RULE_PARKING, RULE_NOT_PARKING, RULE_UNSURE
+
+# Типичный поток сообщений в чате: в основном болтовня, изредка объявления
+SAMPLE_MESSAGES = [
+    "Всем привет!",
+    "Доброе утро, соседи",
+    "Кто-нибудь видел мой самокат?",
+    "Сегодня 15 градусов",
+    "Спасибо!",
+    "Лифт во втором подъезде опять не работает",
+    "Ок",
+    "Завтра отключат воду с 10 до 14",
+    "Место 5 свободно",
+    "Парковочное место 10 освободилось",
+    "место 12 сегодня не нужно",
+    "Место 13 сегодня не свободно",
+    "Место 7 занято сегодня",
+    "Место 23 свободно?",
+    "Что с местом 12?",
+    "Освободилось ли место 10?",
+    "Отдам место 31 до вечера",
+    "👍",
+    "Коллеги, кто заказывал доставку на 9 этаж",
+    "Машина с номером 777 мешает проезду",
+]
+
+
+def legacy_match_rules(message_text):
+    """Прежняя реализация правил (до перехода на RULES_PATTERN)"""
+    message_lower = message_text.lower().strip()
+    if '?' in message_text:
+        return RULE_NOT_PARKING, None
+    question_patterns = [
+        r'\b(какое|какой|какая|какие)\b',
+        r'\b(где|когда|кто|что|как|почему|зачем)\b',
+        r'\b(свободно\s+ли|свободно\s+или|свободно\?|свободно\s+нет)\b',
+        r'\b(освободилось\s+ли|освободилось\s+или)\b',
+    ]
+    for pattern in question_patterns:
+        if re.search(pattern, message_lower, re.IGNORECASE):
+            return RULE_NOT_PARKING, None
+    numbers_in_message = re.findall(r'\d+', message_text)
+    if not numbers_in_message:
+        return RULE_NOT_PARKING, None
+    message_bytes = message_text.encode('utf-8')
+    parking_bytes_list = [
+        b'\xd0\xbc\xd0\xb5\xd1\x81\xd1\x82\xd0\xbe',  # место
+        b'\xd0\x9c\xd0\xb5\xd1\x81\xd1\x82\xd0\xbe',  # Место
+        b'\xd0\x9c\xd0\x95\xd0\xa1\xd0\xa2\xd0\x9e',  # МЕСТО
+        b'\xd0\xbf\xd0\xb0\xd1\x80\xd0\xba\xd0\xbe\xd0\xb2',  # парков
+    ]
+    free_bytes_list = [
+        b'\xd1\x81\xd0\xb2\xd0\xbe\xd0\xb1\xd0\xbe\xd0\xb4',  # свобод
+        b'\xd0\xa1\xd0\xb2\xd0\xbe\xd0\xb1\xd0\xbe\xd0\xb4',  # Свобод
+        b'\xd0\xa1\xd0\x92\xd0\x9e\xd0\x91\xd0\x9e\xd0\x94',  # СВОБОД
+        b'\xd0\xbe\xd1\x81\xd0\xb2\xd0\xbe\xd0\xb1\xd0\xbe\xd0\xb4',  # освобод
+    ]
+    negative_bytes_list = [
+        b'\xd0\xbd\xd0\xb5 \xd1\x81\xd0\xb2\xd0\xbe\xd0\xb1\xd0\xbe\xd0\xb4',  # не свобод
+        b'\xd0\x9d\xd0\xb5 \xd1\x81\xd0\xb2\xd0\xbe\xd0\xb1\xd0\xbe\xd0\xb4',  # Не свобод
+        b'\xd0\xbd\xd0\xb5\xd1\x81\xd0\xb2\xd0\xbe\xd0\xb1\xd0\xbe\xd0\xb4',  # несвобод
+        b'\xd0\xbd\xd0\xb5 \xd0\xbe\xd1\x81\xd0\xb2\xd0\xbe\xd0\xb1\xd0\xbe\xd0\xb4',  # не освобод
+        b'\xd0\x9d\xd0\xb5 \xd0\xbe\xd1\x81\xd0\xb2\xd0\xbe\xd0\xb1\xd0\xbe\xd0\xb4',  # Не освобод
+        b'\xd0\xb7\xd0\xb0\xd0\xbd\xd1\x8f\xd1\x82',  # занят
+        b'\xd0\x97\xd0\xb0\xd0\xbd\xd1\x8f\xd1\x82',  # Занят
+        b'\xd0\xb7\xd0\xb0\xd0\xbd\xd1\x8f\xd1\x82\xd0\xbe',  # занято
+        b'\xd0\x97\xd0\xb0\xd0\xbd\xd1\x8f\xd1\x82\xd0\xbe',  # Занято
+    ]
+    if any(nb in message_bytes for nb in negative_bytes_list):
+        return RULE_NOT_PARKING, None
+    has_parking = any(pb in message_bytes for pb in parking_bytes_list)
+    has_free = any(fb in message_bytes for fb in free_bytes_list)
+    if has_parking and has_free:
+        return RULE_PARKING, int(numbers_in_message[0])
+    return RULE_UNSURE, int(numbers_in_message[0])
+
+
+def measure(func, messages, rounds):
+    """Возвращает пропускную способность функции в сообщениях в секунду"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in messages:
+            func(text)
+    elapsed = time.perf_counter() - start
+    return rounds * len(messages) / elapsed
+
+
+def comparable_messages(messages: list[str]) -> list[str]:
+    """Сообщения без времени и дат — на них вердикты обеих реализаций должны совпадать"""
+    time_pattern = re.compile(TIME_PATTERN)
+    return [text for text in messages if not time_pattern.search(text)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Микробенчмарк правил распознавания")
+    parser.add_argument("--rounds", type=int, default=2000, help="Количество проходов по выборке")
+    args = parser.parse_args()
+    
+    # Логи правил в бенчмарке не нужны
+    logging.disable(logging.CRITICAL)
+    
+    mismatches = [
+        text for text in comparable_messages(SAMPLE_MESSAGES)
+        if legacy_match_rules(text) != match_rules(text)
+    ]
+    if mismatches:
+        print("Вердикты расходятся для сообщений:")
+        for text in mismatches:
+            print(f"  {text!r}: было {legacy_match_rules(text)}, стало {match_rules(text)}")
+        sys.exit(1)
+    
+    before = measure(legacy_match_rules, SAMPLE_MESSAGES, args.rounds)
+    after = measure(match_rules, SAMPLE_MESSAGES, args.rounds)
+    print(f"Сообщений в выборке: {len(SAMPLE_MESSAGES)}, проходов: {args.rounds}")
+    print(f"До:    {before:,.0f} сообщений/с")
+    print(f"После: {after:,.0f} сообщений/с")
+    print(f"Ускорение: x{after / before:.2f}")
+
+
+if __name__ == "__main__":
+    main()
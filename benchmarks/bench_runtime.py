@@ -0,0 +1,175 @@
+"""
+Бенчмарк режимов запуска: синхронный (TeleBot, потоки) и асинхронный (AsyncTeleBot).
+
+Запускает много одновременных розыгрышей в сотне чатов и нажимает кнопки;
+каждый запрос к Telegram подменен задержкой сети. Сравниваются пик памяти
+(tracemalloc), число потоков и задержка от нажатия до ответа на него (p50/p99).
+
+Запуск:
+    python benchmarks/bench_runtime.py [--raffles 500] [--clicks 3] [--latency-ms 30]
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Добавляем корень проекта в PYTHONPATH
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src import handlers, async_handlers
+from src.config import OUTBOUND_WORKERS
+from src.outbound import OutboundQueue
+from src.scheduler import Scheduler
+
+# Сколько потоков обрабатывают обновления в TeleBot по умолчанию
+TELEBOT_THREADS = 2
+
+
+def make_updates(raffles: int, clicks: int):
+    """Сообщения о свободных местах и нажатия кнопок к ним"""
+    messages = [
+        SimpleNamespace(chat=SimpleNamespace(id=-1000 - i % 100), message_id=i, text="")
+        for i in range(raffles)
+    ]
+    calls = [
+        SimpleNamespace(
+            id=f"{i}_{user}", data=f"want_{-1000 - i % 100}_{i}_{i % 120 + 1}",
+            from_user=SimpleNamespace(id=i * clicks + user, username=None, first_name="Сосед"),
+        )
+        for user in range(clicks) for i in range(raffles)
+    ]
+    return messages, calls
+
+
+class SyncBot:
+    """Подмена TeleBot: каждый запрос занимает поток на время задержки сети"""
+
+    def __init__(self, latency: float, clicked: dict, answered: list):
+        self.latency = latency
+        self.clicked = clicked
+        self.answered = answered
+
+    def reply_to(self, message, text, reply_markup=None):
+        time.sleep(self.latency)
+        return SimpleNamespace(message_id=message.message_id + 1)
+
+    def answer_callback_query(self, callback_id, text, show_alert=False):
+        time.sleep(self.latency)
+        self.answered.append(time.perf_counter() - self.clicked[callback_id])
+
+    def edit_message_text(self, *args, **kwargs):
+        time.sleep(self.latency)
+
+    def delete_message(self, *args, **kwargs):
+        time.sleep(self.latency)
+
+
+class AsyncBot(SyncBot):
+    """Подмена AsyncTeleBot: ожидание ответа сети не занимает поток"""
+
+    async def reply_to(self, message, text, reply_markup=None):
+        await asyncio.sleep(self.latency)
+        return SimpleNamespace(message_id=message.message_id + 1)
+
+    async def answer_callback_query(self, callback_id, text, show_alert=False):
+        await asyncio.sleep(self.latency)
+        self.answered.append(time.perf_counter() - self.clicked[callback_id])
+
+    async def edit_message_text(self, *args, **kwargs):
+        await asyncio.sleep(self.latency)
+
+    async def delete_message(self, *args, **kwargs):
+        await asyncio.sleep(self.latency)
+
+
+def run_sync(messages, calls, latency: float) -> dict:
+    """Синхронный режим: обновления обрабатывает пул TeleBot, таймеры — планировщик, запросы — очередь"""
+    clicked, answered = {}, []
+    bot = SyncBot(latency, clicked, answered)
+    scheduler = Scheduler("bench-scheduler")
+    outbound = OutboundQueue(OUTBOUND_WORKERS, len(calls) * 2, 1e6, 1e6, 1e6, 1e6)
+    with patch.object(handlers, 'scheduler', scheduler), patch.object(handlers, 'outbound', outbound):
+        with ThreadPoolExecutor(TELEBOT_THREADS) as pool:
+            for message in messages:
+                pool.submit(handlers.start_raffle, bot, message, message.message_id % 120 + 1)
+        for call in calls:
+            clicked[call.id] = time.perf_counter()
+            handlers.handle_callback(bot, call)
+        while len(answered) < len(calls):
+            time.sleep(0.01)
+        result = {'threads': threading.active_count(), 'peak': tracemalloc.get_traced_memory()[1]}
+        with patch.object(handlers, 'today', return_value=date.today() + timedelta(days=1)):
+            handlers.cleanup_old_raffles(bot)
+    result['latencies'] = answered
+    return result
+
+
+def run_async(messages, calls, latency: float) -> dict:
+    """Асинхронный режим: каждое обновление — задача в одном цикле событий"""
+    clicked, answered = {}, []
+    bot = AsyncBot(latency, clicked, answered)
+
+    async def scenario():
+        await asyncio.gather(*(
+            async_handlers.start_raffle(bot, message, message.message_id % 120 + 1) for message in messages
+        ))
+        tasks = []
+        for call in calls:
+            clicked[call.id] = time.perf_counter()
+            tasks.append(async_handlers.spawn(async_handlers.handle_callback(bot, call)))
+        await asyncio.gather(*tasks)
+        result = {'threads': threading.active_count(), 'peak': tracemalloc.get_traced_memory()[1]}
+        with patch.object(handlers, 'today', return_value=date.today() + timedelta(days=1)):
+            handlers.cleanup_old_raffles(bot)
+        return result
+
+    result = asyncio.run(scenario())
+    result['latencies'] = answered
+    return result
+
+
+def describe(name: str, result: dict, baseline: int, threads_before: int) -> str:
+    quantiles = statistics.quantiles(result['latencies'], n=100)
+    return (f"{name}: пик памяти {(result['peak'] - baseline) / 1024 / 1024:.1f} МБ, "
+            f"новых потоков {result['threads'] - threads_before}, ответ на нажатие p50 {quantiles[49] * 1000:.0f} мс, "
+            f"p99 {quantiles[98] * 1000:.0f} мс")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сравнение синхронного и асинхронного режимов")
+    parser.add_argument("--raffles", type=int, default=500, help="Одновременных розыгрышей")
+    parser.add_argument("--clicks", type=int, default=3, help="Нажатий на каждый розыгрыш")
+    parser.add_argument("--latency-ms", type=float, default=30, help="Задержка одного запроса к Telegram")
+    args = parser.parse_args()
+
+    # Записи логов исказили бы замер памяти
+    logging.disable(logging.CRITICAL)
+    messages, calls = make_updates(args.raffles, args.clicks)
+    latency = args.latency_ms / 1000
+    print(f"Розыгрышей: {args.raffles}, нажатий: {len(calls)}, задержка запроса: {args.latency_ms:.0f} мс")
+
+    with patch.object(handlers, 'MAX_ACTIVE_RAFFLES', args.raffles + 1):
+        for name, run in (("Синхронный ", run_sync), ("Асинхронный", run_async)):
+            handlers.raffle_store.clear()
+            tracemalloc.start()
+            baseline = tracemalloc.get_traced_memory()[0]
+            threads_before = threading.active_count()
+            started = time.perf_counter()
+            result = run(messages, calls, latency)
+            elapsed = time.perf_counter() - started
+            tracemalloc.stop()
+            print(describe(name, result, baseline, threads_before) + f", всего {elapsed:.1f} с")
+
+
+if __name__ == "__main__":
+    main()
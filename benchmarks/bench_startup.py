@@ -0,0 +1,109 @@
+"""
+Бенчмарк запуска бота: время до первого запроса getUpdates и самые тяжелые импорты.
+
+Запускает src/bot.py в отдельном процессе с `python -X importtime`. Сеть не нужна:
+первый запрос getUpdates перехватывается, и процесс сразу завершается.
+
+Запуск:
+    python benchmarks/bench_startup.py [--runs 5] [--top 15]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+
+# Код дочернего процесса: подменяем getMe (его вызывает polling перед стартом)
+# и deleteWebhook (его бот вызывает перед polling), перехватываем первый long poll
+# и выходим
+CHILD_CODE = """
+import os, runpy, sys, time
+import telebot.apihelper
+
+def get_me(*args, **kwargs):
+    return {{'id': 1, 'is_bot': True, 'first_name': 'benchmark', 'username': 'benchmark_bot'}}
+
+def delete_webhook(*args, **kwargs):
+    return True
+
+def first_poll(*args, **kwargs):
+    import sys
+    print(f"FIRST_POLL {{time.time()}} GIGACHAT_LOADED {{'gigachat' in sys.modules}}", flush=True)
+    os._exit(0)
+
+telebot.apihelper.get_me = get_me
+telebot.apihelper.delete_webhook = delete_webhook
+telebot.apihelper.get_updates = first_poll
+sys.argv = [{bot_path!r}]
+runpy.run_path({bot_path!r}, run_name="__main__")
+"""
+
+
+def run_once(python: str) -> tuple[float, bool, str]:
+    """
+    Запускает бота один раз.
+
+    Returns:
+        (секунд до первого getUpdates, загружен ли gigachat к этому моменту, вывод -X importtime)
+    """
+    env = dict(os.environ)
+    # Токен нужен только для создания TeleBot, запросов к Telegram не будет
+    env.setdefault("TELEGRAM_BOT_TOKEN", "123456:benchmark")
+    code = CHILD_CODE.format(bot_path=str(project_root / "src" / "bot.py"))
+    started = time.time()
+    result = subprocess.run(
+        [python, "-X", "importtime", "-c", code],
+        cwd=project_root, env=env, capture_output=True, text=True, timeout=60,
+    )
+    for line in result.stdout.splitlines():
+        if line.startswith("FIRST_POLL"):
+            parts = line.split()
+            return float(parts[1]) - started, parts[3] == "True", result.stderr
+    raise RuntimeError(f"Бот не дошел до первого getUpdates:\n{result.stdout}\n{result.stderr}")
+
+
+def top_imports(importtime_output: str, top: int) -> list[tuple[int, str]]:
+    """Самые тяжелые импорты верхнего уровня по суммарному времени (в микросекундах)"""
+    imports = []
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        cumulative = cumulative.strip()
+        # Вложенные импорты в выводе -X importtime сдвинуты отступом
+        if not cumulative.isdigit() or name.startswith("   "):
+            continue
+        imports.append((int(cumulative), name.strip()))
+    return sorted(imports, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк запуска бота")
+    parser.add_argument("--runs", type=int, default=5, help="Количество запусков")
+    parser.add_argument("--top", type=int, default=15, help="Сколько самых тяжелых импортов показать")
+    args = parser.parse_args()
+
+    timings = []
+    gigachat_loaded = False
+    importtime_output = ""
+    for _ in range(args.runs):
+        elapsed, gigachat_loaded, importtime_output = run_once(sys.executable)
+        timings.append(elapsed)
+
+    print(f"Время до первого getUpdates (запусков: {args.runs}):")
+    print(f"  медиана: {statistics.median(timings) * 1000:.0f} мс")
+    print(f"  минимум: {min(timings) * 1000:.0f} мс")
+    print(f"  максимум: {max(timings) * 1000:.0f} мс")
+    print(f"Пакет gigachat загружен при запуске: {'да' if gigachat_loaded else 'нет'}")
+    print()
+    print("Самые тяжелые импорты верхнего уровня (последний запуск):")
+    for cumulative, name in top_imports(importtime_output, args.top):
+        print(f"  {cumulative / 1000:8.1f} мс  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Прогон истории чата через классификатор сообщений без Telegram и без настоящего GigaChat.
+
+Поддерживаемые форматы входа:
+- экспорт Telegram (result.json из Telegram Desktop, "Экспорт истории чата" в JSON);
+- JSONL, по одному сообщению в строке: {"text": "Отдам место 12 до вечера"}.
+
+GigaChat подменяется:
+- stub — всегда отвечает одним и тем же (--stub-answer, по умолчанию "нет");
+- recorded — отвечает по записи из JSONL {"text": "...", "answer": "да"} (неизвестные сообщения — "нет");
+- live — настоящий GigaChat (нужны ключи в .env); ответы можно сохранить через --record.
+
+Отчет: пропускная способность, задержки p50/p95/p99 по уровням классификатора,
+доля сообщений, которые дошли бы до GigaChat. Вердикты можно сохранить (--output)
+и сравнить с прогоном другой версии классификатора (--baseline).
+
+Примеры:
+    python scripts/replay_messages.py result.json --output verdicts_old.jsonl
+    python scripts/replay_messages.py result.json --baseline verdicts_old.jsonl
+    python scripts/replay_messages.py messages.jsonl --llm recorded --recording answers.jsonl
+"""
+import argparse
+import json
+import logging
+import math
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+# Добавляем корень проекта в PYTHONPATH
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.gigachat_client import (
+    GigaChatClient,
+    RULE_PARKING,
+    TIER_RULES,
+    TIER_CACHE,
+    TIER_LOCAL_MODEL,
+    TIER_LLM,
+)
+from src.local_classifier import load_model
+from src.verdict_cache import normalize_message
+
+TIERS = [TIER_RULES, TIER_CACHE, TIER_LOCAL_MODEL, TIER_LLM]
+# Так заканчивается запрос к GigaChat в GigaChatClient.ask_llm()
+PROMPT_MESSAGE_PREFIX = "Сообщение: "
+
+
+def read_messages(path: str):
+    """Генератор текстов сообщений из экспорта Telegram или JSONL-файла"""
+    with open(path, encoding='utf-8') as f:
+        first_char = f.read(1)
+        f.seek(0)
+        if first_char == '{' and not path.endswith('.jsonl'):
+            # Экспорт Telegram — один JSON-документ со списком messages
+            for message in json.load(f).get('messages', []):
+                if message.get('type') == 'message':
+                    text = export_text(message.get('text', ''))
+                    if text and not text.startswith('/'):
+                        yield text
+            return
+        for line in f:
+            if line.strip():
+                text = json.loads(line).get('text', '')
+                if text and not text.startswith('/'):
+                    yield text
+
+
+def export_text(text) -> str:
+    """Собирает текст сообщения из экспорта Telegram (строка или список фрагментов с разметкой)"""
+    if isinstance(text, str):
+        return text
+    return ''.join(part if isinstance(part, str) else part.get('text', '') for part in text)
+
+
+class FakeGigaChat:
+    """Подмена клиента GigaChat: отвечает заготовленным текстом без сети"""
+
+    def __init__(self, default_answer: str, recording: dict | None = None):
+        self.default_answer = default_answer
+        self.recording = recording or {}
+        self.calls = 0
+
+    def chat(self, prompt: str):
+        self.calls += 1
+        message_text = prompt.rsplit(PROMPT_MESSAGE_PREFIX, 1)[-1]
+        answer = self.recording.get(normalize_message(message_text), self.default_answer)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=answer))])
+
+
+class RecordingGigaChat:
+    """Обертка над настоящим GigaChat, сохраняющая ответы для повторных прогонов"""
+
+    def __init__(self, client, output_path: str):
+        self.client = client
+        self.output = open(output_path, 'w', encoding='utf-8')
+
+    def chat(self, prompt: str):
+        response = self.client.chat(prompt)
+        record = {
+            'text': prompt.rsplit(PROMPT_MESSAGE_PREFIX, 1)[-1],
+            'answer': str(response.choices[0].message.content),
+        }
+        self.output.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.output.flush()
+        return response
+
+
+def read_recording(path: str) -> dict:
+    """Читает записанные ответы GigaChat: {нормализованный текст: ответ}"""
+    recording = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                recording[normalize_message(record['text'])] = record['answer']
+    return recording
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """Перцентиль по методу ближайшего ранга (values должны быть отсортированы)"""
+    if not values:
+        return 0.0
+    rank = math.ceil(fraction * len(values))
+    return values[min(len(values), max(rank, 1)) - 1]
+
+
+def replay(client: GigaChatClient, messages) -> tuple[list[dict], dict[str, list[float]], float]:
+    """
+    Прогоняет сообщения через классификатор.
+
+    Returns:
+        (вердикты по сообщениям, задержки в секундах по уровням, общее время прогона)
+    """
+    verdicts = []
+    latencies = {tier: [] for tier in TIERS}
+    started = time.perf_counter()
+    for text in messages:
+        message_started = time.perf_counter()
+        verdict, place_number, _, tier = client.classify(text)
+        if tier == TIER_LLM:
+            is_parking, place_number = client.ask_llm(text, place_number)
+        else:
+            is_parking = verdict == RULE_PARKING
+        latencies[tier].append(time.perf_counter() - message_started)
+        verdicts.append({
+            'text': text,
+            'is_parking': is_parking,
+            'place_number': place_number if is_parking else None,
+            'tier': tier,
+        })
+    return verdicts, latencies, time.perf_counter() - started
+
+
+def print_report(verdicts: list[dict], latencies: dict[str, list[float]], elapsed: float):
+    """Выводит пропускную способность и задержки по уровням"""
+    total = len(verdicts)
+    print(f"Сообщений: {total}, время: {elapsed:.2f}с, пропускная способность: {total / max(elapsed, 1e-9):,.0f} сообщений/с")
+    print(f"Объявлений о свободном месте: {sum(1 for v in verdicts if v['is_parking'])}")
+    print(f"Дошло бы до GigaChat: {len(latencies[TIER_LLM])} ({len(latencies[TIER_LLM]) / max(total, 1):.1%})")
+    print()
+    print(f"{'Уровень':<12} {'сообщений':>10} {'доля':>7} {'p50, мкс':>10} {'p95, мкс':>10} {'p99, мкс':>10}")
+    for tier in TIERS:
+        values = sorted(latencies[tier])
+        if not values:
+            continue
+        print(
+            f"{tier:<12} {len(values):>10} {len(values) / max(total, 1):>7.1%} "
+            f"{percentile(values, 0.50) * 1e6:>10.1f} {percentile(values, 0.95) * 1e6:>10.1f} "
+            f"{percentile(values, 0.99) * 1e6:>10.1f}"
+        )
+
+
+def print_diff(verdicts: list[dict], baseline_path: str, limit: int):
+    """Сравнивает вердикты с сохраненным прогоном другой версии классификатора"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = [json.loads(line) for line in f if line.strip()]
+
+    if len(baseline) != len(verdicts):
+        print(f"\nВнимание: в базовом прогоне {len(baseline)} сообщений, в текущем {len(verdicts)}")
+
+    diffs = [
+        (old, new) for old, new in zip(baseline, verdicts)
+        if (old['is_parking'], old['place_number']) != (new['is_parking'], new['place_number'])
+    ]
+    print(f"\nРасхождений с базовым прогоном: {len(diffs)}")
+    for old, new in diffs[:limit]:
+        print(f"  {new['text']!r}")
+        print(f"    было:  {old['is_parking']}, место {old['place_number']} ({old.get('tier')})")
+        print(f"    стало: {new['is_parking']}, место {new['place_number']} ({new['tier']})")
+    if len(diffs) > limit:
+        print(f"  ... и еще {len(diffs) - limit}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Прогон истории чата через классификатор сообщений")
+    parser.add_argument('input', help="Экспорт Telegram (result.json) или JSONL с полем text")
+    parser.add_argument('--llm', choices=['stub', 'recorded', 'live'], default='stub', help="Чем подменить GigaChat")
+    parser.add_argument('--stub-answer', default='нет', help="Ответ заглушки GigaChat")
+    parser.add_argument('--recording', help="JSONL с записанными ответами GigaChat (для --llm recorded)")
+    parser.add_argument('--record', help="Куда сохранить ответы настоящего GigaChat (для --llm live)")
+    parser.add_argument('--local-model', help="Файл локальной модели (по умолчанию — из LOCAL_MODEL_PATH)")
+    parser.add_argument('--output', help="Сохранить вердикты в JSONL для последующего сравнения")
+    parser.add_argument('--baseline', help="JSONL с вердиктами другой версии классификатора для сравнения")
+    parser.add_argument('--diff-limit', type=int, default=20, help="Сколько расхождений показать")
+    args = parser.parse_args()
+
+    # Логи классификатора при прогоне не нужны
+    logging.disable(logging.CRITICAL)
+
+    client = GigaChatClient()
+    if args.local_model:
+        client.local_model = load_model(args.local_model)
+    if args.llm == 'stub':
+        client._client = FakeGigaChat(args.stub_answer)
+    elif args.llm == 'recorded':
+        if not args.recording:
+            parser.error("для --llm recorded нужен --recording")
+        client._client = FakeGigaChat('нет', read_recording(args.recording))
+    elif args.record:
+        client._client = RecordingGigaChat(client.client, args.record)
+
+    verdicts, latencies, elapsed = replay(client, read_messages(args.input))
+    print_report(verdicts, latencies, elapsed)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            for verdict in verdicts:
+                f.write(json.dumps(verdict, ensure_ascii=False) + '\n')
+    if args.baseline:
+        print_diff(verdicts, args.baseline, args.diff_limit)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Обучение и оценка локальной модели распознавания сообщений о свободных местах.
+
+Корпус — JSONL-файл, по одному размеченному сообщению в строке:
+    {"text": "Отдам место 12 до вечера", "is_parking": true}
+
+Обучение (часть корпуса откладывается для оценки):
+    python scripts/train_local_model.py train --corpus data/messages.jsonl --output data/local_model.json
+
+Оценка готовой модели:
+    python scripts/train_local_model.py evaluate --corpus data/messages.jsonl --model data/local_model.json
+"""
+import argparse
+import json
+import logging
+import random
+import sys
+from pathlib import Path
+
+# Добавляем корень проекта в PYTHONPATH
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.gigachat_client import scan_rules, RULE_UNSURE
+from src.local_classifier import train_model, predict_parking_probability, save_model, load_model
+
+
+def read_corpus(path: str) -> list[tuple[str, bool]]:
+    """Читает размеченные сообщения из JSONL-файла"""
+    samples = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                samples.append((record['text'], bool(record['is_parking'])))
+    return samples
+
+
+def evaluate(model: dict, samples: list[tuple[str, bool]], confidence: float) -> dict:
+    """
+    Прогоняет сообщения через правила и локальную модель.
+
+    Returns:
+        Словарь с количеством сообщений на каждом уровне, точностью и полнотой
+        ответов модели и долей запросов к GigaChat, которые модель взяла на себя
+    """
+    report = {
+        'total': len(samples), 'rules': 0, 'reached_model': 0, 'model_answered': 0,
+        'tp': 0, 'fp': 0, 'fn': 0, 'tn': 0,
+    }
+    for text, is_parking in samples:
+        verdict, _, _ = scan_rules(text)
+        if verdict != RULE_UNSURE:
+            report['rules'] += 1
+            continue
+
+        report['reached_model'] += 1
+        probability = predict_parking_probability(model, text)
+        if confidence > probability > 1 - confidence:
+            # Неуверенный ответ — ушел бы в GigaChat
+            continue
+
+        report['model_answered'] += 1
+        predicted = probability >= confidence
+        if predicted and is_parking:
+            report['tp'] += 1
+        elif predicted:
+            report['fp'] += 1
+        elif is_parking:
+            report['fn'] += 1
+        else:
+            report['tn'] += 1
+
+    report['precision'] = report['tp'] / max(1, report['tp'] + report['fp'])
+    report['recall'] = report['tp'] / max(1, report['tp'] + report['fn'])
+    report['llm_calls_avoided'] = report['model_answered'] / max(1, report['reached_model'])
+    return report
+
+
+def print_report(report: dict):
+    """Выводит отчет об оценке в читаемом виде"""
+    print(f"Сообщений: {report['total']}")
+    print(f"Решено правилами: {report['rules']}")
+    print(f"Дошло до локальной модели: {report['reached_model']}")
+    print(f"Модель ответила уверенно: {report['model_answered']}")
+    print(f"Точность (precision): {report['precision']:.3f}")
+    print(f"Полнота (recall): {report['recall']:.3f}")
+    print(f"Запросов к GigaChat избежали: {report['llm_calls_avoided']:.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Обучение и оценка локальной модели распознавания")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    train_parser = subparsers.add_parser('train', help="Обучить модель и оценить ее на отложенной выборке")
+    train_parser.add_argument('--corpus', required=True, help="JSONL-файл с размеченными сообщениями")
+    train_parser.add_argument('--output', required=True, help="Куда сохранить модель")
+    train_parser.add_argument('--test-fraction', type=float, default=0.2, help="Доля корпуса для оценки")
+    train_parser.add_argument('--seed', type=int, default=42, help="Зерно для перемешивания корпуса")
+    train_parser.add_argument('--confidence', type=float, default=0.9, help="Порог уверенности модели")
+
+    evaluate_parser = subparsers.add_parser('evaluate', help="Оценить готовую модель на корпусе")
+    evaluate_parser.add_argument('--corpus', required=True, help="JSONL-файл с размеченными сообщениями")
+    evaluate_parser.add_argument('--model', required=True, help="Файл модели")
+    evaluate_parser.add_argument('--confidence', type=float, default=0.9, help="Порог уверенности модели")
+
+    args = parser.parse_args()
+    # Логи правил при оценке не нужны
+    logging.disable(logging.CRITICAL)
+
+    samples = read_corpus(args.corpus)
+    if args.command == 'train':
+        random.Random(args.seed).shuffle(samples)
+        test_size = int(len(samples) * args.test_fraction)
+        test_samples, train_samples = samples[:test_size], samples[test_size:]
+        model = train_model(train_samples)
+        save_model(model, args.output)
+        print(f"Модель обучена на {len(train_samples)} сообщениях и сохранена в {args.output}")
+        if test_samples:
+            print()
+            print_report(evaluate(model, test_samples, args.confidence))
+    else:
+        print_report(evaluate(load_model(args.model), samples, args.confidence))
+
+
+if __name__ == "__main__":
+    main()
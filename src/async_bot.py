@@ -0,0 +1,179 @@
+"""
+Асинхронный режим бота на AsyncTeleBot.
+
+Один цикл событий вместо потоков telebot, планировщика и очереди запросов:
+таймеры розыгрышей — задачи asyncio, все запросы к Telegram идут через одну
+сессию aiohttp. Запуск:
+    python src/async_bot.py
+"""
+import sys
+import asyncio
+import atexit
+import logging
+from pathlib import Path
+
+# Добавляем корень проекта в PYTHONPATH
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from telebot.async_telebot import AsyncTeleBot
+from src.config import (
+    TELEGRAM_BOT_TOKEN,
+    LOG_LEVEL,
+    LOG_FORMAT,
+    LOG_QUEUE_SIZE,
+    LOG_SAMPLING,
+    RAFFLE_DB_PATH,
+    RAFFLE_DB_FLUSH_SECONDS,
+    METRICS_HOST,
+    METRICS_PORT,
+    PROFILE_DIR,
+    PROFILE_SECONDS,
+    PROFILE_MAX_SECONDS,
+)
+from src.metrics import UPDATES, MetricsServer
+from src.async_handlers import handle_text_message, handle_callback, restore_raffles, day_rollover, spawn
+from src.handlers import user_cache
+from src.logging_setup import setup_logging, parse_sampling
+from src.profiling import Profiler, parse_window
+from src.security import check_chat_access, check_owner_permission, is_owner, is_allowed_chat
+
+log_listener = setup_logging(
+    LOG_LEVEL,
+    json_format=LOG_FORMAT == "json",
+    sampling=parse_sampling(LOG_SAMPLING),
+    queue_size=LOG_QUEUE_SIZE,
+)
+atexit.register(log_listener.stop)
+logger = logging.getLogger(__name__)
+
+bot = AsyncTeleBot(TELEGRAM_BOT_TOKEN)
+
+# Профилирование по команде /profile: поток выборки существует только во время окна
+profiler = Profiler(PROFILE_DIR)
+
+
+@bot.message_handler(content_types=['new_chat_members'])
+async def new_member_handler(message):
+    """Обработчик добавления участников в группу"""
+    UPDATES.inc("new_chat_members")
+    # bot.user заполняется при запуске polling
+    bot_info = bot.user or await bot.get_me()
+    for member in message.new_chat_members:
+        user_cache.remember(member)
+        if member.id != bot_info.id:
+            continue
+        chat_id = message.chat.id
+        added_by = message.from_user.id if message.from_user else None
+        if is_allowed_chat(chat_id):
+            logger.info("Бот добавлен в разрешенный чат %s", chat_id)
+        elif added_by and is_owner(added_by):
+            logger.info("Владелец добавил бота в новый чат %s. Необходимо добавить чат в ALLOWED_CHAT_IDS", chat_id)
+            await bot.send_message(chat_id, "✅ Бот добавлен владельцем. Для работы необходимо добавить ID чата в конфигурацию.")
+        else:
+            logger.warning("Попытка добавления бота в неразрешенный чат %s пользователем %s", chat_id, added_by)
+            try:
+                await bot.send_message(chat_id, "🚫 Бот работает только в разрешенных чатах. Покидаю группу.")
+                await bot.leave_chat(chat_id)
+            except Exception as e:
+                logger.error("Ошибка при попытке покинуть чат: %s", e)
+        break
+
+
+@bot.message_handler(content_types=['text'])
+async def message_handler(message):
+    """Обработчик всех текстовых сообщений"""
+    UPDATES.inc("message")
+    allowed, reason = check_chat_access(message.chat.id, message.chat.type)
+    if not allowed:
+        logger.warning("Доступ запрещен: %s (чат: %s, тип: %s)", reason, message.chat.id, message.chat.type)
+        if message.chat.type == "private":
+            await bot.reply_to(message, "🚫 Бот не работает в личных сообщениях. Добавьте бота в группу.")
+        return
+
+    if message.text and message.text.startswith('/status'):
+        if not check_owner_permission(message.from_user.id if message.from_user else 0):
+            await bot.reply_to(message, "🚫 У вас нет прав для выполнения этой команды.")
+            return
+        from src.handlers import raffle_store, get_gigachat_client
+        raffles = raffle_store.snapshot()
+        if raffles:
+            status_text = "📊 Активные розыгрыши:\n\n"
+            for raffle in raffles:
+                status_text += f"🎰 Место №{raffle.place_number}: {raffle.participants_count} участников\n"
+        else:
+            status_text = "📭 Нет активных розыгрышей\n"
+        status_text += f"\n🤖 GigaChat: {get_gigachat_client().breaker.describe()}"
+        await bot.reply_to(message, status_text)
+        return
+
+    if message.text and message.text.startswith('/profile'):
+        if not check_owner_permission(message.from_user.id if message.from_user else 0):
+            await bot.reply_to(message, "🚫 У вас нет прав для выполнения этой команды.")
+            return
+        await profile_command(message)
+        return
+
+    if message.text and not message.text.startswith('/'):
+        await handle_text_message(bot, message)
+
+
+async def profile_command(message):
+    """/profile [секунды] — запустить профилирование, /profile stop — завершить досрочно"""
+    parts = message.text.split()
+    arg = parts[1] if len(parts) > 1 else None
+    if arg == "stop":
+        await bot.reply_to(
+            message, "⏹ Профилирование завершается, отчет скоро придет" if profiler.stop() else "Профилирование не запущено"
+        )
+        return
+    try:
+        seconds = parse_window(arg, PROFILE_SECONDS, PROFILE_MAX_SECONDS)
+    except ValueError:
+        await bot.reply_to(message, "Использование: /profile [секунды] или /profile stop")
+        return
+
+    # Отчет готовится в потоке профилировщика, ответ отправляется в цикле событий
+    loop = asyncio.get_running_loop()
+
+    def send_report(summary, path):
+        asyncio.run_coroutine_threadsafe(bot.reply_to(message, summary), loop)
+
+    if profiler.start(seconds, send_report):
+        await bot.reply_to(message, f"🔬 Профилирование запущено на {seconds:g} с")
+    else:
+        await bot.reply_to(message, "Профилирование уже идет (/profile stop — завершить)")
+
+
+@bot.callback_query_handler(func=lambda call: True)
+async def callback_handler(call):
+    """Обработчик callback'ов от inline-кнопок"""
+    UPDATES.inc("callback_query")
+    allowed, reason = check_chat_access(call.message.chat.id, call.message.chat.type)
+    if not allowed:
+        logger.warning("Доступ запрещен для callback: %s (чат: %s)", reason, call.message.chat.id)
+        await bot.answer_callback_query(call.id, "🚫 Доступ запрещен", show_alert=True)
+        return
+    await handle_callback(bot, call)
+
+
+async def main():
+    if RAFFLE_DB_PATH:
+        from src.raffle_db import RaffleDB
+        raffle_db = RaffleDB(RAFFLE_DB_PATH, RAFFLE_DB_FLUSH_SECONDS)
+        await restore_raffles(bot, raffle_db)
+        atexit.register(raffle_db.close)
+    if METRICS_PORT:
+        MetricsServer(METRICS_HOST, METRICS_PORT).start()
+    spawn(day_rollover(bot))
+    logger.info("Бот запущен в асинхронном режиме и готов к работе")
+    await bot.infinity_polling()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        logger.info("Бот остановлен")
+    except Exception as e:
+        logger.error(f"Ошибка при работе бота: {e}")
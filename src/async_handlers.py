@@ -0,0 +1,252 @@
+"""
+Обработчики для асинхронного режима (AsyncTeleBot).
+
+Логика розыгрышей общая с синхронным режимом (src/handlers.py): то же хранилище,
+тексты, лимиты и правила распознавания. Отличается только выполнение:
+таймер розыгрыша — задача asyncio вместо вызовов планировщика, запросы к Telegram
+идут через общую сессию aiohttp AsyncTeleBot, запрос к GigaChat выполняется
+в пуле потоков и не блокирует цикл событий.
+"""
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.gigachat_client import extract_places, RULE_PARKING, RULE_UNSURE
+from src.raffle_store import Raffle, JOIN_OK
+from src.metrics import RAFFLES_STARTED
+from src.handlers import (
+    raffle_store,
+    user_cache,
+    count_edit_request,
+    messages_logger,
+    get_gigachat_client,
+    raffle_timer_seconds,
+    max_active_raffles,
+    today,
+    seconds_until_midnight,
+    remove_oldest_raffle,
+    cleanup_old_raffles,
+    join_answer,
+    record_raffle_result,
+    format_raffle_message,
+    format_winner_message,
+    format_no_participants_message,
+    create_raffle_keyboard,
+    render_raffle_message,
+)
+from src.config import (
+    PARKING_PLACES,
+    PARKING_PLACES_BY_CHAT,
+    BUTTON_EDIT_INTERVAL_SECONDS,
+    LLM_WORKERS,
+    LLM_DEADLINE_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Интервал обновления обратного отсчета (как в синхронном режиме)
+COUNTDOWN_INTERVAL_SECONDS = 10
+
+# Не больше LLM_WORKERS одновременных запросов к GigaChat (как пул потоков LLMStage).
+# Отдельный пул, а не asyncio.to_thread: запрос, не уложившийся в срок, продолжает
+# занимать свой поток, и новые запросы ждут в очереди пула, а не создают новые потоки
+_llm_executor = None
+# Запуск розыгрышей одного чата по очереди: между проверкой лимита и добавлением
+# розыгрыша в хранилище есть ожидание ответа Telegram
+_chat_start_locks = {}
+# Ссылки на фоновые задачи, чтобы сборщик мусора не удалил их до завершения
+_background_tasks = set()
+
+
+def spawn(coroutine) -> asyncio.Task:
+    """Запускает фоновую задачу и хранит ссылку на нее до завершения"""
+    task = asyncio.get_running_loop().create_task(coroutine)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+async def ask_llm(message_text: str, place_number: int | None) -> bool:
+    """Проверяет спорное сообщение через GigaChat в пуле потоков; по истечении срока — вердикт по правилам"""
+    global _llm_executor
+    if _llm_executor is None:
+        _llm_executor = ThreadPoolExecutor(LLM_WORKERS, thread_name_prefix="llm-call")
+    loop = asyncio.get_running_loop()
+    try:
+        is_parking, _ = await asyncio.wait_for(
+            loop.run_in_executor(_llm_executor, get_gigachat_client().ask_llm, message_text, place_number),
+            LLM_DEADLINE_SECONDS,
+        )
+        return is_parking
+    except asyncio.TimeoutError:
+        logger.warning("GigaChat не ответил за %sс, сообщение обработано только по правилам", LLM_DEADLINE_SECONDS)
+    except Exception as e:
+        logger.error("Ошибка запроса к GigaChat: %s", e)
+    return False
+
+
+async def handle_text_message(bot, message):
+    """Обработчик текстовых сообщений"""
+    chat_type = message.chat.type
+    chat_title = message.chat.title if hasattr(message.chat, 'title') else 'личные сообщения'
+    messages_logger.info("Получено сообщение в %s '%s': %s", chat_type, chat_title, message.text)
+    user_cache.remember(message.from_user)
+
+    # Числа, которых нет среди мест парковки чата, отбрасываются сразу
+    places = PARKING_PLACES_BY_CHAT.get(message.chat.id, PARKING_PLACES)
+    verdict, place_number, _ = get_gigachat_client().check_without_llm(message.text, places)
+
+    if verdict == RULE_UNSURE:
+        # Ожидание GigaChat не задерживает другие обновления: каждое обрабатывается своей задачей
+        if not await ask_llm(message.text, place_number):
+            return
+    elif verdict != RULE_PARKING:
+        return
+    for place_number in extract_places(message.text, places):
+        await start_raffle(bot, message, place_number)
+
+
+async def start_raffle(bot, message, place_number):
+    """Запускает розыгрыш места по сообщению о свободном месте"""
+    if not place_number:
+        return
+
+    chat_id = message.chat.id
+    async with _chat_start_locks.setdefault(chat_id, asyncio.Lock()):
+        # Лимит активных розыгрышей чата: удаляем самый старый розыгрыш этого чата
+        if raffle_store.count(chat_id) >= max_active_raffles(chat_id):
+            remove_oldest_raffle(bot, chat_id)
+
+        raffle_id = f"{chat_id}_{message.message_id}_{place_number}"
+        message_text = format_raffle_message(place_number, raffle_timer_seconds(chat_id), 0)
+        keyboard = create_raffle_keyboard(raffle_id, 0)
+        bot_message = await bot.reply_to(message, message_text, reply_markup=keyboard)
+
+        raffle = Raffle(raffle_id, place_number, chat_id, bot_message.message_id, raffle_date=today())
+        raffle.rendered = (message_text, 0)
+        raffle_store.add(raffle)
+    RAFFLES_STARTED.inc()
+    # Одна задача на розыгрыш: обратный отсчет и завершение
+    raffle.timer = spawn(run_raffle(bot, raffle))
+
+    logger.info("Обнаружено сообщение о свободном месте №%s", place_number)
+
+
+async def run_raffle(bot, raffle: Raffle):
+    """Задача розыгрыша: обновляет обратный отсчет и по истечении времени завершает розыгрыш"""
+    while True:
+        remaining = raffle.start_time + raffle_timer_seconds(raffle.chat_id) - time.time()
+        if remaining <= 0:
+            break
+        await asyncio.sleep(min(COUNTDOWN_INTERVAL_SECONDS, remaining))
+        if remaining > COUNTDOWN_INTERVAL_SECONDS:
+            # Правка с обратным отсчетом включает и счетчик участников
+            count_edit_request()
+            if raffle.edit_call:
+                raffle.edit_call.cancel()
+                raffle.edit_call = None
+            await edit_raffle_message(bot, raffle)
+    await finish_raffle(bot, raffle.raffle_id)
+
+
+async def handle_callback(bot, call):
+    """Обработчик нажатий кнопки"""
+    if not call.data.startswith("want_"):
+        return
+    raffle_id = call.data.split("_", 1)[1]
+    user_id = call.from_user.id
+    username = call.from_user.username or call.from_user.first_name
+    user_cache.remember(call.from_user)
+
+    result = raffle_store.join(raffle_id, user_id)
+    answer_text, show_alert = join_answer(result)
+    if result == JOIN_OK:
+        raffle = raffle_store.get(raffle_id)
+        logger.info("Пользователь @%s нажал кнопку для места №%s", username, raffle.place_number)
+        # Только планирует правку: ответ на нажатие не ждет ее
+        update_raffle_button(bot, raffle)
+    await bot.answer_callback_query(call.id, answer_text, show_alert=show_alert)
+
+
+def update_raffle_button(bot, raffle: Raffle):
+    """Запрашивает обновление счетчика участников; нажатия объединяются, как в синхронном режиме"""
+    count_edit_request()
+    if raffle.edit_call:
+        return
+    delay = max(0.0, raffle.last_edit_time + BUTTON_EDIT_INTERVAL_SECONDS - time.monotonic())
+    raffle.edit_call = spawn(flush_raffle_button(bot, raffle, delay))
+
+
+async def flush_raffle_button(bot, raffle: Raffle, delay: float):
+    """Отправляет отложенную правку после серии нажатий"""
+    await asyncio.sleep(delay)
+    raffle.edit_call = None
+    if not raffle.finished:
+        await edit_raffle_message(bot, raffle)
+
+
+async def edit_raffle_message(bot, raffle: Raffle):
+    """Правит сообщение розыгрыша, если текст или кнопка изменились с последней правки"""
+    _, message_text, keyboard = render_raffle_message(raffle)
+    if message_text is None:
+        return
+    try:
+        await bot.edit_message_text(
+            message_text, chat_id=raffle.chat_id, message_id=raffle.message_id, reply_markup=keyboard
+        )
+    except Exception as e:
+        # Сообщение могло быть удалено — правка не важна
+        logger.debug("Правка сообщения розыгрыша не выполнена: %s", e)
+
+
+async def finish_raffle(bot, raffle_id: str):
+    """Завершает розыгрыш и выбирает победителя"""
+    raffle = raffle_store.finish(raffle_id)
+    if raffle is None:
+        return
+    record_raffle_result(raffle)
+
+    place_number = raffle.place_number
+    if raffle.winner_id is not None:
+        username = user_cache.get(raffle.winner_id)
+        if username is None:
+            try:
+                chat_member = await bot.get_chat_member(raffle.chat_id, raffle.winner_id)
+                user_cache.remember(chat_member.user)
+                username = chat_member.user.username or chat_member.user.first_name
+            except Exception:
+                username = "пользователь"
+        await bot.send_message(raffle.chat_id, format_winner_message(place_number, username))
+        logger.info("Победитель розыгрыша места №%s: @%s (ID: %s)", place_number, username, raffle.winner_id)
+    else:
+        await bot.send_message(raffle.chat_id, format_no_participants_message(place_number))
+        logger.info("Розыгрыш места №%s завершен, участников не было", place_number)
+
+    # Задачу розыгрыша не отменяем: завершение может выполняться из нее самой
+    if raffle.edit_call:
+        raffle.edit_call.cancel()
+    try:
+        await bot.delete_message(raffle.chat_id, raffle.message_id)
+    except Exception as e:
+        logger.debug("Сообщение розыгрыша не удалено: %s", e)
+
+
+async def restore_raffles(bot, db):
+    """Подключает базу и продолжает сегодняшние розыгрыши (истекшие завершаются сразу)"""
+    current_date = today()
+    raffles = db.load(current_date)
+    db.delete_not_from(current_date)
+    raffle_store.restore(raffles)
+    raffle_store.db = db
+    for raffle in raffles:
+        if not raffle.finished:
+            raffle.timer = spawn(run_raffle(bot, raffle))
+    logger.info(f"Восстановлено розыгрышей из базы: {len(raffles)}")
+
+
+async def day_rollover(bot):
+    """Смена дня: в полночь по часовому поясу бота удаляет вчерашние розыгрыши"""
+    while True:
+        await asyncio.sleep(seconds_until_midnight() + 1)
+        cleanup_old_raffles(bot)
@@ -1,5 +1,7 @@
 import sys
+import atexit
 import logging
+import secrets
 from pathlib import Path
 
 # Добавляем корень проекта в PYTHONPATH
@@ -7,28 +9,87 @@ project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
 import telebot
-from src.config import TELEGRAM_BOT_TOKEN
-from src.handlers import handle_text_message, handle_callback
+from src.config import (
+    TELEGRAM_BOT_TOKEN,
+    LOG_LEVEL,
+    LOG_FORMAT,
+    LOG_QUEUE_SIZE,
+    LOG_SAMPLING,
+    RAFFLE_DB_PATH,
+    RAFFLE_DB_FLUSH_SECONDS,
+    BOT_MODE,
+    WEBHOOK_URL,
+    WEBHOOK_HOST,
+    WEBHOOK_PORT,
+    WEBHOOK_SECRET,
+    WEBHOOK_QUEUE_SIZE,
+    METRICS_HOST,
+    METRICS_PORT,
+    PROFILE_DIR,
+    PROFILE_SECONDS,
+    PROFILE_MAX_SECONDS,
+)
+from src.metrics import registry, UPDATES, MetricsServer
+from src.handlers import (
+    handle_text_message, handle_callback, restore_raffles, schedule_day_rollover, outbound, user_cache, dispatcher,
+)
+from src.outbound import PRIORITY_POST, PRIORITY_CALLBACK
+from src.logging_setup import setup_logging, parse_sampling
+from src.profiling import Profiler, parse_window
 from src.security import check_chat_access, check_owner_permission, is_owner
 
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
+# Настройка логирования: обработчики только кладут записи в очередь,
+# в консоль их пишет отдельный поток (остаток очереди дописывается при выходе)
+log_listener = setup_logging(
+    LOG_LEVEL,
+    json_format=LOG_FORMAT == "json",
+    sampling=parse_sampling(LOG_SAMPLING),
+    queue_size=LOG_QUEUE_SIZE,
 )
+atexit.register(log_listener.stop)
 logger = logging.getLogger(__name__)
 
-bot = telebot.TeleBot(TELEGRAM_BOT_TOKEN)
+# Обработчики telebot выполняются в потоке получения обновлений и только раскладывают их
+# по дорожкам чатов (см. dispatch_* ниже): пул потоков telebot не сохранял бы порядок внутри чата
+bot = telebot.TeleBot(TELEGRAM_BOT_TOKEN, threaded=False)
+
+# Профилирование по команде /profile: поток выборки существует только во время окна
+profiler = Profiler(PROFILE_DIR)
+
+def profile_command(message):
+    """/profile [секунды] — запустить профилирование, /profile stop — завершить досрочно"""
+    parts = message.text.split()
+    arg = parts[1] if len(parts) > 1 else None
+    if arg == "stop":
+        text = "⏹ Профилирование завершается, отчет скоро придет" if profiler.stop() else "Профилирование не запущено"
+        outbound.submit(message.chat.id, PRIORITY_POST, bot.reply_to, message, text)
+        return
+    try:
+        seconds = parse_window(arg, PROFILE_SECONDS, PROFILE_MAX_SECONDS)
+    except ValueError:
+        outbound.submit(
+            message.chat.id, PRIORITY_POST, bot.reply_to, message,
+            "Использование: /profile [секунды] или /profile stop"
+        )
+        return
+
+    def send_report(summary, path):
+        outbound.submit(message.chat.id, PRIORITY_POST, bot.reply_to, message, summary)
+
+    if profiler.start(seconds, send_report):
+        text = f"🔬 Профилирование запущено на {seconds:g} с"
+    else:
+        text = "Профилирование уже идет (/profile stop — завершить)"
+    outbound.submit(message.chat.id, PRIORITY_POST, bot.reply_to, message, text)
 
-@bot.message_handler(content_types=['new_chat_members'])
 def new_member_handler(message):
     """Обработчик добавления участников в группу"""
-    # Проверяем, добавили ли бота
-    bot_info = bot.get_me()
+    # Проверяем, добавили ли бота (bot.user запрашивает get_me один раз и запоминает ответ)
+    bot_info = bot.user
     new_members = message.new_chat_members
     
     for member in new_members:
+        user_cache.remember(member)
         if member.id == bot_info.id:
             # Бота добавили в группу
             chat_id = message.chat.id
@@ -38,77 +99,153 @@ def new_member_handler(message):
             from src.security import is_allowed_chat
             if is_allowed_chat(chat_id):
                 # Чат разрешен - все в порядке
-                logger.info(f"Бот добавлен в разрешенный чат {chat_id}")
+                logger.info("Бот добавлен в разрешенный чат %s", chat_id)
             else:
                 # Чат не разрешен, проверяем, добавил ли владелец
                 if added_by and is_owner(added_by):
                     # Владелец добавил - разрешаем (но нужно добавить в ALLOWED_CHAT_IDS вручную)
-                    logger.info(f"Владелец добавил бота в новый чат {chat_id}. Необходимо добавить чат в ALLOWED_CHAT_IDS")
-                    bot.send_message(
+                    logger.info("Владелец добавил бота в новый чат %s. Необходимо добавить чат в ALLOWED_CHAT_IDS", chat_id)
+                    outbound.submit(
+                        chat_id, PRIORITY_POST, bot.send_message,
                         chat_id,
                         "✅ Бот добавлен владельцем. Для работы необходимо добавить ID чата в конфигурацию."
                     )
                 else:
                     # Не владелец добавил - покидаем группу
-                    logger.warning(f"Попытка добавления бота в неразрешенный чат {chat_id} пользователем {added_by}")
-                    bot.send_message(
-                        chat_id,
-                        "🚫 Бот работает только в разрешенных чатах. Покидаю группу."
-                    )
+                    logger.warning("Попытка добавления бота в неразрешенный чат %s пользователем %s", chat_id, added_by)
+                    # Ждем отправки сообщения, чтобы успеть до выхода из группы
                     try:
-                        bot.leave_chat(chat_id)
+                        outbound.call(
+                            chat_id, PRIORITY_POST, bot.send_message,
+                            chat_id,
+                            "🚫 Бот работает только в разрешенных чатах. Покидаю группу."
+                        )
                     except Exception as e:
-                        logger.error(f"Ошибка при попытке покинуть чат: {e}")
+                        logger.error("Ошибка при отправке сообщения перед выходом из чата: %s", e)
+                    try:
+                        outbound.call(chat_id, PRIORITY_POST, bot.leave_chat, chat_id)
+                    except Exception as e:
+                        logger.error("Ошибка при попытке покинуть чат: %s", e)
             break
 
-@bot.message_handler(content_types=['text'])
 def message_handler(message):
     """Обработчик всех текстовых сообщений"""
     # Проверка доступа к чату
     allowed, reason = check_chat_access(message.chat.id, message.chat.type)
     if not allowed:
-        logger.warning(f"Доступ запрещен: {reason} (чат: {message.chat.id}, тип: {message.chat.type})")
+        logger.warning("Доступ запрещен: %s (чат: %s, тип: %s)", reason, message.chat.id, message.chat.type)
         # В личных сообщениях можно ответить, в группах - просто игнорируем
         if message.chat.type == "private":
-            bot.reply_to(message, "🚫 Бот не работает в личных сообщениях. Добавьте бота в группу.")
+            outbound.submit(
+                message.chat.id, PRIORITY_POST, bot.reply_to,
+                message, "🚫 Бот не работает в личных сообщениях. Добавьте бота в группу."
+            )
         return
     
     # Команда для проверки статуса (только для владельца)
     if message.text and message.text.startswith('/status'):
         if not check_owner_permission(message.from_user.id if message.from_user else 0):
-            bot.reply_to(message, "🚫 У вас нет прав для выполнения этой команды.")
+            outbound.submit(message.chat.id, PRIORITY_POST, bot.reply_to, message, "🚫 У вас нет прав для выполнения этой команды.")
             return
             
-        from src.handlers import active_raffles
-        if active_raffles:
+        from src.handlers import raffle_store, get_gigachat_client
+        raffles = raffle_store.snapshot()
+        if raffles:
             status_text = "📊 Активные розыгрыши:\n\n"
-            for raffle_id, raffle in active_raffles.items():
-                status_text += f"🎰 Место №{raffle['place_number']}: {len(raffle['participants'])} участников\n"
-            bot.reply_to(message, status_text)
+            for raffle in raffles:
+                status_text += f"🎰 Место №{raffle.place_number}: {raffle.participants_count} участников\n"
         else:
-            bot.reply_to(message, "📭 Нет активных розыгрышей")
+            status_text = "📭 Нет активных розыгрышей\n"
+        status_text += f"\n🤖 GigaChat: {get_gigachat_client().breaker.describe()}"
+        status_text += (
+            f"\n📥 Очередь обновлений: {sum(dispatcher.depths())} "
+            f"(максимум {dispatcher.stats['max_depth']}, отброшено {dispatcher.stats['dropped']})"
+        )
+        outbound.submit(message.chat.id, PRIORITY_POST, bot.reply_to, message, status_text)
+        return
+    
+    # Профилирование (только для владельца)
+    if message.text and message.text.startswith('/profile'):
+        if not check_owner_permission(message.from_user.id if message.from_user else 0):
+            outbound.submit(message.chat.id, PRIORITY_POST, bot.reply_to, message, "🚫 У вас нет прав для выполнения этой команды.")
+            return
+        profile_command(message)
         return
     
     # Проверяем, что это текст (не команда бота)
     if message.text and not message.text.startswith('/'):
         handle_text_message(bot, message)
 
-@bot.callback_query_handler(func=lambda call: True)
 def callback_handler(call):
     """Обработчик callback'ов от inline-кнопок"""
     # Проверка доступа к чату
     allowed, reason = check_chat_access(call.message.chat.id, call.message.chat.type)
     if not allowed:
-        logger.warning(f"Доступ запрещен для callback: {reason} (чат: {call.message.chat.id})")
-        bot.answer_callback_query(call.id, "🚫 Доступ запрещен", show_alert=True)
+        logger.warning("Доступ запрещен для callback: %s (чат: %s)", reason, call.message.chat.id)
+        outbound.submit(None, PRIORITY_CALLBACK, bot.answer_callback_query, call.id, "🚫 Доступ запрещен", show_alert=True)
         return
     
     handle_callback(bot, call)
 
+@bot.message_handler(content_types=['new_chat_members'])
+def dispatch_new_members(message):
+    UPDATES.inc("new_chat_members")
+    dispatcher.submit(message.chat.id, new_member_handler, message)
+
+@bot.message_handler(content_types=['text'])
+def dispatch_message(message):
+    UPDATES.inc("message")
+    dispatcher.submit(message.chat.id, message_handler, message)
+
+@bot.callback_query_handler(func=lambda call: True)
+def dispatch_callback(call):
+    UPDATES.inc("callback_query")
+    dispatcher.submit(call.message.chat.id, callback_handler, call)
+
+def run_webhook():
+    """Получает обновления через webhook: Telegram сам присылает их на встроенный HTTP-сервер"""
+    from urllib.parse import urlparse
+    from src.webhook import WebhookServer
+    
+    if not WEBHOOK_URL:
+        logger.error("Для BOT_MODE=webhook нужен WEBHOOK_URL")
+        sys.exit(1)
+    # Без заданного токена используем случайный: его знает только Telegram после setWebhook
+    secret_token = WEBHOOK_SECRET or secrets.token_urlsafe(32)
+    server = WebhookServer(
+        bot, WEBHOOK_HOST, WEBHOOK_PORT, urlparse(WEBHOOK_URL).path or "/", secret_token,
+        queue_size=WEBHOOK_QUEUE_SIZE,
+    )
+    registry.gauge("webhook_events_total", "События приема обновлений через webhook", lambda: server.stats, "event", "counter")
+    # Бот обрабатывает только сообщения и нажатия кнопок — остальные обновления Telegram не присылает
+    bot.set_webhook(url=WEBHOOK_URL, secret_token=secret_token, allowed_updates=["message", "callback_query"])
+    server.serve_forever()
+
+
 if __name__ == "__main__":
+    if RAFFLE_DB_PATH:
+        # Розыгрыши сохраняются в SQLite и восстанавливаются после перезапуска
+        from src.raffle_db import RaffleDB
+        raffle_db = RaffleDB(RAFFLE_DB_PATH, RAFFLE_DB_FLUSH_SECONDS)
+        restore_raffles(bot, raffle_db)
+        atexit.register(raffle_db.close)
+        registry.gauge("raffle_db_events_total", "Записи в SQLite", lambda: raffle_db.stats, "event", "counter")
+    if METRICS_PORT:
+        MetricsServer(METRICS_HOST, METRICS_PORT).start()
+    # Вчерашние розыгрыши удаляются одной задачей в полночь, а не при каждом объявлении
+    schedule_day_rollover(bot)
     logger.info("Бот запущен и готов к работе")
     try:
-        bot.infinity_polling()
+        if BOT_MODE == "webhook":
+            run_webhook()
+        else:
+            # Webhook, оставшийся от запуска в режиме webhook, не дает получать обновления (409).
+            # Сбой удаления не останавливает бота: infinity_polling сам повторяет запросы
+            try:
+                bot.delete_webhook()
+            except Exception as e:
+                logger.warning("Не удалось удалить webhook перед запуском polling: %s", e)
+            bot.infinity_polling()
     except KeyboardInterrupt:
         logger.info("Бот остановлен")
     except Exception as e:
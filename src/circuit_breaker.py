@@ -0,0 +1,96 @@
+"""Автоматический выключатель (circuit breaker) для запросов к GigaChat"""
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Состояния выключателя
+STATE_CLOSED = "closed"        # GigaChat работает, запросы проходят
+STATE_OPEN = "open"            # GigaChat недоступен, работаем только по правилам
+STATE_HALF_OPEN = "half_open"  # пробный запрос после паузы
+
+
+class CircuitBreaker:
+    """
+    Прекращает запросы к GigaChat после серии ошибок или медленных ответов.
+
+    - В закрытом состоянии запросы проходят, подряд идущие ошибки считаются.
+    - После failure_threshold ошибок подряд выключатель открывается на open_seconds:
+      запросы не отправляются, сообщения обрабатываются только по правилам.
+    - После паузы пропускается один пробный запрос: успех закрывает выключатель,
+      ошибка снова открывает его.
+    Ответ медленнее slow_call_seconds считается ошибкой.
+    """
+
+    def __init__(self, failure_threshold: int, slow_call_seconds: float, open_seconds: float):
+        """
+        Args:
+            failure_threshold: Количество ошибок подряд для открытия
+            slow_call_seconds: Время ответа, после которого запрос считается неудачным
+            open_seconds: Сколько секунд не отправлять запросы после открытия
+        """
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.state = STATE_CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._trial_in_progress = False
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """
+        Проверяет, можно ли сейчас отправить запрос.
+        После разрешения нужно обязательно вызвать record_success() или record_failure().
+        """
+        with self._lock:
+            if self.state == STATE_CLOSED:
+                return True
+            if self.state == STATE_OPEN:
+                if time.monotonic() - self.opened_at < self.open_seconds:
+                    return False
+                self.state = STATE_HALF_OPEN
+                logger.info("Пробный запрос к GigaChat после паузы")
+            # Полуоткрытое состояние: одновременно идет только один пробный запрос
+            if self._trial_in_progress:
+                return False
+            self._trial_in_progress = True
+            return True
+
+    def record_success(self, duration: float):
+        """Отмечает успешный ответ (слишком медленный ответ считается ошибкой)"""
+        if duration > self.slow_call_seconds:
+            logger.warning("GigaChat ответил слишком медленно (%.1fс)", duration)
+            self.record_failure()
+            return
+        with self._lock:
+            if self.state != STATE_CLOSED:
+                logger.info("GigaChat снова доступен")
+            self.state = STATE_CLOSED
+            self.consecutive_failures = 0
+            self._trial_in_progress = False
+
+    def record_failure(self):
+        """Отмечает ошибку запроса"""
+        with self._lock:
+            self.consecutive_failures += 1
+            self._trial_in_progress = False
+            if self.state == STATE_HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != STATE_OPEN:
+                    logger.warning(
+                        f"GigaChat недоступен ({self.consecutive_failures} ошибок подряд), "
+                        f"работаю только по правилам {self.open_seconds}с"
+                    )
+                self.state = STATE_OPEN
+                self.opened_at = time.monotonic()
+
+    def describe(self) -> str:
+        """Состояние выключателя в человекочитаемом виде (для /status)"""
+        with self._lock:
+            if self.state == STATE_CLOSED:
+                return "работает"
+            if self.state == STATE_HALF_OPEN:
+                return "пробный запрос после сбоя"
+            remaining = max(0, int(self.open_seconds - (time.monotonic() - self.opened_at)))
+            return f"недоступен, только правила (проверка через {remaining}с)"
@@ -9,16 +9,127 @@ load_dotenv(env_path)
 # Telegram Bot
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 
+
+def parse_by_chat(spec: str, parse_value) -> dict:
+    """Разбирает настройки для отдельных чатов: -1001234567890:значение;-1009876543210:значение"""
+    return {
+        int(chat_id.strip()): parse_value(value.strip())
+        for chat_id, _, value in (item.rpartition(":") for item in spec.split(";") if item.strip())
+    }
+
+
 # Таймер розыгрыша (в секундах, по умолчанию 2 минуты = 120 секунд)
+# и таймер для отдельных чатов: "-1001234567890:60;-1009876543210:180"
 RAFFLE_TIMER_SECONDS = int(os.getenv("RAFFLE_TIMER_SECONDS", "120"))
+RAFFLE_TIMER_SECONDS_BY_CHAT = parse_by_chat(os.getenv("RAFFLE_TIMER_SECONDS_BY_CHAT", ""), int)
 
-# Лимит активных розыгрышей (по умолчанию 5)
+# Лимит активных розыгрышей в одном чате (по умолчанию 5) и лимит для отдельных чатов
 MAX_ACTIVE_RAFFLES = int(os.getenv("MAX_ACTIVE_RAFFLES", "5"))
+MAX_ACTIVE_RAFFLES_BY_CHAT = parse_by_chat(os.getenv("MAX_ACTIVE_RAFFLES_BY_CHAT", ""), int)
+
+# Часовой пояс, в котором розыгрыши делятся по дням, например "Europe/Moscow" (пусто — время сервера)
+BOT_TIMEZONE = os.getenv("BOT_TIMEZONE", "")
+
+# Файл SQLite для сохранения розыгрышей между перезапусками (пусто — розыгрыши только в памяти)
+# и интервал фоновой записи накопленных изменений в секундах
+RAFFLE_DB_PATH = os.getenv("RAFFLE_DB_PATH", "")
+RAFFLE_DB_FLUSH_SECONDS = float(os.getenv("RAFFLE_DB_FLUSH_SECONDS", "0.5"))
+
+# Минимальный интервал между правками сообщения розыгрыша после нажатий (в секундах)
+BUTTON_EDIT_INTERVAL_SECONDS = float(os.getenv("BUTTON_EDIT_INTERVAL_SECONDS", "2"))
+
+# Номера мест парковки: "1-50,60,70-75". Пусто — подходит любое число из сообщения.
+# Для отдельных чатов список задается в PARKING_PLACES_BY_CHAT: "-1001234567890:1-50;-1009876543210:1-80,100"
+def parse_places(spec: str) -> frozenset[int] | None:
+    """Разбирает список номеров мест с диапазонами; пустая строка — None (любые номера)"""
+    places = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        places.update(range(int(first), int(last or first) + 1))
+    return frozenset(places) or None
+
+
+PARKING_PLACES = parse_places(os.getenv("PARKING_PLACES", ""))
+PARKING_PLACES_BY_CHAT = parse_by_chat(os.getenv("PARKING_PLACES_BY_CHAT", ""), parse_places)
 
 # GigaChat API
 GIGACHAT_CLIENT_ID = os.getenv("GIGACHAT_CLIENT_ID")
 GIGACHAT_CLIENT_SECRET = os.getenv("GIGACHAT_CLIENT_SECRET")
 GIGACHAT_VERIFY_SSL = os.getenv("GIGACHAT_VERIFY_SSL", "false").lower() == "true"
+# Таймаут запроса к GigaChat в секундах: один на подключение и чтение ответа
+# (библиотека gigachat не принимает отдельный таймаут подключения)
+GIGACHAT_TIMEOUT_SECONDS = float(os.getenv("GIGACHAT_TIMEOUT_SECONDS", "15"))
+
+# Автоматический выключатель GigaChat: ошибок подряд до отключения,
+# время ответа, которое считается ошибкой, и пауза перед пробным запросом (в секундах)
+GIGACHAT_BREAKER_FAILURES = int(os.getenv("GIGACHAT_BREAKER_FAILURES", "3"))
+GIGACHAT_BREAKER_SLOW_SECONDS = float(os.getenv("GIGACHAT_BREAKER_SLOW_SECONDS", "10"))
+GIGACHAT_BREAKER_OPEN_SECONDS = float(os.getenv("GIGACHAT_BREAKER_OPEN_SECONDS", "60"))
+
+# Кэш вердиктов GigaChat (количество записей и время жизни в секундах, 0 — кэш выключен)
+VERDICT_CACHE_SIZE = int(os.getenv("VERDICT_CACHE_SIZE", "512"))
+VERDICT_CACHE_TTL_SECONDS = int(os.getenv("VERDICT_CACHE_TTL_SECONDS", "86400"))
+
+# Кэш имен пользователей из входящих обновлений (количество пользователей, 0 — кэш выключен)
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+
+# Локальная модель распознавания (путь к JSON-файлу, пусто — не используется)
+# и порог уверенности, при котором модель отвечает без GigaChat
+LOCAL_MODEL_PATH = os.getenv("LOCAL_MODEL_PATH", "")
+LOCAL_MODEL_CONFIDENCE = float(os.getenv("LOCAL_MODEL_CONFIDENCE", "0.9"))
+
+# Очередь запросов к GigaChat: рабочие потоки, размер очереди и срок ответа в секундах
+LLM_WORKERS = int(os.getenv("LLM_WORKERS", "2"))
+LLM_QUEUE_SIZE = int(os.getenv("LLM_QUEUE_SIZE", "20"))
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "15"))
+
+# Пакетная проверка спорных сообщений одним запросом (размер пакета 1 — выключено)
+LLM_BATCH_SIZE = int(os.getenv("LLM_BATCH_SIZE", "1"))
+LLM_BATCH_WINDOW_SECONDS = float(os.getenv("LLM_BATCH_WINDOW_SECONDS", "1.5"))
+
+# Очередь запросов к Telegram: рабочие потоки, размер очереди необязательных запросов,
+# ограничения частоты (запросов в секунду на весь бот и на один чат, запросов подряд в один чат)
+OUTBOUND_WORKERS = int(os.getenv("OUTBOUND_WORKERS", "4"))
+OUTBOUND_QUEUE_SIZE = int(os.getenv("OUTBOUND_QUEUE_SIZE", "200"))
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))
+TELEGRAM_CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", "1"))
+TELEGRAM_CHAT_BURST = float(os.getenv("TELEGRAM_CHAT_BURST", "3"))
+
+# Способ получения обновлений: "polling" (long polling, по умолчанию) или "webhook"
+BOT_MODE = os.getenv("BOT_MODE", "polling").lower()
+# Webhook: публичный HTTPS-адрес (его путь — путь webhook), адрес и порт встроенного сервера
+# (PORT задают платформы деплоя), секретный токен (пусто — случайный при каждом запуске),
+# и размер очереди обновлений
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", os.getenv("PORT", "8080")))
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "100"))
+
+# Обработка входящих обновлений: количество дорожек (обновления одного чата всегда
+# попадают в одну дорожку и обрабатываются по порядку) и размер очереди дорожки
+DISPATCH_LANES = int(os.getenv("DISPATCH_LANES", "4"))
+DISPATCH_QUEUE_SIZE = int(os.getenv("DISPATCH_QUEUE_SIZE", "100"))
+
+# Метрики в формате Prometheus: адрес и порт HTTP-экспортера (0 — экспортер выключен)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+# Профилирование по команде владельца (/profile): каталог полных отчетов,
+# длительность окна по умолчанию и наибольшая длительность в секундах
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_SECONDS = float(os.getenv("PROFILE_SECONDS", "30"))
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "300"))
+
+# Логирование: уровень, формат (text или json), размер очереди записей
+# и прореживание частых событий ("src.handlers.messages=10" — писать каждое 10-е входящее сообщение)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_SAMPLING = os.getenv("LOG_SAMPLING", "")
 
 # Безопасность
 OWNER_USER_ID = int(os.getenv("OWNER_USER_ID", "0"))  # ID владельца бота
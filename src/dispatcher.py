@@ -0,0 +1,104 @@
+"""Распределение входящих обновлений по чатам: порядок внутри чата, параллельность между чатами"""
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class ChatDispatcher:
+    """
+    Пул однопоточных дорожек для обработки обновлений.
+
+    - Обновление попадает в дорожку по chat_id (chat_id % lanes), поэтому
+      сообщения и нажатия кнопок одного чата обрабатываются строго по порядку.
+    - Разные чаты обрабатываются параллельно в разных дорожках: медленное
+      распознавание в одном чате не занимает поток, нужный другому.
+    - Очередь каждой дорожки ограничена; при переполнении обновление
+      отбрасывается, а не копится в памяти.
+    """
+
+    def __init__(self, lanes: int, queue_size: int, name: str = "dispatch"):
+        """
+        Args:
+            lanes: Количество дорожек (потоков)
+            queue_size: Сколько обновлений может ждать в одной дорожке
+            name: Префикс имен потоков
+        """
+        self.name = name
+        # Счетчики для мониторинга; max_depth — наибольшая длина очереди дорожки
+        self.stats = {'submitted': 0, 'processed': 0, 'dropped': 0, 'errors': 0, 'max_depth': 0}
+        self._stats_lock = threading.Lock()
+        self._queues = [queue.Queue(maxsize=queue_size) for _ in range(lanes)]
+        self._threads = []
+        self._start_lock = threading.Lock()
+
+    def lane(self, chat_id: int) -> int:
+        """Номер дорожки чата"""
+        return chat_id % len(self._queues)
+
+    def submit(self, chat_id: int, func, *args) -> bool:
+        """
+        Ставит func(*args) в дорожку чата.
+
+        Returns:
+            False, если очередь дорожки переполнена и вызов отброшен
+        """
+        if not self._threads:
+            self._start()
+        lane_queue = self._queues[self.lane(chat_id)]
+        try:
+            lane_queue.put_nowait((func, args))
+        except queue.Full:
+            self._count('dropped')
+            logger.warning("Очередь обработки чата %s переполнена, обновление отброшено", chat_id)
+            return False
+        depth = lane_queue.qsize()
+        with self._stats_lock:
+            self.stats['submitted'] += 1
+            if depth > self.stats['max_depth']:
+                self.stats['max_depth'] = depth
+        return True
+
+    def depths(self) -> list[int]:
+        """Текущие длины очередей дорожек"""
+        return [lane_queue.qsize() for lane_queue in self._queues]
+
+    def wait_idle(self, timeout: float = 5.0) -> bool:
+        """Ждет, пока все поставленные вызовы будут выполнены"""
+        done = threading.Event()
+
+        def wait():
+            for lane_queue in self._queues:
+                lane_queue.join()
+            done.set()
+
+        threading.Thread(target=wait, daemon=True).start()
+        return done.wait(timeout)
+
+    def _count(self, name: str):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def _start(self):
+        # Потоки создаются при первом обновлении, а не при импорте модуля
+        with self._start_lock:
+            if self._threads:
+                return
+            for i, lane_queue in enumerate(self._queues):
+                thread = threading.Thread(target=self._run, args=(lane_queue,), name=f"{self.name}-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _run(self, lane_queue: queue.Queue):
+        """Цикл потока дорожки"""
+        while True:
+            func, args = lane_queue.get()
+            try:
+                func(*args)
+                self._count('processed')
+            except Exception as e:
+                self._count('errors')
+                logger.error("Ошибка обработки обновления %s: %s", getattr(func, '__name__', func), e)
+            finally:
+                lane_queue.task_done()
@@ -1,134 +1,428 @@
 import re
+import time
 import logging
-from gigachat import GigaChat
-from src.config import GIGACHAT_CLIENT_SECRET, GIGACHAT_VERIFY_SSL
+import threading
+from src.config import (
+    GIGACHAT_CLIENT_SECRET,
+    GIGACHAT_VERIFY_SSL,
+    VERDICT_CACHE_SIZE,
+    VERDICT_CACHE_TTL_SECONDS,
+    LOCAL_MODEL_PATH,
+    LOCAL_MODEL_CONFIDENCE,
+    GIGACHAT_TIMEOUT_SECONDS,
+    GIGACHAT_BREAKER_FAILURES,
+    GIGACHAT_BREAKER_SLOW_SECONDS,
+    GIGACHAT_BREAKER_OPEN_SECONDS,
+)
+from src.circuit_breaker import CircuitBreaker
+from src.verdict_cache import VerdictCache
+from src.local_classifier import load_model, predict_parking_probability
+from src.metrics import CLASSIFIER_DECISIONS, GIGACHAT_SECONDS
 
 logger = logging.getLogger(__name__)
 
+# Вердикты правил (первый уровень распознавания)
+RULE_PARKING = "parking"          # точно объявление о свободном месте
+RULE_NOT_PARKING = "not_parking"  # точно не объявление
+RULE_UNSURE = "unsure"            # правила не уверены, нужен GigaChat
+
+# Уровни классификатора, принимающие решение
+TIER_RULES = "rules"              # ключевые слова
+TIER_CACHE = "cache"              # кэш ответов GigaChat
+TIER_LOCAL_MODEL = "local_model"  # локальная модель
+TIER_LLM = "llm"                  # запрос к GigaChat
+
+# Все правила собраны в одно регулярное выражение с именованными группами,
+# чтобы классифицировать сообщение за один проход по тексту.
+# Порядок альтернатив важен: вопросы и отрицания стоят раньше ключевых слов,
+# поэтому при совпадении в одной позиции побеждает решающее правило.
+# Вопросы ищутся без учета регистра, остальные ключевые слова — с учетом
+# (так же, как раньше работало байтовое сравнение).
+# Время и даты ("18:00", "12.05", "до 18", "с 9 утра") захватываются целиком группой time,
+# чтобы их числа не принимались за номера мест. После "с" и "к" число считается временем,
+# только если за ним идут минуты или единица времени: "к 12 месту", "места с 5 по 7" — номера мест.
+TIME_PATTERN = (
+    r'(?P<time>\d{1,2}:\d{2}'
+    r'|\d{1,2}\.\d{1,2}(?:\.\d{2,4})?'
+    r'|(?i:\b(?:до|после)\s+\d{1,2}(?:[:.]\d{2})?\b)'
+    r'|(?i:\b(?:с|со|к)\s+\d{1,2}(?:[:.]\d{2}|\s*(?:ч\b|час|утра|дня|вечера|ночи))))'
+)
+RULES_PATTERN = re.compile(
+    r'(?P<question>\?'
+    r'|(?i:\b(?:какое|какой|какая|какие)\b)'
+    r'|(?i:\b(?:где|когда|кто|что|как|почему|зачем)\b)'
+    r'|(?i:\b(?:свободно\s+ли|свободно\s+или|свободно\s+нет)\b)'
+    r'|(?i:\b(?:освободилось\s+ли|освободилось\s+или)\b))'
+    r'|(?P<negative>не свобод|Не свобод|несвобод|не освобод|Не освобод|занят|Занят)'
+    r'|(?P<parking>место|Место|МЕСТО|парков)'
+    r'|(?P<free>свобод|Свобод|СВОБОД|освобод)'
+    r'|' + TIME_PATTERN +
+    r'|(?P<number>\d+)'
+)
+# Только номера мест (без ключевых слов) — для объявлений о нескольких местах
+PLACES_PATTERN = re.compile(TIME_PATTERN + r'|(?P<number>\d+)')
+# Номера сразу после слова "место": "места 12 и 47", "Места 3, 5", "место №7".
+# Число, за которым идут минуты или день месяца ("18:00", "12.05"), номером не считается
+PLACE_NUMBER = r'(?:№\s*)?\d+(?!\d|[:.]\d)'
+PLACE_LIST_PATTERN = re.compile(
+    r'(?i:\bмест\w*)\s+(?P<list>' + PLACE_NUMBER +
+    r'(?:(?:\s*[,;/]\s*|\s+(?i:и)\s+)' + PLACE_NUMBER + r')*)'
+)
+
+
+def scan_rules(message_text: str, places: frozenset[int] | None = None) -> tuple[str, int | None, int]:
+    """
+    Классифицирует сообщение по ключевым словам за один проход.
+    
+    Args:
+        message_text: Текст сообщения для проверки
+        places: Номера мест парковки чата (None — подходит любой номер)
+        
+    Returns:
+        tuple[str, int | None, int]: (verdict, place_number, priority)
+        - verdict: RULE_PARKING, RULE_NOT_PARKING или RULE_UNSURE
+        - place_number: первый номер места в сообщении (для RULE_NOT_PARKING всегда None);
+          время, даты и числа не из places номером места не считаются
+        - priority: 1 если в сообщении есть слова о месте или свободе, иначе 0
+          (используется, чтобы при перегрузке GigaChat отбрасывать менее вероятные объявления)
+    """
+    place_num = None
+    has_parking = False
+    has_free = False
+    
+    for match in RULES_PATTERN.finditer(message_text):
+        kind = match.lastgroup
+        if kind == 'number':
+            if place_num is None:
+                number = int(match.group())
+                if places is None or number in places:
+                    place_num = number
+        elif kind == 'time':
+            continue
+        elif kind == 'parking':
+            has_parking = True
+        elif kind == 'free':
+            has_free = True
+        elif kind == 'question':
+            logger.info("Обнаружен вопрос, сообщение не является объявлением")
+            return RULE_NOT_PARKING, None, 0
+        else:
+            logger.info("Обнаружена отрицательная формулировка, сообщение не о свободном месте")
+            return RULE_NOT_PARKING, None, 0
+    
+    # Без номера места объявление не имеет смысла
+    if place_num is None:
+        return RULE_NOT_PARKING, None, 0
+    
+    if has_parking and has_free:
+        return RULE_PARKING, place_num, 1
+    
+    return RULE_UNSURE, place_num, int(has_parking or has_free)
+
+
+# Строка пакетного ответа GigaChat: "1. да", "2) нет", "3 - yes"
+BATCH_ANSWER_PATTERN = re.compile(r'^\s*(\d+)\s*[.):\-]?\s*(да|нет|yes|no)\b', re.IGNORECASE | re.MULTILINE)
+
+
+def parse_batch_answer(answer: str, count: int) -> list[bool] | None:
+    """
+    Разбирает пакетный ответ GigaChat вида "1. да\n2. нет".
+    
+    Args:
+        answer: Текст ответа
+        count: Количество сообщений в запросе
+        
+    Returns:
+        Список вердиктов по порядку или None, если ответ неполный или противоречивый
+    """
+    verdicts = {}
+    for match in BATCH_ANSWER_PATTERN.finditer(answer):
+        number = int(match.group(1))
+        is_parking = match.group(2).lower() in ('да', 'yes')
+        if number < 1 or number > count or verdicts.get(number, is_parking) != is_parking:
+            return None
+        verdicts[number] = is_parking
+    
+    if len(verdicts) != count:
+        return None
+    return [verdicts[number] for number in range(1, count + 1)]
+
+
+def extract_places(message_text: str, places: frozenset[int] | None = None) -> list[int]:
+    """
+    Находит все номера мест в сообщении ("места 12 и 47 свободны" -> [12, 47]).
+    
+    Без списка мест парковки любое число может оказаться этажом, телефоном или сроком
+    ("место 7 свободно 2 дня"), поэтому берутся только номера, перечисленные сразу после
+    слова "место", а если их нет — первое число сообщения.
+    
+    Args:
+        message_text: Текст объявления
+        places: Номера мест парковки чата (None — подходит любой номер)
+        
+    Returns:
+        Номера мест по порядку упоминания, без повторов, времени и дат
+    """
+    if places is None:
+        listed = PLACE_LIST_PATTERN.search(message_text)
+        if listed:
+            return list(dict.fromkeys(int(number) for number in re.findall(r'\d+', listed.group('list'))))
+        for match in PLACES_PATTERN.finditer(message_text):
+            if match.lastgroup == 'number':
+                return [int(match.group())]
+        return []
+    
+    found = []
+    for match in PLACES_PATTERN.finditer(message_text):
+        if match.lastgroup == 'number':
+            number = int(match.group())
+            if number in places and number not in found:
+                found.append(number)
+    return found
+
+
+def match_rules(message_text: str) -> tuple[str, int | None]:
+    """
+    Классифицирует сообщение по ключевым словам за один проход.
+    
+    Returns:
+        tuple[str, int | None]: (verdict, place_number), см. scan_rules()
+    """
+    verdict, place_num, _ = scan_rules(message_text)
+    return verdict, place_num
+
 
 class GigaChatClient:
     def __init__(self):
         """Инициализация клиента GigaChat API"""
-        # Используем authorization key (GIGACHAT_CLIENT_SECRET) как credentials
-        self.client = GigaChat(
-            credentials=GIGACHAT_CLIENT_SECRET,
-            verify_ssl_certs=GIGACHAT_VERIFY_SSL
+        # Клиент GigaChat и сам пакет gigachat загружаются при первом запросе к API (см. client)
+        self._client = None
+        self._client_lock = threading.Lock()
+        # При сбоях GigaChat перестаем отправлять запросы и работаем только по правилам
+        self.breaker = CircuitBreaker(
+            GIGACHAT_BREAKER_FAILURES,
+            GIGACHAT_BREAKER_SLOW_SECONDS,
+            GIGACHAT_BREAKER_OPEN_SECONDS
         )
-        # Создаем паттерны один раз для переиспользования
-        self.parking_pattern = re.compile(r'место|парков', re.IGNORECASE)
-        self.free_pattern = re.compile(r'свобод|освобод', re.IGNORECASE)
+        # Кэш ответов GigaChat для повторяющихся формулировок
+        self.verdict_cache = VerdictCache(VERDICT_CACHE_SIZE, VERDICT_CACHE_TTL_SECONDS)
+        # Локальная модель между правилами и GigaChat (необязательная)
+        self.local_model = None
+        self.local_model_confidence = LOCAL_MODEL_CONFIDENCE
+        if LOCAL_MODEL_PATH:
+            try:
+                self.local_model = load_model(LOCAL_MODEL_PATH)
+                logger.info(f"Загружена локальная модель распознавания из {LOCAL_MODEL_PATH}")
+            except Exception as e:
+                logger.error(f"Не удалось загрузить локальную модель из {LOCAL_MODEL_PATH}: {e}")
     
-    def check_parking_message(self, message_text: str) -> tuple[bool, int | None]:
+    @property
+    def client(self):
+        """
+        Клиент GigaChat API, создается при первом обращении.
+        
+        Используем authorization key (GIGACHAT_CLIENT_SECRET) как credentials.
+        Один объект на все время работы: библиотека переиспользует HTTP-соединение
+        и OAuth-токен между запросами. Таймаут действует на подключение и чтение ответа:
+        GigaChat принимает только одно число (Settings.timeout: float) и передает его
+        httpx для всех этапов запроса, отдельный таймаут подключения задать нельзя.
+        Зависшее подключение занимает поток пула не дольше GIGACHAT_TIMEOUT_SECONDS,
+        а вердикт по правилам сообщение получает к сроку LLM_DEADLINE_SECONDS.
+        """
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    # Импорт gigachat заметно замедляет запуск, поэтому откладываем его
+                    from gigachat import GigaChat
+                    self._client = GigaChat(
+                        credentials=GIGACHAT_CLIENT_SECRET,
+                        verify_ssl_certs=GIGACHAT_VERIFY_SSL,
+                        timeout=GIGACHAT_TIMEOUT_SECONDS
+                    )
+        return self._client
+    
+    def check_parking_message(self, message_text: str, places: frozenset[int] | None = None) -> tuple[bool, int | None]:
         """
         Проверяет, является ли сообщение объявлением о свободном месте.
         
         Args:
             message_text: Текст сообщения для проверки
+            places: Номера мест парковки чата (None — подходит любой номер)
             
         Returns:
             tuple[bool, int | None]: (is_parking_message, place_number)
             - is_parking_message: True если сообщение о свободном месте
             - place_number: номер места или None
         """
-        # Проверяем, является ли сообщение вопросом
-        message_lower = message_text.lower().strip()
-        
-        # Проверка на вопросительный знак
-        if '?' in message_text:
-            logger.info("Обнаружен вопросительный знак, сообщение является вопросом")
+        verdict, place_num, _ = self.check_without_llm(message_text, places)
+        if verdict == RULE_NOT_PARKING:
             return False, None
+        if verdict == RULE_PARKING:
+            return True, place_num
         
-        # Проверка на вопросительные слова и конструкции
-        question_patterns = [
-            r'\b(какое|какой|какая|какие)\b',
-            r'\b(где|когда|кто|что|как|почему|зачем)\b',
-            r'\b(свободно\s+ли|свободно\s+или|свободно\?|свободно\s+нет)\b',
-            r'\b(освободилось\s+ли|освободилось\s+или)\b',
-        ]
+        return self.ask_llm(message_text, place_num)
+    
+    def check_without_llm(self, message_text: str, places: frozenset[int] | None = None) -> tuple[str, int | None, int]:
+        """
+        Быстрая проверка сообщения без запроса к GigaChat: правила, кэш ответов
+        и локальная модель (если загружена).
         
-        for pattern in question_patterns:
-            if re.search(pattern, message_lower, re.IGNORECASE):
-                logger.info(f"Обнаружен вопрос по паттерну '{pattern}', сообщение является вопросом")
-                return False, None
+        Args:
+            message_text: Текст сообщения для проверки
+            places: Номера мест парковки чата (None — подходит любой номер)
+            
+        Returns:
+            tuple[str, int | None, int]: (verdict, place_number, priority), см. scan_rules()
+            RULE_UNSURE означает, что для решения нужен GigaChat.
+        """
+        verdict, place_num, priority, tier = self.classify(message_text, places)
+        if tier != TIER_LLM:
+            # Решения GigaChat учитываются в ask_llm()
+            CLASSIFIER_DECISIONS.inc(tier, verdict)
+        return verdict, place_num, priority
+    
+    def classify(self, message_text: str, places: frozenset[int] | None = None) -> tuple[str, int | None, int, str]:
+        """
+        То же, что check_without_llm(), но дополнительно сообщает, какой уровень принял решение.
         
-        # Извлекаем числа из сообщения
-        numbers_in_message = re.findall(r'\d+', message_text)
+        Returns:
+            tuple[str, int | None, int, str]: (verdict, place_number, priority, tier)
+            - tier: TIER_RULES, TIER_CACHE, TIER_LOCAL_MODEL или TIER_LLM (решение за GigaChat)
+        """
+        verdict, place_num, priority = scan_rules(message_text, places)
+        if verdict == RULE_NOT_PARKING:
+            return verdict, None, priority, TIER_RULES
+        if verdict == RULE_PARKING:
+            logger.info("Обнаружено сообщение о свободном месте №%s", place_num)
+            return verdict, place_num, priority, TIER_RULES
         
-        # Если нет чисел, сразу возвращаем False
-        if not numbers_in_message:
-            return False, None
+        # Повторяющиеся формулировки берем из кэша (номер места — из исходного текста)
+        cached = self.verdict_cache.get(message_text)
+        if cached is not None:
+            if cached:
+                logger.info("Обнаружено сообщение о свободном месте №%s (ответ из кэша)", place_num)
+                return RULE_PARKING, place_num, priority, TIER_CACHE
+            return RULE_NOT_PARKING, None, priority, TIER_CACHE
         
-        # Проверяем через байтовое сравнение (избегаем проблем с кодировкой)
-        try:
-            message_bytes = message_text.encode('utf-8')
-        except (UnicodeEncodeError, AttributeError):
-            # Если не удалось закодировать, пробуем как есть
-            message_bytes = str(message_text).encode('utf-8', errors='replace')
-        
-        # Байтовые представления ключевых слов в UTF-8
-        parking_bytes_list = [
-            b'\xd0\xbc\xd0\xb5\xd1\x81\xd1\x82\xd0\xbe',  # место
-            b'\xd0\x9c\xd0\xb5\xd1\x81\xd1\x82\xd0\xbe',  # Место
-            b'\xd0\x9c\xd0\x95\xd0\xa1\xd0\xa2\xd0\x9e',  # МЕСТО
-            b'\xd0\xbf\xd0\xb0\xd1\x80\xd0\xba\xd0\xbe\xd0\xb2',  # парков
-        ]
-        free_bytes_list = [
-            b'\xd1\x81\xd0\xb2\xd0\xbe\xd0\xb1\xd0\xbe\xd0\xb4',  # свобод
-            b'\xd0\xa1\xd0\xb2\xd0\xbe\xd0\xb1\xd0\xbe\xd0\xb4',  # Свобод
-            b'\xd0\xa1\xd0\x92\xd0\x9e\xd0\x91\xd0\x9e\xd0\x94',  # СВОБОД
-            b'\xd0\xbe\xd1\x81\xd0\xb2\xd0\xbe\xd0\xb1\xd0\xbe\xd0\xb4',  # освобод
-        ]
-        # Отрицательные формулировки (не свободно, занято и т.д.)
-        negative_bytes_list = [
-            b'\xd0\xbd\xd0\xb5 \xd1\x81\xd0\xb2\xd0\xbe\xd0\xb1\xd0\xbe\xd0\xb4',  # не свобод
-            b'\xd0\x9d\xd0\xb5 \xd1\x81\xd0\xb2\xd0\xbe\xd0\xb1\xd0\xbe\xd0\xb4',  # Не свобод
-            b'\xd0\xbd\xd0\xb5\xd1\x81\xd0\xb2\xd0\xbe\xd0\xb1\xd0\xbe\xd0\xb4',  # несвобод
-            b'\xd0\xbd\xd0\xb5 \xd0\xbe\xd1\x81\xd0\xb2\xd0\xbe\xd0\xb1\xd0\xbe\xd0\xb4',  # не освобод
-            b'\xd0\x9d\xd0\xb5 \xd0\xbe\xd1\x81\xd0\xb2\xd0\xbe\xd0\xb1\xd0\xbe\xd0\xb4',  # Не освобод
-            b'\xd0\xb7\xd0\xb0\xd0\xbd\xd1\x8f\xd1\x82',  # занят
-            b'\xd0\x97\xd0\xb0\xd0\xbd\xd1\x8f\xd1\x82',  # Занят
-            b'\xd0\xb7\xd0\xb0\xd0\xbd\xd1\x8f\xd1\x82\xd0\xbe',  # занято
-            b'\xd0\x97\xd0\xb0\xd0\xbd\xd1\x8f\xd1\x82\xd0\xbe',  # Занято
-        ]
-        
-        # Сначала проверяем отрицательные формулировки (приоритет)
-        has_negative = any(nb in message_bytes for nb in negative_bytes_list)
-        if has_negative:
-            logger.info("Обнаружена отрицательная формулировка, сообщение не о свободном месте")
-            return False, None
+        # Локальная модель отвечает сама, если уверена; иначе решает GigaChat
+        if self.local_model is not None:
+            probability = predict_parking_probability(self.local_model, message_text)
+            if probability >= self.local_model_confidence:
+                logger.info("Обнаружено сообщение о свободном месте №%s (локальная модель, %.2f)", place_num, probability)
+                return RULE_PARKING, place_num, priority, TIER_LOCAL_MODEL
+            if probability <= 1 - self.local_model_confidence:
+                return RULE_NOT_PARKING, None, priority, TIER_LOCAL_MODEL
         
-        has_parking = any(pb in message_bytes for pb in parking_bytes_list)
-        has_free = any(fb in message_bytes for fb in free_bytes_list)
+        return RULE_UNSURE, place_num, priority, TIER_LLM
+    
+    def ask_llm(self, message_text: str, place_num: int | None) -> tuple[bool, int | None]:
+        """
+        Спрашивает GigaChat, является ли сообщение объявлением о свободном месте.
+        Блокирующий вызов — в обработчиках выполняется через LLMStage.
         
-        # Если есть ключевые слова о парковке и свободе, возвращаем результат
-        if has_parking and has_free:
-            place_num = int(numbers_in_message[0])
-            logger.info(f"Обнаружено сообщение о свободном месте №{place_num}")
-            return True, place_num
+        Args:
+            message_text: Текст сообщения для проверки
+            place_num: Номер места, найденный правилами
+            
+        Returns:
+            tuple[bool, int | None]: (is_parking_message, place_number)
+        """
+        if not self.breaker.allow_request():
+            CLASSIFIER_DECISIONS.inc(TIER_LLM, "unavailable")
+            logger.info("GigaChat временно недоступен, сообщение обработано только по правилам")
+            return False, None
         
-        # Для более сложных случаев используем GigaChat
         prompt = f"""Это сообщение о свободном парковочном месте? Ответь только "да" или "нет".
 
 Сообщение: {message_text}"""
         
         try:
-            response = self.client.chat(prompt)
-            result_raw = response.choices[0].message.content
-            
-            # Проверяем кодировку и правильно декодируем
-            if isinstance(result_raw, bytes):
-                result = result_raw.decode('utf-8').strip().lower()
-            else:
-                result = str(result_raw).strip().lower()
+            result = self._chat(prompt).lower()
             
             # Если GigaChat подтвердил, что это сообщение о свободном месте
-            if "да" in result or "yes" in result:
-                place_num = int(numbers_in_message[0])
-                logger.info(f"Обнаружено сообщение о свободном месте №{place_num}")
+            is_parking = "да" in result or "yes" in result
+            self.verdict_cache.put(message_text, is_parking)
+            CLASSIFIER_DECISIONS.inc(TIER_LLM, "yes" if is_parking else "no")
+            if is_parking:
+                logger.info("Обнаружено сообщение о свободном месте №%s", place_num)
                 return True, place_num
             
             return False, None
         except Exception as e:
-            logger.error(f"Ошибка GigaChat API: {e}")
+            CLASSIFIER_DECISIONS.inc(TIER_LLM, "error")
+            logger.error("Ошибка GigaChat API: %s", e)
             return False, None
+    
+    def ask_llm_batch(self, items: list[tuple[str, int | None]]) -> list[tuple[bool, int | None]]:
+        """
+        Проверяет несколько сообщений одним запросом к GigaChat.
+        Если ответ не удалось разобрать, сообщения проверяются по одному.
+        
+        Args:
+            items: Список пар (текст сообщения, номер места по правилам)
+            
+        Returns:
+            Список вердиктов (is_parking_message, place_number) в том же порядке
+            
+        Raises:
+            Exception: Ошибка запроса к GigaChat (вердикт по правилам и учет ошибки — в LLMStage)
+        """
+        if len(items) == 1:
+            return [self.ask_llm(*items[0])]
+        
+        if not self.breaker.allow_request():
+            CLASSIFIER_DECISIONS.inc(TIER_LLM, "unavailable", amount=len(items))
+            logger.info("GigaChat временно недоступен, %s сообщений обработано только по правилам", len(items))
+            return [(False, None)] * len(items)
+        
+        # Переводы строк внутри сообщений сломали бы нумерацию
+        numbered = "\n".join(
+            f"{i}. {' '.join(text.split())}" for i, (text, _) in enumerate(items, start=1)
+        )
+        prompt = f"""Для каждого сообщения ниже определи, является ли оно сообщением о свободном парковочном месте.
+Ответь строго по одной строке на сообщение в формате "<номер>. да" или "<номер>. нет".
 
+{numbered}"""
+        
+        try:
+            answers = parse_batch_answer(self._chat(prompt), len(items))
+        except Exception:
+            CLASSIFIER_DECISIONS.inc(TIER_LLM, "error", amount=len(items))
+            raise
+        
+        if answers is None:
+            logger.warning("Не удалось разобрать пакетный ответ GigaChat, проверяю %s сообщений по одному", len(items))
+            return [self.ask_llm(text, place_num) for text, place_num in items]
+        
+        results = []
+        for (text, place_num), is_parking in zip(items, answers):
+            self.verdict_cache.put(text, is_parking)
+            CLASSIFIER_DECISIONS.inc(TIER_LLM, "yes" if is_parking else "no")
+            if is_parking:
+                logger.info("Обнаружено сообщение о свободном месте №%s", place_num)
+                results.append((True, place_num))
+            else:
+                results.append((False, None))
+        return results
+    
+    def _chat(self, prompt: str) -> str:
+        """
+        Отправляет запрос в GigaChat и возвращает текст ответа.
+        Вызывается только после разрешения breaker.allow_request().
+        """
+        started = time.monotonic()
+        try:
+            response = self.client.chat(prompt)
+            result_raw = response.choices[0].message.content
+        except Exception:
+            GIGACHAT_SECONDS.observe(time.monotonic() - started)
+            self.breaker.record_failure()
+            raise
+        elapsed = time.monotonic() - started
+        GIGACHAT_SECONDS.observe(elapsed)
+        self.breaker.record_success(elapsed)
+        
+        # Проверяем кодировку и правильно декодируем
+        if isinstance(result_raw, bytes):
+            return result_raw.decode('utf-8').strip()
+        return str(result_raw).strip()
@@ -1,227 +1,440 @@
 import threading
-import random
 import time
 import logging
-from datetime import date
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
 from telebot import types
-from src.gigachat_client import GigaChatClient
-from src.config import RAFFLE_TIMER_SECONDS, MAX_ACTIVE_RAFFLES
+from src.gigachat_client import GigaChatClient, extract_places, RULE_PARKING, RULE_UNSURE
+from src.dispatcher import ChatDispatcher
+from src.llm_stage import LLMStage
+from src.logging_setup import MESSAGES_LOGGER
+from src.scheduler import Scheduler
+from src.user_cache import UserCache
+from src.metrics import (
+    registry,
+    RAFFLES_STARTED,
+    RAFFLES_FINISHED,
+    RAFFLES_REMOVED,
+    RAFFLE_DURATION_SECONDS,
+    RAFFLE_PARTICIPANTS,
+)
+from src.raffle_store import (
+    Raffle,
+    RaffleStore,
+    JOIN_OK,
+    JOIN_ALREADY,
+    JOIN_WINNER,
+)
+from src.outbound import (
+    OutboundQueue,
+    PRIORITY_WINNER,
+    PRIORITY_POST,
+    PRIORITY_CALLBACK,
+    PRIORITY_EDIT,
+    PRIORITY_DELETE,
+)
+from src.config import (
+    RAFFLE_TIMER_SECONDS,
+    RAFFLE_TIMER_SECONDS_BY_CHAT,
+    BOT_TIMEZONE,
+    MAX_ACTIVE_RAFFLES,
+    MAX_ACTIVE_RAFFLES_BY_CHAT,
+    BUTTON_EDIT_INTERVAL_SECONDS,
+    PARKING_PLACES,
+    PARKING_PLACES_BY_CHAT,
+    LLM_WORKERS,
+    LLM_QUEUE_SIZE,
+    LLM_DEADLINE_SECONDS,
+    LLM_BATCH_SIZE,
+    LLM_BATCH_WINDOW_SECONDS,
+    OUTBOUND_WORKERS,
+    OUTBOUND_QUEUE_SIZE,
+    TELEGRAM_GLOBAL_RATE,
+    TELEGRAM_CHAT_RATE,
+    TELEGRAM_CHAT_BURST,
+    USER_CACHE_SIZE,
+    DISPATCH_LANES,
+    DISPATCH_QUEUE_SIZE,
+)
 
 logger = logging.getLogger(__name__)
+# Отдельный логгер для каждого входящего сообщения: его можно прореживать через LOG_SAMPLING
+messages_logger = logging.getLogger(MESSAGES_LOGGER)
 
-gigachat_client = GigaChatClient()
+# Клиент GigaChat создается при первом сообщении, а не при импорте модуля
+# (ускоряет запуск бота и тестов). В тестах можно подменить через set_gigachat_client()
+_gigachat_client = None
+_gigachat_client_lock = threading.Lock()
 
-# Словарь активных розыгрышей: {raffle_id: {place_number, participants, message_id, chat_id, timer, update_timer, start_time, date, winner_id}}
-active_raffles = {}
-# Множество победителей активных розыгрышей (для быстрой проверки)
-active_winners = set()
+
+def get_gigachat_client() -> GigaChatClient:
+    """Возвращает клиент GigaChat, создавая его при первом обращении"""
+    global _gigachat_client
+    if _gigachat_client is None:
+        with _gigachat_client_lock:
+            if _gigachat_client is None:
+                _gigachat_client = GigaChatClient()
+    return _gigachat_client
+
+
+def set_gigachat_client(client):
+    """Подменяет клиент GigaChat (None — создать заново при следующем обращении)"""
+    global _gigachat_client
+    _gigachat_client = client
+
+
+# Запросы к GigaChat выполняются в отдельных потоках, чтобы не блокировать обработчики telebot
+llm_stage = LLMStage(
+    lambda message_text, place_number: get_gigachat_client().ask_llm(message_text, place_number),
+    LLM_WORKERS,
+    LLM_QUEUE_SIZE,
+    LLM_DEADLINE_SECONDS,
+    classify_batch=lambda items: get_gigachat_client().ask_llm_batch(items),
+    batch_size=LLM_BATCH_SIZE,
+    batch_window_seconds=LLM_BATCH_WINDOW_SECONDS,
+)
+
+# Таймеры розыгрышей (завершение и обновление обратного отсчета) выполняются в одном потоке
+scheduler = Scheduler("raffle-scheduler")
+
+# Все запросы к Telegram идут через очередь с приоритетами и ограничением частоты
+outbound = OutboundQueue(
+    OUTBOUND_WORKERS,
+    OUTBOUND_QUEUE_SIZE,
+    global_rate=TELEGRAM_GLOBAL_RATE,
+    global_burst=TELEGRAM_GLOBAL_RATE,
+    chat_rate=TELEGRAM_CHAT_RATE,
+    chat_burst=TELEGRAM_CHAT_BURST,
+)
+
+# Имена пользователей из входящих обновлений: победитель объявляется без запроса get_chat_member
+user_cache = UserCache(USER_CACHE_SIZE)
+
+# Обновления одного чата обрабатываются по порядку, разных чатов — параллельно.
+# Сюда же возвращаются ответы GigaChat, чтобы розыгрыш запускался в дорожке своего чата
+dispatcher = ChatDispatcher(DISPATCH_LANES, DISPATCH_QUEUE_SIZE)
+
+# Правки сообщений розыгрышей: запрошено (нажатия и обратный отсчет), отправлено в Telegram,
+# пропущено (ничего не изменилось).
+# Разница между запрошенными и отправленными — сэкономленные запросы к API
+edit_stats = {'requested': 0, 'sent': 0, 'skipped_unchanged': 0}
+_edit_lock = threading.Lock()
+
+# Состояние компонентов читается только при запросе метрик (глобальные имена —
+# в момент чтения, поэтому подмена в тестах тоже видна)
+registry.gauge("active_raffles", "Розыгрыши в памяти (идущие и завершенные сегодня)", lambda: len(raffle_store))
+registry.gauge("scheduled_calls", "Ожидающие таймеры розыгрышей", lambda: scheduler.pending())
+registry.gauge("outbound_pending", "Запросы к Telegram в очереди", lambda: outbound.pending())
+registry.gauge("outbound_events_total", "События очереди запросов к Telegram", lambda: outbound.stats, "event", "counter")
+registry.gauge("scheduler_events_total", "События планировщика таймеров", lambda: scheduler.stats, "event", "counter")
+registry.gauge("llm_stage_events_total", "События очереди запросов к GigaChat", lambda: llm_stage.stats, "event", "counter")
+registry.gauge("raffle_edits_total", "Правки сообщений розыгрышей", lambda: edit_stats, "event", "counter")
+registry.gauge(
+    "dispatch_queue_depth", "Обновления, ожидающие обработки, по дорожкам",
+    lambda: dict(enumerate(dispatcher.depths())), "lane",
+)
+registry.gauge(
+    "dispatch_events_total", "События обработки входящих обновлений",
+    lambda: {name: value for name, value in dispatcher.stats.items() if name != 'max_depth'}, "event", "counter",
+)
+registry.gauge(
+    "user_cache_lookups_total", "Поиск имени победителя в кэше",
+    lambda: {'hit': user_cache.hits, 'miss': user_cache.misses}, "result", "counter",
+)
+
+
+def count_edit_request():
+    """Учитывает запрошенную правку сообщения розыгрыша"""
+    with _edit_lock:
+        edit_stats['requested'] += 1
+
+# Активные розыгрыши и их победители (меняются из потоков telebot и планировщика)
+raffle_store = RaffleStore()
+
+# Часовой пояс, в котором розыгрыши делятся по дням (None — время сервера)
+local_timezone = ZoneInfo(BOT_TIMEZONE) if BOT_TIMEZONE else None
+
+
+def raffle_timer_seconds(chat_id: int) -> int:
+    """Длительность розыгрыша в чате"""
+    return RAFFLE_TIMER_SECONDS_BY_CHAT.get(chat_id, RAFFLE_TIMER_SECONDS)
+
+
+def max_active_raffles(chat_id: int) -> int:
+    """Лимит активных розыгрышей в чате"""
+    return MAX_ACTIVE_RAFFLES_BY_CHAT.get(chat_id, MAX_ACTIVE_RAFFLES)
+
+
+def today() -> date:
+    """Текущая дата в часовом поясе бота"""
+    return datetime.now(local_timezone).date()
+
+
+def seconds_until_midnight() -> float:
+    """Секунды до ближайшей полуночи в часовом поясе бота (с учетом перехода на летнее время)"""
+    midnight = datetime.combine(today() + timedelta(days=1), datetime.min.time(), tzinfo=local_timezone)
+    return max(0.0, midnight.timestamp() - time.time())
 
 def handle_text_message(bot, message):
     """Обработчик текстовых сообщений"""
     # Проверка доступа уже выполнена в bot.py, здесь просто логируем
     chat_type = message.chat.type
     chat_title = message.chat.title if hasattr(message.chat, 'title') else 'личные сообщения'
-    logger.info(f"Получено сообщение в {chat_type} '{chat_title}': {message.text}")
+    # Аргументы вместо f-строки: текст форматируется, только если запись будет выведена
+    messages_logger.info("Получено сообщение в %s '%s': %s", chat_type, chat_title, message.text)
+    user_cache.remember(message.from_user)
     
-    # Проверяем через GigaChat, является ли это сообщение о свободном месте
-    is_parking, place_number = gigachat_client.check_parking_message(message.text)
+    # Числа, которых нет среди мест парковки чата, отбрасываются сразу
+    places = PARKING_PLACES_BY_CHAT.get(message.chat.id, PARKING_PLACES)
     
-    if is_parking and place_number:
-        # Очищаем розыгрыши не сегодняшнего дня
-        cleanup_old_raffles(bot)
-        
-        # Проверяем лимит активных розыгрышей
-        if len(active_raffles) >= MAX_ACTIVE_RAFFLES:
-            # Удаляем самый старый розыгрыш
-            remove_oldest_raffle(bot)
-        
-        # Используем message_id как raffle_id для уникальности
-        raffle_id = f"{message.chat.id}_{message.message_id}"
-        start_time = time.time()
-        raffle_date = date.today()
-        
-        # Создаем начальное сообщение с таймером
-        message_text = format_raffle_message(place_number, RAFFLE_TIMER_SECONDS, 0)
-        keyboard = create_raffle_keyboard(raffle_id, 0)
-        
-        # Отправляем сообщение с кнопкой
-        bot_message = bot.reply_to(message, message_text, reply_markup=keyboard)
-        
-        # Сохраняем розыгрыш в словарь
-        active_raffles[raffle_id] = {
-            'place_number': place_number,
-            'participants': [],
-            'message_id': bot_message.message_id,
-            'chat_id': message.chat.id,
-            'timer': None,
-            'update_timer': None,
-            'timestamp': start_time,
-            'start_time': start_time,
-            'date': raffle_date,
-            'winner_id': None
-        }
-        
-        # Запускаем таймер для завершения розыгрыша
-        timer = threading.Timer(RAFFLE_TIMER_SECONDS, finish_raffle, args=(bot, raffle_id))
-        timer.start()
-        active_raffles[raffle_id]['timer'] = timer
-        
-        # Запускаем периодическое обновление сообщения (каждые 10 секунд)
-        update_timer = threading.Timer(10, update_raffle_message, args=(bot, raffle_id))
-        update_timer.start()
-        active_raffles[raffle_id]['update_timer'] = update_timer
+    # Быстрая проверка по правилам; спорные сообщения уходят в GigaChat без ожидания ответа
+    verdict, place_number, priority = get_gigachat_client().check_without_llm(message.text, places)
+    
+    if verdict == RULE_PARKING:
+        start_raffles(bot, message, places)
+    elif verdict == RULE_UNSURE:
+        def on_llm_result(is_parking, place_number):
+            # Ответ приходит в потоке GigaChat; розыгрыш запускается в дорожке чата,
+            # чтобы не пересекаться с другими обновлениями того же чата
+            if is_parking:
+                dispatcher.submit(message.chat.id, start_raffles, bot, message, places)
         
-        logger.info(f"Обнаружено сообщение о свободном месте №{place_number}")
+        llm_stage.submit(message.text, place_number, on_llm_result, priority)
+
+
+def start_raffles(bot, message, places):
+    """Запускает по розыгрышу на каждое место из объявления ("места 12 и 47 свободны")"""
+    for place_number in extract_places(message.text, places):
+        start_raffle(bot, message, place_number)
+
+
+def start_raffle(bot, message, place_number):
+    """Запускает розыгрыш места по сообщению о свободном месте"""
+    # Без номера места розыгрыш не запускается
+    if not place_number:
+        return
+    
+    # Проверяем лимит активных розыгрышей чата (другие чаты не затрагиваются)
+    chat_id = message.chat.id
+    if raffle_store.count(chat_id) >= max_active_raffles(chat_id):
+        # Удаляем самый старый розыгрыш чата
+        remove_oldest_raffle(bot, chat_id)
+    
+    # message_id и номер места делают raffle_id уникальным (в одном сообщении может быть несколько мест)
+    raffle_id = f"{message.chat.id}_{message.message_id}_{place_number}"
+    
+    # Создаем начальное сообщение с таймером
+    timer_seconds = raffle_timer_seconds(chat_id)
+    message_text = format_raffle_message(place_number, timer_seconds, 0)
+    keyboard = create_raffle_keyboard(raffle_id, 0)
+    
+    # Отправляем сообщение с кнопкой
+    bot_message = outbound.call(message.chat.id, PRIORITY_POST, bot.reply_to, message, message_text, reply_markup=keyboard)
+    
+    # Сохраняем розыгрыш
+    raffle = Raffle(raffle_id, place_number, message.chat.id, bot_message.message_id, raffle_date=today())
+    raffle.rendered = (message_text, 0)
+    raffle_store.add(raffle)
+    RAFFLES_STARTED.inc()
+    
+    # Планируем завершение розыгрыша
+    raffle.timer = scheduler.schedule(timer_seconds, finish_raffle, bot, raffle_id)
+    
+    # Планируем периодическое обновление сообщения (каждые 10 секунд)
+    raffle.update_timer = scheduler.schedule(10, update_raffle_message, bot, raffle_id)
+    
+    logger.info("Обнаружено сообщение о свободном месте №%s", place_number)
 
 def handle_callback(bot, call):
     """Обработчик callback'ов кнопок"""
     if call.data.startswith("want_"):
         raffle_id = call.data.split("_", 1)[1]
         
-        # Проверяем, существует ли розыгрыш
-        if raffle_id not in active_raffles:
-            bot.answer_callback_query(call.id, "❌ Розыгрыш уже завершен", show_alert=True)
-            return
-        
         # Получаем user_id
         user_id = call.from_user.id
         username = call.from_user.username or call.from_user.first_name
+        # Имя понадобится, если пользователь выиграет
+        user_cache.remember(call.from_user)
         
-        # Проверяем, не участвовал ли уже пользователь
-        raffle = active_raffles[raffle_id]
-        if user_id in raffle['participants']:
-            bot.answer_callback_query(call.id, "⚠️ Вы уже участвуете!", show_alert=True)
-            return
+        # Проверки (розыгрыш идет, пользователь еще не участвует и не выиграл другой розыгрыш)
+        # и добавление участника выполняются атомарно
+        result = raffle_store.join(raffle_id, user_id)
+        answer_text, show_alert = join_answer(result)
         
-        # Проверяем, не является ли пользователь победителем одного из активных розыгрышей
-        if user_id in active_winners:
-            bot.answer_callback_query(
-                call.id, 
-                "🚫 Вы уже выиграли в одном из активных розыгрышей! Не можете участвовать в других.", 
-                show_alert=True
-            )
+        # Подтверждаем нажатие сразу после записи участника: ответ не ждет правку сообщения
+        outbound.submit(None, PRIORITY_CALLBACK, bot.answer_callback_query, call.id, answer_text, show_alert=show_alert)
+        if result != JOIN_OK:
             return
         
-        # Добавляем участника
-        raffle['participants'].append(user_id)
-        participants_count = len(raffle['participants'])
-        logger.info(f"Пользователь @{username} нажал кнопку для места №{raffle['place_number']}")
-        
-        # Обновляем кнопку с новым количеством участников
-        update_raffle_button(bot, raffle_id, raffle)
+        raffle = raffle_store.get(raffle_id)
+        if raffle is None:
+            # Розыгрыш удален (лимит чата или смена дня) сразу после записи участника
+            return
+        logger.info("Пользователь @%s нажал кнопку для места №%s", username, raffle.place_number)
         
-        # Подтверждаем нажатие
-        bot.answer_callback_query(call.id, "✅ Вы участвуете в розыгрыше!")
+        # Счетчик участников на кнопке обновляется отложенной правкой
+        update_raffle_button(bot, raffle)
+
+
+def join_answer(result: str) -> tuple[str, bool]:
+    """Ответ на нажатие кнопки по результату RaffleStore.join(): (текст, показать как alert)"""
+    if result == JOIN_OK:
+        return "✅ Вы участвуете в розыгрыше!", False
+    if result == JOIN_ALREADY:
+        return "⚠️ Вы уже участвуете!", True
+    if result == JOIN_WINNER:
+        return "🚫 Вы уже выиграли в одном из активных розыгрышей этого чата! Не можете участвовать в других.", True
+    return "❌ Розыгрыш уже завершен", True
+
 
-def remove_oldest_raffle(bot):
-    """Удаляет самый старый розыгрыш при достижении лимита"""
-    if not active_raffles:
+def cancel_raffle_timers(raffle: Raffle):
+    """Отменяет завершение, обновление обратного отсчета и отложенную правку розыгрыша"""
+    for call in (raffle.timer, raffle.update_timer, raffle.edit_call):
+        if call:
+            call.cancel()
+
+
+def remove_oldest_raffle(bot, chat_id: int):
+    """Удаляет самый старый розыгрыш чата при достижении лимита"""
+    # Победитель удаленного розыгрыша снова может участвовать в других розыгрышах
+    oldest_raffle = raffle_store.remove_oldest(chat_id)
+    if oldest_raffle is None:
         return
     
-    # Находим самый старый розыгрыш по timestamp
-    oldest_raffle_id = min(active_raffles.items(), key=lambda x: x[1]['timestamp'])[0]
-    oldest_raffle = active_raffles[oldest_raffle_id]
-    
-    # Удаляем победителя из списка активных победителей, если был
-    if oldest_raffle.get('winner_id'):
-        active_winners.discard(oldest_raffle['winner_id'])
-    
-    # Отменяем таймеры, если они активны
-    if oldest_raffle['timer']:
-        oldest_raffle['timer'].cancel()
-    if oldest_raffle.get('update_timer'):
-        oldest_raffle['update_timer'].cancel()
-    
-    logger.info(f"Удален самый старый розыгрыш места №{oldest_raffle['place_number']} из-за лимита активных розыгрышей")
-    
-    # Удаляем из словаря
-    del active_raffles[oldest_raffle_id]
+    cancel_raffle_timers(oldest_raffle)
+    RAFFLES_REMOVED.inc("limit")
+    logger.info("Удален самый старый розыгрыш места №%s из-за лимита активных розыгрышей", oldest_raffle.place_number)
 
 
 def cleanup_old_raffles(bot):
     """Удаляет розыгрыши, созданные не сегодня"""
-    today = date.today()
-    raffles_to_remove = []
+    current_date = today()
+    for raffle in raffle_store.remove_not_from(current_date):
+        cancel_raffle_timers(raffle)
+        RAFFLES_REMOVED.inc("day")
+        logger.info("Удален розыгрыш места №%s (создан %s, сегодня %s)", raffle.place_number, raffle.date, current_date)
+
+
+def day_rollover(bot):
+    """Смена дня: удаляет вчерашние розыгрыши и планирует следующую смену"""
+    cleanup_old_raffles(bot)
+    schedule_day_rollover(bot)
+
+
+def schedule_day_rollover(bot):
+    """
+    Планирует смену дня на ближайшую полночь в часовом поясе бота.
+    Вызывается один раз при запуске, дальше смена дня планирует себя сама.
+    """
+    # Секунда запаса: планировщик не должен сработать чуть раньше полуночи
+    return scheduler.schedule(seconds_until_midnight() + 1, day_rollover, bot)
+
+def restore_raffles(bot, db):
+    """
+    Подключает базу к хранилищу и восстанавливает сегодняшние розыгрыши после перезапуска.
     
-    for raffle_id, raffle in active_raffles.items():
-        if raffle.get('date') != today:
-            raffles_to_remove.append(raffle_id)
+    Таймеры идущих розыгрышей запускаются на оставшееся время, розыгрыши,
+    истекшие пока бот не работал, завершаются сразу. Победители завершенных
+    розыгрышей по-прежнему не могут участвовать в других.
+    """
+    current_date = today()
+    raffles = db.load(current_date)
+    db.delete_not_from(current_date)
+    raffle_store.restore(raffles)
+    raffle_store.db = db
     
-    for raffle_id in raffles_to_remove:
-        raffle = active_raffles[raffle_id]
-        
-        # Удаляем победителя из списка активных победителей, если был
-        if raffle.get('winner_id'):
-            active_winners.discard(raffle['winner_id'])
-        
-        # Отменяем таймеры
-        if raffle['timer']:
-            raffle['timer'].cancel()
-        if raffle.get('update_timer'):
-            raffle['update_timer'].cancel()
-        
-        logger.info(f"Удален розыгрыш места №{raffle['place_number']} (создан {raffle.get('date')}, сегодня {today})")
-        del active_raffles[raffle_id]
+    now = time.time()
+    restored = 0
+    for raffle in raffles:
+        if raffle.finished:
+            continue
+        remaining = raffle.start_time + raffle_timer_seconds(raffle.chat_id) - now
+        if remaining <= 0:
+            logger.info("Розыгрыш места №%s истек во время перезапуска, завершаем", raffle.place_number)
+            finish_raffle(bot, raffle.raffle_id)
+            continue
+        raffle.timer = scheduler.schedule(remaining, finish_raffle, bot, raffle.raffle_id)
+        # Сообщение сразу обновляется: обратный отсчет в нем остановился при перезапуске
+        raffle.update_timer = scheduler.schedule(0, update_raffle_message, bot, raffle.raffle_id)
+        restored += 1
+    logger.info(f"Восстановлено розыгрышей из базы: {len(raffles)}, идущих: {restored}")
+
 
 def finish_raffle(bot, raffle_id):
     """Завершает розыгрыш и выбирает победителя"""
-    # Проверяем, существует ли еще розыгрыш
-    if raffle_id not in active_raffles:
+    # Выбор победителя атомарен: розыгрыш завершается один раз, победитель не выигрывает дважды
+    raffle = raffle_store.finish(raffle_id)
+    if raffle is None:
         return
+    record_raffle_result(raffle)
     
-    raffle = active_raffles[raffle_id]
-    place_number = raffle['place_number']
+    # Отменяем таймер обновления и отложенную правку, если они активны
+    if raffle.update_timer:
+        raffle.update_timer.cancel()
+    if raffle.edit_call:
+        raffle.edit_call.cancel()
     
-    if raffle['participants']:
-        # Исключаем участников, которые уже выиграли в других активных розыгрышах
-        eligible_participants = [p for p in raffle['participants'] if p not in active_winners]
-        
-        if eligible_participants:
-            # Выбираем победителя из тех, кто еще не выиграл
-            winner_id = random.choice(eligible_participants)
-        else:
-            # Если все участники уже победители (маловероятно, но на всякий случай)
-            # Выбираем из всех участников
-            winner_id = random.choice(raffle['participants'])
-            logger.warning(f"Все участники розыгрыша места №{place_number} уже победители, выбран: {winner_id}")
-        
-        # Сохраняем победителя в розыгрыше
-        raffle['winner_id'] = winner_id
-        
-        # Добавляем победителя в список активных победителей
-        active_winners.add(winner_id)
-        
-        # Получаем информацию о победителе
-        try:
-            chat_member = bot.get_chat_member(raffle['chat_id'], winner_id)
-            username = chat_member.user.username or chat_member.user.first_name
-        except:
-            username = "пользователь"
-        
+    username = None
+    if raffle.winner_id is not None:
+        # Имя победителя известно по его нажатию; запрос к Telegram — только если его нет в кэше
+        username = user_cache.get(raffle.winner_id)
+        if username is None:
+            # finish_raffle выполняется в потоке планировщика, поэтому ответ не ждем:
+            # итоги отправятся, когда очередь выполнит запрос
+            future = outbound.submit(None, PRIORITY_WINNER, bot.get_chat_member, raffle.chat_id, raffle.winner_id)
+            future.add_done_callback(lambda done: announce_results(bot, raffle, winner_name(done)))
+            return
+    announce_results(bot, raffle, username)
+
+
+def winner_name(future) -> str:
+    """Имя победителя из ответа get_chat_member (при ошибке — "пользователь")"""
+    try:
+        chat_member = future.result()
+        user_cache.remember(chat_member.user)
+        return chat_member.user.username or chat_member.user.first_name
+    except Exception:
+        return "пользователь"
+
+
+def announce_results(bot, raffle: Raffle, username: str | None):
+    """Отправляет итоги розыгрыша и удаляет сообщение розыгрыша"""
+    place_number = raffle.place_number
+    if raffle.winner_id is not None:
         # Отправляем сообщение с упоминанием победителя
-        message_text = f"🎉 Поздравляем! 🎉\n\n🏆 Победитель розыгрыша места №{place_number}:\n@{username}\n\n🚗 Место теперь за тобой!"
-        bot.send_message(raffle['chat_id'], message_text)
-        
-        logger.info(f"Победитель розыгрыша места №{place_number}: @{username} (ID: {winner_id})")
+        message_text = format_winner_message(place_number, username)
+        outbound.submit(raffle.chat_id, PRIORITY_WINNER, bot.send_message, raffle.chat_id, message_text)
+        logger.info("Победитель розыгрыша места №%s: @%s (ID: %s)", place_number, username, raffle.winner_id)
     else:
         # Никто не участвовал - сообщаем, что место все еще свободно
-        message_text = f"ℹ️ Место №{place_number} все еще свободно"
-        bot.send_message(raffle['chat_id'], message_text)
-        logger.info(f"Розыгрыш места №{place_number} завершен, участников не было")
+        message_text = format_no_participants_message(place_number)
+        outbound.submit(raffle.chat_id, PRIORITY_WINNER, bot.send_message, raffle.chat_id, message_text)
+        logger.info("Розыгрыш места №%s завершен, участников не было", place_number)
     
-    # Отменяем таймер обновления, если он активен
-    if raffle.get('update_timer'):
-        raffle['update_timer'].cancel()
-    
-    # Удаляем сообщение розыгрыша из чата
-    try:
-        bot.delete_message(raffle['chat_id'], raffle['message_id'])
-        logger.info(f"Сообщение розыгрыша места №{place_number} удалено из чата")
-    except Exception as e:
-        logger.debug(f"Не удалось удалить сообщение розыгрыша {raffle_id}: {e}")
+    # Удаляем сообщение розыгрыша из чата. Запрос идет последним, но не отбрасывается при перегрузке:
+    # иначе сообщение с действующей кнопкой осталось бы в чате
+    outbound.submit(raffle.chat_id, PRIORITY_DELETE, bot.delete_message, raffle.chat_id, raffle.message_id)
+    logger.info("Сообщение розыгрыша места №%s удаляется из чата", place_number)
     
-    # НЕ удаляем розыгрыш из словаря сразу - он останется в памяти до конца дня
-    # Победитель будет удален из active_winners при cleanup_old_raffles или remove_oldest_raffle
+    # НЕ удаляем розыгрыш из хранилища сразу - он останется в памяти до конца дня
+    # Победитель снова сможет участвовать после cleanup_old_raffles или remove_oldest_raffle
+
+
+def record_raffle_result(raffle: Raffle):
+    """Учитывает итоги розыгрыша в метриках"""
+    RAFFLES_FINISHED.inc("winner" if raffle.winner_id is not None else "empty")
+    RAFFLE_DURATION_SECONDS.observe(time.time() - raffle.start_time)
+    RAFFLE_PARTICIPANTS.observe(len(raffle.participants))
+
+
+def format_winner_message(place_number: int, username: str) -> str:
+    """Сообщение о победителе розыгрыша"""
+    return f"🎉 Поздравляем! 🎉\n\n🏆 Победитель розыгрыша места №{place_number}:\n@{username}\n\n🚗 Место теперь за тобой!"
+
+
+def format_no_participants_message(place_number: int) -> str:
+    """Сообщение о розыгрыше без участников"""
+    return f"ℹ️ Место №{place_number} все еще свободно"
 
 
 def format_time_remaining(seconds: int) -> str:
@@ -258,51 +471,98 @@ def create_raffle_keyboard(raffle_id: str, participants_count: int) -> types.Inl
 
 def update_raffle_message(bot, raffle_id: str):
     """Обновляет сообщение розыгрыша с актуальным таймером и количеством участников"""
-    if raffle_id not in active_raffles:
+    raffle = raffle_store.get(raffle_id)
+    if raffle is None or raffle.finished:
         return
     
-    raffle = active_raffles[raffle_id]
-    elapsed = time.time() - raffle['start_time']
-    remaining = max(0, int(RAFFLE_TIMER_SECONDS - elapsed))
-    participants_count = len(raffle['participants'])
-    
-    # Форматируем новое сообщение
-    message_text = format_raffle_message(raffle['place_number'], remaining, participants_count)
-    keyboard = create_raffle_keyboard(raffle_id, participants_count)
-    
-    try:
-        # Обновляем сообщение
-        bot.edit_message_text(
-            message_text,
-            chat_id=raffle['chat_id'],
-            message_id=raffle['message_id'],
-            reply_markup=keyboard
-        )
-    except Exception as e:
-        # Игнорируем ошибки обновления (сообщение могло быть удалено)
-        logger.debug(f"Не удалось обновить сообщение розыгрыша {raffle_id}: {e}")
+    # Правка с обратным отсчетом включает и счетчик участников, отдельная правка после нажатий не нужна
+    count_edit_request()
+    with _edit_lock:
+        if raffle.edit_call:
+            raffle.edit_call.cancel()
+            raffle.edit_call = None
+    remaining = edit_raffle_message(bot, raffle)
     
-    # Если время еще не истекло, планируем следующее обновление
+    # Если время еще не истекло, планируем следующее обновление (тем же вызовом планировщика)
     if remaining > 0:
-        update_timer = threading.Timer(10, update_raffle_message, args=(bot, raffle_id))
-        update_timer.start()
-        raffle['update_timer'] = update_timer
+        if raffle.update_timer:
+            scheduler.reschedule(raffle.update_timer, 10)
+        else:
+            raffle.update_timer = scheduler.schedule(10, update_raffle_message, bot, raffle_id)
+
+
+def update_raffle_button(bot, raffle: Raffle):
+    """
+    Запрашивает обновление счетчика участников после нажатия.
+    
+    Нажатия объединяются: сообщение правится не чаще раза в BUTTON_EDIT_INTERVAL_SECONDS,
+    и в правку попадает итоговое количество участников.
+    """
+    count_edit_request()
+    with _edit_lock:
+        if raffle.edit_call:
+            # Правка уже запланирована и покажет актуальный счетчик
+            return
+        delay = max(0.0, raffle.last_edit_time + BUTTON_EDIT_INTERVAL_SECONDS - time.monotonic())
+        raffle.edit_call = scheduler.schedule(delay, flush_raffle_button, bot, raffle.raffle_id)
 
 
-def update_raffle_button(bot, raffle_id: str, raffle: dict):
-    """Обновляет только кнопку с количеством участников"""
-    if raffle_id not in active_raffles:
+def flush_raffle_button(bot, raffle_id: str):
+    """Отправляет отложенную правку после серии нажатий"""
+    raffle = raffle_store.get(raffle_id)
+    if raffle is None or raffle.finished:
         return
     
-    participants_count = len(raffle['participants'])
-    keyboard = create_raffle_keyboard(raffle_id, participants_count)
+    with _edit_lock:
+        raffle.edit_call = None
+    edit_raffle_message(bot, raffle)
+
+
+def render_raffle_message(raffle: Raffle) -> tuple[int, str | None, types.InlineKeyboardMarkup | None]:
+    """
+    Готовит правку сообщения розыгрыша (общая часть синхронного и асинхронного режимов).
+    
+    Returns:
+        (оставшееся время в секундах, текст, кнопка); текст и кнопка None,
+        если с последней правки ничего не изменилось
+    """
+    elapsed = time.time() - raffle.start_time
+    remaining = max(0, int(raffle_timer_seconds(raffle.chat_id) - elapsed))
+    participants_count = len(raffle.participants)
     
-    try:
-        bot.edit_message_reply_markup(
-            chat_id=raffle['chat_id'],
-            message_id=raffle['message_id'],
-            reply_markup=keyboard
-        )
-    except Exception as e:
-        logger.debug(f"Не удалось обновить кнопку розыгрыша {raffle_id}: {e}")
+    # Форматируем новое сообщение; кнопка зависит только от количества участников
+    message_text = format_raffle_message(raffle.place_number, remaining, participants_count)
+    rendered = (message_text, participants_count)
+    with _edit_lock:
+        if rendered == raffle.rendered:
+            edit_stats['skipped_unchanged'] += 1
+            return remaining, None, None
+        raffle.rendered = rendered
+        raffle.last_edit_time = time.monotonic()
+        edit_stats['sent'] += 1
+    return remaining, message_text, create_raffle_keyboard(raffle.raffle_id, participants_count)
 
+
+def edit_raffle_message(bot, raffle: Raffle) -> int:
+    """
+    Правит сообщение розыгрыша, если текст или кнопка изменились с последней правки.
+    
+    Returns:
+        Оставшееся время розыгрыша в секундах
+    """
+    remaining, message_text, keyboard = render_raffle_message(raffle)
+    if message_text is None:
+        return remaining
+    
+    # Правка необязательна: при перегрузке отбрасывается, а более новая правка того же сообщения
+    # заменяет ожидающую в очереди. Ошибки (сообщение могло быть удалено) очередь только логирует
+    outbound.submit(
+        raffle.chat_id, PRIORITY_EDIT, bot.edit_message_text,
+        message_text,
+        chat_id=raffle.chat_id,
+        message_id=raffle.message_id,
+        reply_markup=keyboard,
+        droppable=True,
+        replace_key=('edit', raffle.chat_id, raffle.message_id)
+    )
+    return remaining
@@ -0,0 +1,258 @@
+"""Неблокирующая классификация сообщений через GigaChat на ограниченном пуле потоков"""
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+logger = logging.getLogger(__name__)
+
+# Вердикт только по правилам: если правила не уверены, сообщение не считается объявлением
+RULE_ONLY_VERDICT = (False, None)
+
+
+class LLMStage:
+    """
+    Очередь запросов к GigaChat с фиксированным числом рабочих потоков.
+
+    - Обработчик telebot только ставит сообщение в очередь и сразу освобождается.
+    - У каждого запроса есть срок (deadline): если ответ не успел, сообщение
+      получает вердикт только по правилам ровно к сроку. Сам запрос к GigaChat
+      выполняется в отдельном пуле из workers потоков, поэтому медленный ответ не
+      задерживает вердикт, а одновременных запросов все равно не больше workers:
+      пока все потоки пула заняты, новые запросы ждут в очереди и при истечении
+      срока получают вердикт по правилам, не попадая в GigaChat.
+    - Очередь ограничена: при переполнении вытесняется запрос с наименьшим
+      приоритетом, новые потоки не создаются.
+    - Пакетный режим (batch_size > 1): рабочий поток копит сообщения в течение
+      batch_window_seconds (или пока их не наберется batch_size) и проверяет
+      их одним запросом через classify_batch.
+    """
+
+    def __init__(self, classify, workers: int, queue_size: int, deadline_seconds: float,
+                 classify_batch=None, batch_size: int = 1, batch_window_seconds: float = 0.0):
+        """
+        Args:
+            classify: Функция (message_text, place_number) -> (is_parking, place_number),
+                      выполняющая блокирующий запрос к GigaChat
+            workers: Количество рабочих потоков
+            queue_size: Максимальное количество ожидающих запросов
+            deadline_seconds: Срок на получение ответа с момента постановки в очередь
+            classify_batch: Функция [(message_text, place_number), ...] -> [(is_parking, place_number), ...]
+                            для пакетного режима
+            batch_size: Максимальный размер пакета (1 — пакетный режим выключен)
+            batch_window_seconds: Сколько ждать накопления пакета
+        """
+        self.classify = classify
+        self.workers = workers
+        self.queue_size = queue_size
+        self.deadline_seconds = deadline_seconds
+        self.classify_batch = classify_batch
+        self.batch_size = batch_size if classify_batch else 1
+        self.batch_window_seconds = batch_window_seconds
+        # Счетчики для мониторинга
+        self.stats = {'submitted': 0, 'completed': 0, 'timed_out': 0, 'shed': 0, 'errors': 0, 'batches': 0}
+        # Куча ожидающих запросов: (-priority, порядковый номер, job)
+        self._queue = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._threads = []
+        self._executor = None
+        # Запросы к GigaChat, занимающие потоки пула (не больше workers)
+        self._in_flight = 0
+
+    def submit(self, message_text: str, place_number: int | None, on_result, priority: int = 0) -> bool:
+        """
+        Ставит сообщение в очередь на классификацию.
+
+        Args:
+            message_text: Текст сообщения
+            place_number: Номер места, найденный правилами
+            on_result: Функция (is_parking, place_number), вызывается из рабочего потока
+            priority: Приоритет (больше — важнее), см. scan_rules()
+
+        Returns:
+            True если сообщение принято в очередь, False если отброшено из-за перегрузки
+        """
+        job = {
+            'message_text': message_text,
+            'place_number': place_number,
+            'on_result': on_result,
+            'deadline': time.monotonic() + self.deadline_seconds,
+        }
+        shed_job = None
+        with self._condition:
+            self._start_workers()
+            self.stats['submitted'] += 1
+            if len(self._queue) >= self.queue_size:
+                # Наименее важный и самый новый из ожидающих запросов
+                lowest = max(self._queue)
+                if -lowest[0] >= priority:
+                    shed_job = job
+                else:
+                    self._queue.remove(lowest)
+                    heapq.heapify(self._queue)
+                    shed_job = lowest[2]
+            if shed_job is not job:
+                heapq.heappush(self._queue, (-priority, next(self._counter), job))
+                # Будим все рабочие потоки: часть из них может ждать свободный поток пула
+                self._condition.notify_all()
+            if shed_job is not None:
+                self.stats['shed'] += 1
+
+        if shed_job is not None:
+            logger.warning("GigaChat перегружен, сообщение обработано только по правилам")
+            self._deliver(shed_job, RULE_ONLY_VERDICT)
+        return shed_job is not job
+
+    def pending(self) -> int:
+        """Количество запросов, ожидающих в очереди"""
+        with self._condition:
+            return len(self._queue)
+
+    def _start_workers(self):
+        """Запускает рабочие потоки при первом запросе (вызывается под блокировкой)"""
+        if self._threads:
+            return
+        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="llm-call")
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"llm-stage-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _worker(self):
+        """Цикл рабочего потока: берет самые важные запросы и спрашивает GigaChat"""
+        while True:
+            jobs, expired = self._take_jobs()
+            for job in expired:
+                self._timed_out(job)
+            if not jobs:
+                continue
+
+            # Запросы, слишком долго ждавшие в очереди, не тратят GigaChat
+            now = time.monotonic()
+            for job in jobs:
+                if now >= job['deadline']:
+                    self._timed_out(job)
+            jobs = [job for job in jobs if now < job['deadline']]
+            if not jobs:
+                self._release_slot()
+                continue
+
+            if len(jobs) == 1:
+                future = self._executor.submit(self.classify, jobs[0]['message_text'], jobs[0]['place_number'])
+            else:
+                future = self._executor.submit(
+                    self.classify_batch, [(job['message_text'], job['place_number']) for job in jobs]
+                )
+                with self._condition:
+                    self.stats['batches'] += 1
+            # Поток пула освобождается, когда запрос к GigaChat действительно завершится
+            future.add_done_callback(lambda done: self._release_slot())
+
+            waiting = list(jobs)
+            try:
+                results = self._wait_results(future, waiting)
+            except Exception as e:
+                logger.error("Ошибка классификации сообщения через GigaChat: %s", e)
+                with self._condition:
+                    self.stats['errors'] += len(waiting)
+                for job in waiting:
+                    self._deliver(job, RULE_ONLY_VERDICT)
+                continue
+
+            if not waiting:
+                continue
+            if len(jobs) == 1:
+                results = [results]
+            # Запросы, уже получившие вердикт по правилам, пропускаются
+            waiting_ids = {id(job) for job in waiting}
+            for job, result in zip(jobs, results):
+                if id(job) not in waiting_ids:
+                    continue
+                with self._condition:
+                    self.stats['completed'] += 1
+                self._deliver(job, result)
+
+    def _wait_results(self, future, waiting: list):
+        """
+        Ждет ответ GigaChat не дольше сроков запросов.
+
+        Запросы, срок которых истек во время ожидания, сразу получают вердикт по правилам
+        и убираются из waiting; уже начатый запрос к GigaChat продолжается в пуле, и его
+        ответ для них отбрасывается, а еще не начатый отменяется.
+
+        Returns:
+            Результат classify или classify_batch
+        """
+        while True:
+            timeout = min(job['deadline'] for job in waiting) - time.monotonic()
+            try:
+                return future.result(timeout=max(0.0, timeout))
+            except FutureTimeoutError:
+                now = time.monotonic()
+                for job in waiting:
+                    if now >= job['deadline']:
+                        self._timed_out(job)
+                waiting[:] = [job for job in waiting if now < job['deadline']]
+                if not waiting:
+                    future.cancel()
+                    return []
+
+    def _take_jobs(self) -> tuple[list, list]:
+        """
+        Ждет запросы и свободный поток пула, забирает из очереди до batch_size самых важных.
+
+        Поток пула занимается сразу (освобождает его _release_slot). Пока свободных
+        потоков нет, запросы ждут в очереди, а истекшие возвращаются во втором списке.
+
+        Returns:
+            (запросы для GigaChat, запросы с истекшим сроком)
+        """
+        with self._condition:
+            while not self._queue or self._in_flight >= self.workers:
+                if not self._queue:
+                    self._condition.wait()
+                    continue
+                now = time.monotonic()
+                expired = [entry for entry in self._queue if now >= entry[2]['deadline']]
+                if expired:
+                    self._queue = [entry for entry in self._queue if now < entry[2]['deadline']]
+                    heapq.heapify(self._queue)
+                    return [], [entry[2] for entry in expired]
+                self._condition.wait(min(entry[2]['deadline'] for entry in self._queue) - now)
+            self._in_flight += 1
+            if self.batch_size > 1:
+                # Даем накопиться пакету, но не дольше окна
+                window_end = time.monotonic() + self.batch_window_seconds
+                while 0 < len(self._queue) < self.batch_size:
+                    remaining = window_end - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+            count = min(self.batch_size, len(self._queue))
+            if not count:
+                self._in_flight -= 1
+                self._condition.notify_all()
+            return [heapq.heappop(self._queue)[2] for _ in range(count)], []
+
+    def _release_slot(self):
+        """Освобождает поток пула, занятый в _take_jobs"""
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    def _timed_out(self, job):
+        """Отдает вердикт по правилам для запроса, не уложившегося в срок"""
+        with self._condition:
+            self.stats['timed_out'] += 1
+        logger.warning("GigaChat не ответил за %sс, сообщение обработано только по правилам", self.deadline_seconds)
+        self._deliver(job, RULE_ONLY_VERDICT)
+
+    def _deliver(self, job, result):
+        """Передает вердикт обработчику, не давая его ошибкам остановить рабочий поток"""
+        try:
+            job['on_result'](*result)
+        except Exception as e:
+            logger.error("Ошибка обработки результата классификации: %s", e)
@@ -0,0 +1,93 @@
+"""Локальный классификатор сообщений: наивный Байес по символьным n-граммам"""
+import json
+import math
+from collections import Counter
+from pathlib import Path
+from src.verdict_cache import normalize_message
+
+# Длины символьных n-грамм
+NGRAM_MIN = 2
+NGRAM_MAX = 4
+
+
+def extract_ngrams(message_text: str) -> Counter:
+    """
+    Разбивает сообщение на символьные n-граммы.
+    Текст нормализуется так же, как ключ кэша: нижний регистр, числа замаскированы.
+
+    Args:
+        message_text: Текст сообщения
+
+    Returns:
+        Counter с количеством каждой n-граммы
+    """
+    text = f" {normalize_message(message_text)} "
+    ngrams = Counter()
+    for n in range(NGRAM_MIN, NGRAM_MAX + 1):
+        for i in range(len(text) - n + 1):
+            ngrams[text[i:i + n]] += 1
+    return ngrams
+
+
+def train_model(samples: list[tuple[str, bool]]) -> dict:
+    """
+    Обучает модель на размеченных сообщениях.
+
+    Args:
+        samples: Список пар (текст сообщения, является ли объявлением о свободном месте)
+
+    Returns:
+        Модель в виде словаря (сериализуется в JSON через save_model)
+    """
+    class_counts = {'1': 0, '0': 0}
+    ngram_counts = {'1': Counter(), '0': Counter()}
+    for text, is_parking in samples:
+        label = '1' if is_parking else '0'
+        class_counts[label] += 1
+        ngram_counts[label].update(extract_ngrams(text))
+
+    vocabulary = set(ngram_counts['1']) | set(ngram_counts['0'])
+    return {
+        'class_counts': class_counts,
+        'ngram_counts': {label: dict(counts) for label, counts in ngram_counts.items()},
+        'ngram_totals': {label: sum(counts.values()) for label, counts in ngram_counts.items()},
+        'vocabulary_size': len(vocabulary),
+    }
+
+
+def predict_parking_probability(model: dict, message_text: str) -> float:
+    """
+    Оценивает вероятность того, что сообщение — объявление о свободном месте.
+
+    Args:
+        model: Модель из train_model() или load_model()
+        message_text: Текст сообщения
+
+    Returns:
+        Вероятность от 0 до 1
+    """
+    total_samples = sum(model['class_counts'].values())
+    log_scores = {}
+    for label in ('1', '0'):
+        # Сглаживание Лапласа для n-грамм, которых не было в обучающей выборке
+        counts = model['ngram_counts'][label]
+        denominator = model['ngram_totals'][label] + model['vocabulary_size'] + 1
+        score = math.log((model['class_counts'][label] + 1) / (total_samples + 2))
+        for ngram, count in extract_ngrams(message_text).items():
+            score += count * math.log((counts.get(ngram, 0) + 1) / denominator)
+        log_scores[label] = score
+
+    difference = max(-700.0, min(700.0, log_scores['0'] - log_scores['1']))
+    return 1.0 / (1.0 + math.exp(difference))
+
+
+def save_model(model: dict, path: str | Path):
+    """Сохраняет модель в JSON-файл"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(model, f, ensure_ascii=False)
+
+
+def load_model(path: str | Path) -> dict:
+    """Загружает модель из JSON-файла"""
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
@@ -0,0 +1,136 @@
+"""Неблокирующее логирование: записи уходят в очередь, в консоль их пишет отдельный поток"""
+import itertools
+import json
+import logging
+import logging.handlers
+import copy
+import queue
+import sys
+
+# Формат текстовых логов (как раньше в basicConfig)
+TEXT_FORMAT = '%(asctime)s - %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Логгер для частых событий ("получено сообщение"): его записи можно прореживать через LOG_SAMPLING
+MESSAGES_LOGGER = "src.handlers.messages"
+
+
+def parse_sampling(spec: str) -> dict[str, int]:
+    """
+    Разбирает настройку прореживания логов.
+
+    Args:
+        spec: "имя_логгера=N,имя_логгера=N" — писать каждую N-ю запись логгера
+
+    Returns:
+        {имя логгера: N}
+    """
+    sampling = {}
+    for item in spec.split(","):
+        name, _, every = item.strip().partition("=")
+        if name and every:
+            sampling[name.strip()] = max(1, int(every))
+    return sampling
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Пропускает только каждую N-ю запись выбранных логгеров.
+    Предупреждения и ошибки не прореживаются.
+    """
+
+    def __init__(self, sampling: dict[str, int]):
+        super().__init__()
+        self.sampling = sampling
+        self.counters = {name: itertools.count() for name in sampling}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        every = self.sampling.get(record.name)
+        if every is None or record.levelno >= logging.WARNING:
+            return True
+        # itertools.count потокобезопасен в CPython, блокировка не нужна
+        return next(self.counters[record.name]) % every == 0
+
+
+class JsonFormatter(logging.Formatter):
+    """Структурированный вывод: одна JSON-строка на запись"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self.formatTime(record, DATE_FORMAT),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Кладет записи в ограниченную очередь, не дожидаясь вывода.
+
+    Как и в стандартном QueueHandler, аргументы подставляются в сообщение здесь:
+    изменяемые аргументы (словари, розыгрыши) и исключение к моменту вывода могут
+    измениться. Оформление записи (время, текстовый или JSON-формат) и запись
+    в консоль остаются потоку записи.
+    Если очередь переполнена (консоль или диск не успевают), запись отбрасывается.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # Трассировка нужна потоку записи текстом: объекты исключения могут быть уже изменены
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(level: str = "INFO", json_format: bool = False,
+                  sampling: dict[str, int] | None = None, queue_size: int = 10000,
+                  stream=None) -> logging.handlers.QueueListener:
+    """
+    Настраивает корневой логгер на запись через очередь.
+
+    Args:
+        level: Уровень логирования
+        json_format: Писать JSON-строки вместо текста
+        sampling: {имя логгера: N} — писать каждую N-ю запись (см. parse_sampling())
+        queue_size: Размер очереди записей
+        stream: Куда писать (по умолчанию stderr, как basicConfig)
+
+    Returns:
+        Запущенный QueueListener; при завершении нужно вызвать stop(), чтобы дописать очередь
+    """
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT, DATE_FORMAT))
+
+    handler = DroppingQueueHandler(queue.Queue(queue_size))
+    if sampling:
+        handler.addFilter(SamplingFilter(sampling))
+
+    root = logging.getLogger()
+    for old_handler in root.handlers[:]:
+        root.removeHandler(old_handler)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    listener = logging.handlers.QueueListener(handler.queue, output)
+    listener.start()
+    return listener
@@ -0,0 +1,259 @@
+"""
+Метрики бота в текстовом формате Prometheus: реестр, счетчики, гистограммы и HTTP-экспортер.
+
+Счетчик и гистограмма обновляются под короткой блокировкой без форматирования
+и запросов к сети, поэтому их можно вызывать на каждое сообщение. Текст метрик
+собирается только при запросе GET /metrics. Значения, которые компоненты уже
+считают сами (stats очередей, размер хранилища), читаются функциями в момент запроса.
+"""
+import bisect
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Префикс имен всех метрик бота
+PREFIX = "parking_bot_"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def escape_label(value) -> str:
+    """Экранирует обратную косую черту, кавычки и переводы строк в значении метки"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    """{name="value",...} для строки метрики"""
+    parts = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Счетчик событий с необязательными метками"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        # {значения меток: счетчик}; счетчик без меток выводится и до первого события
+        self._values = {} if labels else {(): 0}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        """Увеличивает счетчик для указанных значений меток"""
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values) -> float:
+        return self._values.get(label_values, 0)
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{format_labels(self.labels, values)} {format_value(count)}" for values, count in items]
+
+
+class Histogram:
+    """Гистограмма значений (задержек, длительностей) с необязательными метками"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: tuple, labels: tuple = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        # {значения меток: [количество в каждом интервале и сверх последнего..., сумма]}
+        self._values = {} if labels else {(): [0] * (len(self.buckets) + 1) + [0.0]}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        """Учитывает одно значение"""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(label_values)
+            if counts is None:
+                counts = self._values[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+
+    def count(self, *label_values) -> int:
+        counts = self._values.get(label_values)
+        return sum(counts[:-1]) if counts else 0
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted((values, list(counts)) for values, counts in self._values.items())
+        lines = []
+        for values, counts in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = format_labels(self.labels, values, f'le="{format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            labels = format_labels(self.labels, values)
+            lines.append(f"{self.name}_sum{labels} {format_value(counts[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """
+    Значение, которое читается функцией в момент запроса метрик.
+
+    Функция возвращает число или, если задана метка, словарь {значение метки: число}
+    (так выводятся готовые словари stats компонентов).
+    """
+
+    def __init__(self, name: str, help_text: str, func, label: str | None = None, kind: str = "gauge"):
+        self.name = name
+        self.help_text = help_text
+        self.func = func
+        self.label = label
+        self.kind = kind
+
+    def render(self) -> list[str]:
+        try:
+            value = self.func()
+        except Exception as e:
+            logger.debug("Метрика %s не прочитана: %s", self.name, e)
+            return []
+        if self.label is None:
+            return [f"{self.name} {format_value(value)}"]
+        return [
+            f"{self.name}{format_labels((self.label,), (key,))} {format_value(item)}"
+            for key, item in sorted(value.items())
+        ]
+
+
+class Registry:
+    """Набор метрик, который отдает экспортер"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """Добавляет метрику (метрика с тем же именем заменяется)"""
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labels: tuple = ()) -> Counter:
+        return self.register(Counter(PREFIX + name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, buckets: tuple, labels: tuple = ()) -> Histogram:
+        return self.register(Histogram(PREFIX + name, help_text, buckets, labels))
+
+    def gauge(self, name: str, help_text: str, func, label: str | None = None, kind: str = "gauge") -> Gauge:
+        return self.register(Gauge(PREFIX + name, help_text, func, label, kind))
+
+    def render(self) -> str:
+        """Все метрики в текстовом формате Prometheus"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Общий реестр бота
+registry = Registry()
+
+# Интервалы гистограмм в секундах
+REQUEST_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+GIGACHAT_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 15, 30)
+RAFFLE_DURATION_BUCKETS = (30, 60, 120, 180, 300, 600, 1800, 3600)
+PARTICIPANTS_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50)
+
+UPDATES = registry.counter("updates_total", "Входящие обновления Telegram по типу", ("type",))
+CLASSIFIER_DECISIONS = registry.counter(
+    "classifier_decisions_total",
+    "Решения классификатора: уровень (rules, cache, local_model, llm) и вердикт",
+    ("tier", "verdict"),
+)
+GIGACHAT_SECONDS = registry.histogram("gigachat_request_seconds", "Время запроса к GigaChat", GIGACHAT_BUCKETS)
+RAFFLES_STARTED = registry.counter("raffles_started_total", "Запущенные розыгрыши")
+RAFFLES_FINISHED = registry.counter(
+    "raffles_finished_total", "Завершенные розыгрыши (winner — с победителем, empty — без участников)", ("result",)
+)
+RAFFLES_REMOVED = registry.counter(
+    "raffles_removed_total", "Розыгрыши, удаленные из памяти (limit — лимит чата, day — смена дня)", ("reason",)
+)
+RAFFLE_DURATION_SECONDS = registry.histogram(
+    "raffle_duration_seconds", "Время от объявления до итогов розыгрыша", RAFFLE_DURATION_BUCKETS
+)
+RAFFLE_PARTICIPANTS = registry.histogram("raffle_participants", "Участников в завершенном розыгрыше", PARTICIPANTS_BUCKETS)
+TELEGRAM_SECONDS = registry.histogram(
+    "telegram_request_seconds", "Время запроса к Telegram по методу", REQUEST_BUCKETS, ("method",)
+)
+TELEGRAM_ERRORS = registry.counter("telegram_errors_total", "Запросы к Telegram, завершившиеся ошибкой", ("method",))
+TELEGRAM_RATE_LIMITED = registry.counter(
+    "telegram_rate_limited_total", "Ответы Telegram 429 (Too Many Requests)", ("method",)
+)
+registry.gauge("threads", "Потоки процесса", threading.active_count)
+
+
+class MetricsServer:
+    """HTTP-экспортер: GET /metrics отдает метрики реестра"""
+
+    def __init__(self, host: str, port: int, metrics_registry: Registry = registry):
+        """
+        Args:
+            host: Адрес, на котором слушает сервер (127.0.0.1 — только локально)
+            port: Порт (0 — выбрать свободный, см. server_port)
+            metrics_registry: Реестр метрик
+        """
+        self.registry = metrics_registry
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+
+    @property
+    def server_port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self):
+        """Запускает сервер в фоновом потоке"""
+        threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True).start()
+        logger.info(f"Метрики доступны на порту {self.server_port}, путь /metrics")
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body = server.registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug("Метрики: " + format, *args)
+
+        return Handler
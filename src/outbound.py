@@ -0,0 +1,331 @@
+"""Очередь исходящих запросов к Telegram с приоритетами и ограничением частоты"""
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from src.metrics import TELEGRAM_SECONDS, TELEGRAM_ERRORS, TELEGRAM_RATE_LIMITED
+
+logger = logging.getLogger(__name__)
+
+# Приоритеты запросов (меньше — важнее)
+PRIORITY_WINNER = 0    # итоги розыгрыша
+PRIORITY_POST = 1      # новое сообщение розыгрыша и ответы бота
+PRIORITY_CALLBACK = 2  # ответы на нажатия кнопок
+PRIORITY_EDIT = 3      # обновление обратного отсчета и счетчика участников
+PRIORITY_DELETE = 4    # удаление сообщений
+
+# Код ошибки Telegram "Too Many Requests"
+TOO_MANY_REQUESTS = 429
+
+
+class TokenBucket:
+    """Ведро токенов: не больше rate запросов в секунду в среднем и не больше capacity подряд"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        # До этого момента запросы не отправляются (после ответа 429)
+        self.paused_until = 0.0
+
+    def wait_time(self, now: float) -> float:
+        """Сколько секунд ждать до следующего токена (0 — можно отправлять)"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        """Забирает токен (только после wait_time() == 0)"""
+        self.tokens -= 1
+
+    def pause(self, now: float, seconds: float):
+        """Приостанавливает отправку после ответа 429"""
+        self.paused_until = max(self.paused_until, now + seconds)
+        self.tokens = 0
+
+
+def retry_after_seconds(error: Exception) -> float | None:
+    """Пауза из ответа Telegram 429 (None — ошибка не связана с ограничением частоты)"""
+    if getattr(error, 'error_code', None) != TOO_MANY_REQUESTS:
+        return None
+    result_json = getattr(error, 'result_json', None) or {}
+    return float(result_json.get('parameters', {}).get('retry_after', 1))
+
+
+class OutboundQueue:
+    """
+    Все запросы к Telegram проходят через эту очередь.
+
+    - Запросы выполняются по приоритету: итоги розыгрыша не ждут за правками обратного отсчета.
+    - Частота ограничена общим ведром токенов и ведром на каждый чат.
+    - На ответ 429 отправка в чат (или вся отправка) приостанавливается на retry_after,
+      запрос повторяется до max_retries раз.
+    - Необязательные запросы (droppable) вытесняются при переполнении очереди;
+      новый запрос с тем же replace_key заменяет ожидающий (например, правку того же сообщения).
+    - Необязательные запросы занимают не больше workers - 1 потоков: один поток всегда свободен
+      для важных запросов, и ответ на нажатие не ждет медленных правок.
+    """
+
+    def __init__(self, workers: int, queue_size: int, global_rate: float, global_burst: float,
+                 chat_rate: float, chat_burst: float, max_retries: int = 3):
+        """
+        Args:
+            workers: Количество потоков, выполняющих запросы
+            queue_size: Сколько запросов может ждать в очереди (важные запросы принимаются всегда)
+            global_rate: Запросов в секунду на весь бот
+            global_burst: Запросов подряд на весь бот
+            chat_rate: Запросов в секунду в один чат
+            chat_burst: Запросов подряд в один чат
+            max_retries: Сколько раз повторять запрос после ответа 429
+        """
+        self.workers = workers
+        self.queue_size = queue_size
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        # Счетчики для мониторинга
+        self.stats = {'submitted': 0, 'sent': 0, 'dropped': 0, 'replaced': 0, 'retried': 0, 'errors': 0}
+        self._global_bucket = TokenBucket(global_rate, global_burst)
+        self._chat_buckets = {}
+        # Куча ожидающих запросов: (приоритет, порядковый номер, job).
+        # Отмененные запросы остаются в куче до извлечения, поэтому размер очереди
+        # считается отдельно, только по живым запросам
+        self._queue = []
+        self._waiting = 0
+        self._by_key = {}
+        self._in_progress = 0
+        self._droppable_in_progress = 0
+        self._max_droppable_in_progress = max(1, workers - 1)
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._threads = []
+
+    def submit(self, chat: int | None, priority: int, func, *args,
+               droppable: bool = False, replace_key=None, **kwargs) -> Future:
+        """
+        Ставит запрос func(*args, **kwargs) в очередь, не дожидаясь выполнения.
+
+        Args:
+            chat: ID чата, в который уходит запрос (None — учитывается только общее ограничение)
+            priority: PRIORITY_* (меньше — важнее)
+            func: Метод TeleBot
+            droppable: Запрос можно отбросить при перегрузке
+            replace_key: Ожидающий запрос с тем же ключом заменяется новым
+
+        Returns:
+            Future с результатом запроса (отброшенный запрос получает результат None)
+        """
+        job = {
+            'chat_id': chat,
+            'priority': priority,
+            'func': func,
+            'args': args,
+            'kwargs': kwargs,
+            'droppable': droppable,
+            'replace_key': replace_key,
+            'retries': 0,
+            'future': Future(),
+        }
+        dropped = []
+        with self._condition:
+            self._start_workers()
+            self.stats['submitted'] += 1
+            if replace_key is not None and replace_key in self._by_key:
+                replaced = self._by_key.pop(replace_key)
+                replaced['cancelled'] = True
+                self._waiting -= 1
+                self.stats['replaced'] += 1
+                dropped.append(replaced)
+            if self._waiting >= self.queue_size:
+                victim = self._lowest_droppable()
+                if droppable and (victim is None or victim['priority'] <= priority):
+                    # Новый запрос наименее важный — отбрасываем его самого
+                    victim = job
+                if victim is not None:
+                    if victim is not job:
+                        self._waiting -= 1
+                    victim['cancelled'] = True
+                    if victim['replace_key'] is not None and self._by_key.get(victim['replace_key']) is victim:
+                        del self._by_key[victim['replace_key']]
+                    self.stats['dropped'] += 1
+                    dropped.append(victim)
+            if not job.get('cancelled'):
+                if replace_key is not None:
+                    self._by_key[replace_key] = job
+                job['seq'] = next(self._counter)
+                heapq.heappush(self._queue, (priority, job['seq'], job))
+                self._waiting += 1
+                self._condition.notify()
+
+        for dropped_job in dropped:
+            dropped_job['future'].set_result(None)
+        return job['future']
+
+    def call(self, chat: int | None, priority: int, func, *args, **kwargs):
+        """Выполняет запрос через очередь и ждет результат (исключения пробрасываются)"""
+        return self.submit(chat, priority, func, *args, **kwargs).result()
+
+    def pending(self) -> int:
+        """Количество ожидающих запросов"""
+        with self._condition:
+            return self._waiting
+
+    def wait_idle(self, timeout: float = 5.0) -> bool:
+        """Ждет, пока очередь опустеет и выполняемые запросы завершатся"""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self._queue or self._in_progress:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            return True
+
+    def _lowest_droppable(self):
+        """Наименее важный и самый новый необязательный запрос (под блокировкой)"""
+        candidates = [entry for entry in self._queue if entry[2]['droppable'] and not entry[2].get('cancelled')]
+        if not candidates:
+            return None
+        return max(candidates)[2]
+
+    def _start_workers(self):
+        """Запускает рабочие потоки при первом запросе (вызывается под блокировкой)"""
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"outbound-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._chat_buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        return bucket
+
+    def _take_job(self):
+        """
+        Самый важный запрос, для которого есть токены (под блокировкой).
+
+        Returns:
+            (job или None, сколько ждать до следующей проверки)
+        """
+        now = time.monotonic()
+        global_wait = self._global_bucket.wait_time(now)
+        if global_wait > 0:
+            return None, global_wait
+
+        skipped = []
+        chosen = None
+        wait = None
+        while self._queue:
+            entry = heapq.heappop(self._queue)
+            job = entry[2]
+            if job.get('cancelled'):
+                continue
+            if job['droppable'] and self._droppable_in_progress >= self._max_droppable_in_progress:
+                # Последний свободный поток оставляем для важных запросов; поток, закончивший
+                # запрос, разбудит остальных (notify_all в _worker)
+                skipped.append(entry)
+                continue
+            if job['chat_id'] is not None:
+                chat_wait = self._chat_bucket(job['chat_id']).wait_time(now)
+                if chat_wait > 0:
+                    # Чат исчерпал лимит — пробуем менее важные запросы в другие чаты
+                    skipped.append(entry)
+                    wait = chat_wait if wait is None else min(wait, chat_wait)
+                    continue
+                self._chat_bucket(job['chat_id']).take()
+            self._global_bucket.take()
+            chosen = job
+            break
+
+        for entry in skipped:
+            heapq.heappush(self._queue, entry)
+        if chosen is not None:
+            self._waiting -= 1
+            if chosen['replace_key'] is not None:
+                self._by_key.pop(chosen['replace_key'], None)
+        return chosen, wait
+
+    def _worker(self):
+        """Цикл рабочего потока"""
+        while True:
+            with self._condition:
+                while True:
+                    had_queue = bool(self._queue)
+                    job, wait = self._take_job()
+                    if job is not None:
+                        break
+                    if had_queue and not self._queue:
+                        # Очередь опустела из-за отмененных запросов — будим wait_idle.
+                        # На уже пустой очереди не будим: потоки будили бы друг друга по кругу
+                        self._condition.notify_all()
+                    self._condition.wait(wait)
+                self._in_progress += 1
+                if job['droppable']:
+                    self._droppable_in_progress += 1
+            try:
+                self._execute(job)
+            finally:
+                with self._condition:
+                    self._in_progress -= 1
+                    if job['droppable']:
+                        self._droppable_in_progress -= 1
+                    self._condition.notify_all()
+
+    def _execute(self, job):
+        """Выполняет запрос; на ответ 429 приостанавливает отправку и возвращает запрос в очередь"""
+        method = getattr(job['func'], '__name__', 'unknown')
+        started = time.monotonic()
+        try:
+            result = job['func'](*job['args'], **job['kwargs'])
+        except Exception as e:
+            TELEGRAM_SECONDS.observe(time.monotonic() - started, method)
+            retry_after = retry_after_seconds(e)
+            if retry_after is not None:
+                TELEGRAM_RATE_LIMITED.inc(method)
+            if retry_after is not None and job['retries'] < self.max_retries:
+                self._retry_later(job, retry_after)
+                return
+            TELEGRAM_ERRORS.inc(method)
+            with self._condition:
+                self.stats['errors'] += 1
+            # Необязательные запросы (правки) часто падают из-за удаленного сообщения — это не важно
+            log = logger.debug if job['droppable'] else logger.warning
+            log("Запрос к Telegram %s не выполнен: %s", getattr(job['func'], '__name__', job['func']), e)
+            job['future'].set_exception(e)
+            return
+
+        TELEGRAM_SECONDS.observe(time.monotonic() - started, method)
+        with self._condition:
+            self.stats['sent'] += 1
+        job['future'].set_result(result)
+
+    def _retry_later(self, job, retry_after: float):
+        """Возвращает запрос в очередь с прежним местом и приостанавливает отправку"""
+        logger.warning("Telegram ограничил частоту запросов, пауза %.0fс", retry_after)
+        with self._condition:
+            now = time.monotonic()
+            if job['chat_id'] is not None:
+                self._chat_bucket(job['chat_id']).pause(now, retry_after)
+            else:
+                self._global_bucket.pause(now, retry_after)
+            job['retries'] += 1
+            self.stats['retried'] += 1
+            if job['replace_key'] is not None:
+                if job['replace_key'] in self._by_key:
+                    # Пока ждали, пришла более новая версия запроса
+                    job['future'].set_result(None)
+                    return
+                self._by_key[job['replace_key']] = job
+            heapq.heappush(self._queue, (job['priority'], job['seq'], job))
+            self._waiting += 1
+            self._condition.notify()
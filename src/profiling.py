@@ -0,0 +1,275 @@
+"""
+Профилирование по команде владельца: выборка стеков всех потоков и снимки tracemalloc
+на ограниченное время.
+
+Пока профилирование не запущено, оно ничего не стоит: нет фонового потока, хуков
+sys.setprofile и трассировки выделений памяти. Во время окна отдельный поток раз в
+SAMPLE_INTERVAL_SECONDS читает стеки всех потоков (sys._current_frames()), поэтому
+видно время и в дорожках обработки, и в очереди запросов к Telegram, и в планировщике
+(cProfile видит только поток, в котором включен).
+"""
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Интервал выборки стеков
+SAMPLE_INTERVAL_SECONDS = 0.01
+# Сколько функций и мест выделения памяти показывать в ответе
+TOP_N = 8
+# Глубина стеков: выборка стеков потоков и мест выделения памяти в tracemalloc
+MAX_STACK_DEPTH = 64
+TRACEMALLOC_FRAMES = 16
+# Ограничение длины сообщения Telegram (4096) с запасом
+MAX_SUMMARY_LENGTH = 4000
+
+# Модули, в которых поток ждет (Condition.wait, Queue.get, select цикла событий):
+# такие выборки считаются простоем и не попадают в списки функций
+IDLE_MODULES = ("threading.py", "queue.py", "selectors.py")
+
+
+def parse_window(arg: str | None, default: float, maximum: float) -> float:
+    """
+    Длительность окна из аргумента команды (/profile 60).
+
+    Raises:
+        ValueError: Аргумент не является положительным числом
+    """
+    if not arg:
+        return min(default, maximum)
+    seconds = float(arg)
+    if not seconds > 0:
+        raise ValueError(f"длительность должна быть положительной: {arg}")
+    return min(seconds, maximum)
+
+
+def thread_group(name: str) -> str:
+    """Имя потока без номера: outbound-3 → outbound, dispatch-0 → dispatch"""
+    return re.sub(r"[-_\d]+(\s*\(.*\))?$", "", name) or name
+
+
+def short_path(filename: str) -> str:
+    """Путь относительно текущего каталога; вне его — пакет и файл (python3.11/threading.py)"""
+    try:
+        path = os.path.relpath(filename)
+    except ValueError:
+        path = filename
+    if path.startswith(".."):
+        path = os.path.basename(os.path.dirname(filename)) + "/" + os.path.basename(filename)
+    return path
+
+
+# Кадры запуска потока не попадают в список времени с вызванными функциями
+THREAD_BOOTSTRAP = short_path(threading.__file__) + ":"
+
+
+def frame_key(code) -> str:
+    """Функция в отчете: путь, строка начала, имя"""
+    return f"{short_path(code.co_filename)}:{code.co_firstlineno} {code.co_name}"
+
+
+class Profiler:
+    """
+    Окно профилирования: выборка стеков и tracemalloc на заданное время.
+
+    Одновременно идет не больше одного окна. По окончании полный отчет сохраняется
+    в output_dir (текст со всеми функциями и свернутыми стеками для flamegraph.pl
+    и снимок tracemalloc для tracemalloc.Snapshot.load()), а краткая сводка
+    передается в on_done.
+    """
+
+    def __init__(self, output_dir: str, interval: float = SAMPLE_INTERVAL_SECONDS, top_n: int = TOP_N):
+        """
+        Args:
+            output_dir: Каталог для полных отчетов (создается при первом сохранении)
+            interval: Интервал выборки стеков в секундах
+            top_n: Сколько строк показывать в каждом разделе сводки
+        """
+        self.output_dir = Path(output_dir)
+        self.interval = interval
+        self.top_n = top_n
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self, seconds: float, on_done) -> bool:
+        """
+        Запускает окно профилирования в фоновом потоке.
+
+        Args:
+            seconds: Длительность окна
+            on_done: Вызывается в потоке профилировщика по окончании: on_done(сводка, путь к отчету)
+
+        Returns:
+            False, если профилирование уже идет
+        """
+        with self._lock:
+            if self._thread is not None:
+                return False
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, args=(seconds, on_done), name="profiler", daemon=True
+            )
+            self._thread.start()
+        logger.info(f"Профилирование запущено на {seconds:g} с")
+        return True
+
+    def stop(self) -> bool:
+        """Завершает окно досрочно (отчет все равно сохраняется). False — профилирование не идет"""
+        with self._lock:
+            if self._thread is None:
+                return False
+            self._stop.set()
+            return True
+
+    def _run(self, seconds: float, on_done):
+        """Цикл потока профилировщика"""
+        path = None
+        try:
+            started_tracemalloc = not tracemalloc.is_tracing()
+            if started_tracemalloc:
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+            try:
+                first = tracemalloc.take_snapshot()
+                started = time.monotonic()
+                samples = self._sample(started + seconds)
+                elapsed = time.monotonic() - started
+                last = tracemalloc.take_snapshot()
+            finally:
+                if started_tracemalloc:
+                    tracemalloc.stop()
+            memory = self._memory_growth(first, last)
+            path = self._save(samples, memory, last, elapsed)
+            summary = self._format_summary(samples, memory, elapsed, path)
+        except Exception as e:
+            logger.error(f"Ошибка профилирования: {e}")
+            summary = f"❌ Ошибка профилирования: {e}"
+        finally:
+            with self._lock:
+                self._thread = None
+        logger.info("Профилирование завершено")
+        try:
+            on_done(summary, path)
+        except Exception as e:
+            logger.error(f"Ошибка отправки результатов профилирования: {e}")
+
+    def _sample(self, deadline: float) -> dict:
+        """Выборка стеков всех потоков, кроме своего, до deadline или stop()"""
+        own_id = threading.get_ident()
+        ticks = 0
+        busy = Counter()
+        idle = Counter()
+        self_counts = Counter()
+        total_counts = Counter()
+        stacks = Counter()
+        # Имена функций по объекту кода: путь считается один раз за окно, а не на каждую выборку
+        keys = {}
+        while not self._stop.wait(self.interval) and time.monotonic() < deadline:
+            ticks += 1
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                group = thread_group(names.get(thread_id, "unknown"))
+                if os.path.basename(frame.f_code.co_filename) in IDLE_MODULES:
+                    idle[group] += 1
+                    continue
+                busy[group] += 1
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    key = keys.get(frame.f_code)
+                    if key is None:
+                        key = keys[frame.f_code] = frame_key(frame.f_code)
+                    stack.append(key)
+                    frame = frame.f_back
+                self_counts[stack[0]] += 1
+                for key in set(stack):
+                    # Запуск потока (threading.py) есть в каждом стеке и ничего не говорит
+                    if not key.startswith(THREAD_BOOTSTRAP):
+                        total_counts[key] += 1
+                stacks[(group,) + tuple(reversed(stack))] += 1
+        return {
+            'ticks': ticks, 'busy': busy, 'idle': idle,
+            'self': self_counts, 'total': total_counts, 'stacks': stacks,
+        }
+
+    @staticmethod
+    def _memory_growth(first, last) -> list:
+        """Места выделения памяти по приросту за окно (без самого профилировщика)"""
+        filters = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ]
+        diff = last.filter_traces(filters).compare_to(first.filter_traces(filters), "lineno")
+        return [stat for stat in diff if stat.size_diff > 0]
+
+    def _save(self, samples: dict, memory: list, snapshot, elapsed: float) -> Path | None:
+        """Полный отчет и снимок tracemalloc на диск; None — сохранить не удалось"""
+        base = self.output_dir / time.strftime("profile-%Y%m%d-%H%M%S")
+        try:
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            snapshot.dump(f"{base}.tracemalloc")
+            with open(f"{base}.txt", "w", encoding="utf-8") as f:
+                f.write(f"# Окно {elapsed:.1f} с, выборок {samples['ticks']}, интервал {self.interval * 1000:g} мс\n")
+                f.write("\n# Потоки: занят / простой (выборок)\n")
+                for group in sorted(set(samples['busy']) | set(samples['idle'])):
+                    f.write(f"{group} {samples['busy'][group]} {samples['idle'][group]}\n")
+                f.write("\n# Собственное время (выборок)\n")
+                for key, count in samples['self'].most_common():
+                    f.write(f"{count} {key}\n")
+                f.write("\n# Время с вызванными функциями (выборок)\n")
+                for key, count in samples['total'].most_common():
+                    f.write(f"{count} {key}\n")
+                f.write("\n# Прирост памяти за окно (байт, блоков)\n")
+                for stat in memory:
+                    f.write(f"{stat.size_diff} {stat.count_diff} {stat.traceback}\n")
+                f.write("\n# Свернутые стеки (поток;функция;...;функция выборок), формат flamegraph.pl\n")
+                for stack, count in samples['stacks'].most_common():
+                    f.write(";".join(stack) + f" {count}\n")
+        except OSError as e:
+            logger.error(f"Не удалось сохранить отчет профилирования в {self.output_dir}: {e}")
+            return None
+        return Path(f"{base}.txt")
+
+    def _format_summary(self, samples: dict, memory: list, elapsed: float, path: Path | None) -> str:
+        """Краткая сводка для ответа в Telegram"""
+        busy_total = sum(samples['busy'].values()) or 1
+        lines = [f"🔬 Профиль за {elapsed:.1f} с ({samples['ticks']} выборок по {self.interval * 1000:g} мс)"]
+
+        lines.append("\n🧵 Потоки, занят/всего:")
+        for group, count in samples['busy'].most_common(self.top_n):
+            lines.append(f"{group}: {count}/{count + samples['idle'][group]}")
+        if not samples['busy']:
+            lines.append("все потоки простаивали")
+
+        lines.append("\n⏱ Собственное время:")
+        for key, count in samples['self'].most_common(self.top_n):
+            lines.append(f"{count * 100 / busy_total:.0f}% {key}")
+
+        lines.append("\n📚 С вызванными функциями:")
+        for key, count in samples['total'].most_common(self.top_n):
+            lines.append(f"{count * 100 / busy_total:.0f}% {key}")
+
+        lines.append("\n🧠 Прирост памяти:")
+        for stat in memory[:self.top_n]:
+            frame = stat.traceback[0]
+            lines.append(f"+{stat.size_diff / 1024:.1f} КБ ({stat.count_diff:+d}) {short_path(frame.filename)}:{frame.lineno}")
+        if not memory:
+            lines.append("нет")
+
+        lines.append(f"\n💾 Полный отчет: {path}" if path else "\n💾 Полный отчет не сохранен (см. логи)")
+        summary = "\n".join(lines)
+        if len(summary) > MAX_SUMMARY_LENGTH:
+            summary = summary[:MAX_SUMMARY_LENGTH - 1] + "…"
+        return summary
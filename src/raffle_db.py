@@ -0,0 +1,184 @@
+"""Сохранение розыгрышей в SQLite (режим WAL), чтобы они переживали перезапуск бота"""
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from datetime import date
+
+from src.raffle_store import Raffle
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS raffles (
+    raffle_id TEXT PRIMARY KEY,
+    place_number INTEGER NOT NULL,
+    chat_id INTEGER NOT NULL,
+    message_id INTEGER NOT NULL,
+    start_time REAL NOT NULL,
+    date TEXT NOT NULL,
+    finished INTEGER NOT NULL DEFAULT 0,
+    winner_id INTEGER
+);
+CREATE TABLE IF NOT EXISTS participants (
+    raffle_id TEXT NOT NULL REFERENCES raffles(raffle_id) ON DELETE CASCADE,
+    user_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (raffle_id, user_id)
+);
+CREATE INDEX IF NOT EXISTS raffles_date ON raffles(date);
+"""
+
+# Операции записи: (SQL, параметры)
+INSERT_RAFFLE = (
+    "INSERT OR REPLACE INTO raffles (raffle_id, place_number, chat_id, message_id, start_time, date, finished, winner_id) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+INSERT_PARTICIPANT = (
+    "INSERT OR IGNORE INTO participants (raffle_id, user_id, position) "
+    "VALUES (?, ?, (SELECT COUNT(*) FROM participants WHERE raffle_id = ?))"
+)
+UPDATE_RESULT = "UPDATE raffles SET finished = 1, winner_id = ? WHERE raffle_id = ?"
+DELETE_RAFFLE = "DELETE FROM raffles WHERE raffle_id = ?"
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """Открывает базу в режиме WAL и создает таблицы"""
+    connection = sqlite3.connect(path, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    # В режиме WAL NORMAL не портит базу при сбое, теряются только последние транзакции
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.execute("PRAGMA foreign_keys=ON")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+class RaffleDB:
+    """
+    Журнал розыгрышей в SQLite.
+
+    Методы записи только кладут операцию в очередь (обработчик нажатия не ждет диска);
+    фоновый поток раз в flush_interval записывает накопленные операции одной транзакцией.
+    При сбое теряются операции не старше flush_interval.
+    Победители отдельно не хранятся: это winner_id завершенных розыгрышей.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 0.5):
+        """
+        Args:
+            path: Путь к файлу базы
+            flush_interval: Как часто записывать накопленные операции (в секундах)
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        # Счетчики для мониторинга
+        self.stats = {'written': 0, 'batches': 0, 'errors': 0}
+        self._connection = connect(path)
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def save_raffle(self, raffle: Raffle):
+        """Записывает новый розыгрыш"""
+        self._put(INSERT_RAFFLE, (
+            raffle.raffle_id, raffle.place_number, raffle.chat_id, raffle.message_id,
+            raffle.start_time, raffle.date.isoformat(), int(raffle.finished), raffle.winner_id,
+        ))
+
+    def add_participant(self, raffle_id: str, user_id: int):
+        """Записывает участника (порядок нажатий сохраняется)"""
+        self._put(INSERT_PARTICIPANT, (raffle_id, user_id, raffle_id))
+
+    def save_result(self, raffle: Raffle):
+        """Записывает завершение розыгрыша и победителя"""
+        self._put(UPDATE_RESULT, (raffle.winner_id, raffle.raffle_id))
+
+    def delete(self, raffle_id: str):
+        """Удаляет розыгрыш вместе с участниками"""
+        self._put(DELETE_RAFFLE, (raffle_id,))
+
+    def load(self, raffle_date: date) -> list[Raffle]:
+        """
+        Читает розыгрыши за день (вызывается при запуске, до первых записей).
+
+        Returns:
+            Розыгрыши с участниками, победителем и признаком завершения
+        """
+        raffles = {}
+        rows = self._connection.execute(
+            "SELECT raffle_id, place_number, chat_id, message_id, start_time, finished, winner_id "
+            "FROM raffles WHERE date = ? ORDER BY start_time",
+            (raffle_date.isoformat(),),
+        )
+        for raffle_id, place_number, chat_id, message_id, start_time, finished, winner_id in rows:
+            raffle = Raffle(raffle_id, place_number, chat_id, message_id, start_time=start_time, raffle_date=raffle_date)
+            raffle.finished = bool(finished)
+            raffle.winner_id = winner_id
+            raffles[raffle_id] = raffle
+
+        rows = self._connection.execute(
+            "SELECT p.raffle_id, p.user_id FROM participants p JOIN raffles r USING (raffle_id) "
+            "WHERE r.date = ? ORDER BY p.raffle_id, p.position",
+            (raffle_date.isoformat(),),
+        )
+        for raffle_id, user_id in rows:
+            raffles[raffle_id].participants[user_id] = None
+        return list(raffles.values())
+
+    def delete_not_from(self, raffle_date: date):
+        """Удаляет записи за другие дни"""
+        self._put("DELETE FROM raffles WHERE date != ?", (raffle_date.isoformat(),))
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Ждет, пока все поставленные операции будут записаны"""
+        done = threading.Event()
+        self._put(None, done)
+        return done.wait(timeout)
+
+    def close(self):
+        """Дописывает очередь и закрывает базу"""
+        if self._thread is not None:
+            self.flush()
+        self._connection.close()
+
+    def _put(self, sql, params):
+        self._queue.put((sql, params))
+        if self._thread is None:
+            with self._thread_lock:
+                if self._thread is None:
+                    # Поток создается при первой записи, а не при открытии базы
+                    self._thread = threading.Thread(target=self._run, name="raffle-db", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        """Цикл потока записи: операции за flush_interval записываются одной транзакцией"""
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while batch[-1][0] is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def _write(self, batch):
+        """Записывает пакет операций; события flush() устанавливаются после записи"""
+        waiters = [params for sql, params in batch if sql is None]
+        operations = [(sql, params) for sql, params in batch if sql is not None]
+        if operations:
+            try:
+                with self._connection:
+                    for sql, params in operations:
+                        self._connection.execute(sql, params)
+                self.stats['written'] += len(operations)
+                self.stats['batches'] += 1
+            except sqlite3.Error as e:
+                self.stats['errors'] += 1
+                logger.error("Ошибка записи розыгрышей в базу (%s операций): %s", len(operations), e)
+        for done in waiters:
+            done.set()
@@ -0,0 +1,285 @@
+"""Потокобезопасное хранилище активных розыгрышей"""
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+# Результаты попытки участия в розыгрыше
+JOIN_OK = "ok"
+JOIN_NOT_FOUND = "not_found"   # розыгрыша нет
+JOIN_FINISHED = "finished"     # розыгрыш уже завершен
+JOIN_ALREADY = "already"       # пользователь уже участвует
+JOIN_WINNER = "winner"         # пользователь уже выиграл другой активный розыгрыш
+
+
+class Raffle:
+    """
+    Розыгрыш одного места.
+
+    Участники хранятся в словаре {user_id: None} — это множество с порядком добавления:
+    проверка участия за O(1), порядок нажатий сохраняется.
+    Поля участников и итога меняются только под lock (через RaffleStore).
+    Дата не меняется после добавления в хранилище: по ней розыгрыш находится в корзине дня.
+    """
+
+    __slots__ = (
+        'raffle_id', 'place_number', 'chat_id', 'message_id', 'participants', 'winner_id', 'finished',
+        'start_time', 'date', 'timer', 'update_timer', 'edit_call', 'last_edit_time', 'rendered', 'lock',
+    )
+
+    def __init__(self, raffle_id: str, place_number: int, chat_id: int, message_id: int,
+                 start_time: float | None = None, raffle_date: date | None = None):
+        self.raffle_id = raffle_id
+        self.place_number = place_number
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.participants = {}
+        self.winner_id = None
+        self.finished = False
+        self.start_time = time.time() if start_time is None else start_time
+        self.date = raffle_date or date.today()
+        # Вызовы планировщика: завершение, обновление обратного отсчета, отложенная правка после нажатий
+        self.timer = None
+        self.update_timer = None
+        self.edit_call = None
+        # Время последней правки сообщения и последний отправленный вид (текст, количество участников)
+        self.last_edit_time = time.monotonic()
+        self.rendered = None
+        self.lock = threading.Lock()
+
+
+class RaffleSnapshot(NamedTuple):
+    """Состояние розыгрыша на момент снимка (только для чтения, например для /status)"""
+    raffle_id: str
+    place_number: int
+    chat_id: int
+    participants_count: int
+    winner_id: int | None
+    finished: bool
+
+
+class ChatShard:
+    """Розыгрыши одного чата в порядке создания и победители этих розыгрышей"""
+
+    __slots__ = ('raffles', 'winners')
+
+    def __init__(self):
+        # {raffle_id: Raffle} в порядке создания
+        self.raffles = OrderedDict()
+        self.winners = set()
+
+
+class RaffleStore:
+    """
+    Активные розыгрыши и их победители.
+
+    - Участие и завершение атомарны: выполняются под блокировкой розыгрыша,
+      поэтому нажатия не теряются, а розыгрыш завершается ровно один раз.
+    - Общая блокировка защищает словарь розыгрышей и множество победителей;
+      ее берут после блокировки розыгрыша, никогда наоборот.
+    - Завершенные розыгрыши остаются в хранилище до конца дня: их победители
+      не могут участвовать в других розыгрышах.
+    - Состояние разделено по чатам (ChatShard): лимит, вытеснение самого старого
+      розыгрыша и победители у каждого чата свои — победа в одном чате
+      не мешает участвовать в другом.
+    - Розыгрыши чата хранятся в порядке создания, все розыгрыши — еще и по дням:
+      самый старый находится за O(1), розыгрыши прошедшего дня удаляются всей
+      корзиной без просмотра остальных.
+    - Если задана база (db, см. src/raffle_db.py), изменения дублируются в нее;
+      запись выполняется в фоне и не задерживает нажатия.
+    """
+
+    def __init__(self, db=None):
+        """
+        Args:
+            db: RaffleDB для сохранения розыгрышей между перезапусками (None — только в памяти)
+        """
+        self.db = db
+        # {raffle_id: Raffle} — поиск по ID из нажатия кнопки
+        self._raffles = {}
+        # {chat_id: ChatShard}
+        self._chats = {}
+        # {дата: {raffle_id: None}} — корзины розыгрышей по дню создания
+        self._by_date = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._raffles)
+
+    def __contains__(self, raffle_id: str) -> bool:
+        return raffle_id in self._raffles
+
+    def count(self, chat_id: int) -> int:
+        """Количество розыгрышей в чате"""
+        shard = self._chats.get(chat_id)
+        return len(shard.raffles) if shard else 0
+
+    def add(self, raffle: Raffle):
+        """Добавляет розыгрыш"""
+        with self._lock:
+            self._insert(raffle)
+        if self.db:
+            self.db.save_raffle(raffle)
+
+    def restore(self, raffles: list[Raffle]):
+        """Загружает розыгрыши, прочитанные из базы при запуске (в базу не записываются)"""
+        with self._lock:
+            for raffle in raffles:
+                self._insert(raffle)
+                if raffle.winner_id is not None:
+                    self._chats[raffle.chat_id].winners.add(raffle.winner_id)
+
+    def get(self, raffle_id: str) -> Raffle | None:
+        """Розыгрыш по ID или None"""
+        return self._raffles.get(raffle_id)
+
+    def all(self) -> list[Raffle]:
+        """Все розыгрыши (копия списка)"""
+        with self._lock:
+            return list(self._raffles.values())
+
+    def is_winner(self, chat_id: int, user_id: int) -> bool:
+        """Выиграл ли пользователь один из розыгрышей чата"""
+        with self._lock:
+            shard = self._chats.get(chat_id)
+            return shard is not None and user_id in shard.winners
+
+    def remove(self, raffle_id: str) -> Raffle | None:
+        """Удаляет розыгрыш; его победитель снова может участвовать в других розыгрышах"""
+        with self._lock:
+            return self._remove(raffle_id)
+
+    def remove_oldest(self, chat_id: int) -> Raffle | None:
+        """Удаляет самый старый (раньше всех созданный) розыгрыш чата"""
+        with self._lock:
+            shard = self._chats.get(chat_id)
+            if shard is None:
+                return None
+            return self._remove(next(iter(shard.raffles)))
+
+    def remove_not_from(self, today: date) -> list[Raffle]:
+        """Удаляет розыгрыши, созданные не в указанный день (корзины других дней целиком)"""
+        with self._lock:
+            stale_ids = [
+                raffle_id
+                for raffle_date in list(self._by_date) if raffle_date != today
+                for raffle_id in self._by_date[raffle_date]
+            ]
+            return [self._remove(raffle_id) for raffle_id in stale_ids]
+
+    def clear(self):
+        """Удаляет все розыгрыши и победителей"""
+        with self._lock:
+            self._raffles.clear()
+            self._chats.clear()
+            self._by_date.clear()
+
+    def join(self, raffle_id: str, user_id: int) -> str:
+        """
+        Добавляет пользователя в участники.
+
+        Returns:
+            JOIN_OK или причина отказа (JOIN_NOT_FOUND, JOIN_FINISHED, JOIN_ALREADY, JOIN_WINNER)
+        """
+        raffle = self._raffles.get(raffle_id)
+        if raffle is None:
+            return JOIN_NOT_FOUND
+        with raffle.lock:
+            if raffle.finished:
+                return JOIN_FINISHED
+            if user_id in raffle.participants:
+                return JOIN_ALREADY
+            with self._lock:
+                # Розыгрыш могли удалить, пока ждали блокировку
+                if self._raffles.get(raffle_id) is not raffle:
+                    return JOIN_NOT_FOUND
+                if user_id in self._chats[raffle.chat_id].winners:
+                    return JOIN_WINNER
+            raffle.participants[user_id] = None
+            if self.db:
+                self.db.add_participant(raffle_id, user_id)
+            return JOIN_OK
+
+    def finish(self, raffle_id: str) -> Raffle | None:
+        """
+        Завершает розыгрыш и выбирает победителя (raffle.winner_id, None если участников не было).
+        Участники, уже выигравшие другие активные розыгрыши чата, исключаются.
+
+        Returns:
+            Завершенный розыгрыш или None, если его нет или он уже завершен
+        """
+        raffle = self._raffles.get(raffle_id)
+        if raffle is None:
+            return None
+        with raffle.lock:
+            if raffle.finished:
+                return None
+            with self._lock:
+                # Розыгрыш могли удалить, пока ждали блокировку
+                if self._raffles.get(raffle_id) is not raffle:
+                    return None
+                raffle.finished = True
+                if not raffle.participants:
+                    self._save_result(raffle)
+                    return raffle
+                winners = self._chats[raffle.chat_id].winners
+                eligible_participants = [p for p in raffle.participants if p not in winners]
+                if eligible_participants:
+                    winner_id = random.choice(eligible_participants)
+                else:
+                    # Если все участники уже победители (маловероятно, но на всякий случай),
+                    # выбираем из всех участников
+                    winner_id = random.choice(list(raffle.participants))
+                    logger.warning("Все участники розыгрыша места №%s уже победители, выбран: %s", raffle.place_number, winner_id)
+                # Победитель записывается под общей блокировкой, чтобы remove() его не пропустил
+                winners.add(winner_id)
+                raffle.winner_id = winner_id
+                self._save_result(raffle)
+            return raffle
+
+    def snapshot(self) -> list[RaffleSnapshot]:
+        """Состояние всех розыгрышей на текущий момент"""
+        snapshots = []
+        for raffle in self.all():
+            with raffle.lock:
+                snapshots.append(RaffleSnapshot(
+                    raffle.raffle_id, raffle.place_number, raffle.chat_id,
+                    len(raffle.participants), raffle.winner_id, raffle.finished,
+                ))
+        return snapshots
+
+    def _insert(self, raffle: Raffle):
+        """Добавляет розыгрыш в индексы (под общей блокировкой)"""
+        self._raffles[raffle.raffle_id] = raffle
+        shard = self._chats.get(raffle.chat_id)
+        if shard is None:
+            shard = self._chats[raffle.chat_id] = ChatShard()
+        shard.raffles[raffle.raffle_id] = raffle
+        self._by_date.setdefault(raffle.date, {})[raffle.raffle_id] = None
+
+    def _remove(self, raffle_id: str) -> Raffle | None:
+        """Удаляет розыгрыш (под общей блокировкой)"""
+        raffle = self._raffles.pop(raffle_id, None)
+        if raffle is not None:
+            bucket = self._by_date[raffle.date]
+            del bucket[raffle_id]
+            if not bucket:
+                del self._by_date[raffle.date]
+            shard = self._chats[raffle.chat_id]
+            del shard.raffles[raffle_id]
+            if raffle.winner_id is not None:
+                shard.winners.discard(raffle.winner_id)
+            if not shard.raffles:
+                del self._chats[raffle.chat_id]
+            if self.db:
+                self.db.delete(raffle_id)
+        return raffle
+
+    def _save_result(self, raffle: Raffle):
+        if self.db:
+            self.db.save_result(raffle)
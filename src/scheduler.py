@@ -0,0 +1,165 @@
+"""Планировщик отложенных вызовов: одна куча и один поток вместо threading.Timer на каждый таймер"""
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Отмененные записи остаются в куче до срока; если их накопилось больше,
+# чем живых (и не меньше этого порога), куча пересобирается
+COMPACT_MIN_STALE = 64
+
+
+class ScheduledCall:
+    """Отложенный вызов. Как и threading.Timer, отменяется через cancel()"""
+
+    __slots__ = ('func', 'args', 'when', 'seq', 'cancelled', '_scheduler')
+
+    def __init__(self, scheduler, func, args):
+        self._scheduler = scheduler
+        self.func = func
+        self.args = args
+        self.when = 0.0
+        # Номер актуальной записи в куче (None — вызова нет в куче)
+        self.seq = None
+        self.cancelled = False
+
+    def cancel(self) -> bool:
+        """Отменяет вызов (см. Scheduler.cancel())"""
+        return self._scheduler.cancel(self)
+
+
+class Scheduler:
+    """
+    Выполняет отложенные вызовы в одном фоновом потоке.
+
+    - Вызовы хранятся в куче по времени срабатывания: постановка — O(log n).
+    - Отмена и перенос не ищут запись в куче: старая запись помечается
+      неактуальной и пропускается, когда доходит до вершины.
+    - Вызовы выполняются по очереди в потоке планировщика, поэтому они
+      не должны надолго блокироваться.
+    """
+
+    def __init__(self, name: str = "scheduler"):
+        """
+        Args:
+            name: Имя потока планировщика (видно в логах и отладчике)
+        """
+        self.name = name
+        # Счетчики для мониторинга
+        self.stats = {'scheduled': 0, 'executed': 0, 'cancelled': 0, 'errors': 0}
+        # Куча записей: (время срабатывания, порядковый номер, вызов)
+        self._heap = []
+        self._stale = 0
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def schedule(self, delay: float, func, *args) -> ScheduledCall:
+        """
+        Планирует вызов func(*args) через delay секунд.
+
+        Returns:
+            ScheduledCall — его можно отменить или перенести
+        """
+        call = ScheduledCall(self, func, args)
+        with self._condition:
+            self.stats['scheduled'] += 1
+            self._push(call, delay)
+        return call
+
+    def cancel(self, call: ScheduledCall) -> bool:
+        """
+        Отменяет вызов.
+
+        Returns:
+            True, если вызов еще ожидал срабатывания
+        """
+        with self._condition:
+            if call.cancelled:
+                return False
+            call.cancelled = True
+            if call.seq is None:
+                return False
+            call.seq = None
+            self.stats['cancelled'] += 1
+            self._mark_stale()
+            return True
+
+    def reschedule(self, call: ScheduledCall, delay: float) -> bool:
+        """
+        Переносит вызов на delay секунд от текущего момента.
+        Можно вызывать и из самого вызова, чтобы повторить его; отмененный вызов не возобновляется.
+
+        Returns:
+            True, если вызов запланирован заново
+        """
+        with self._condition:
+            if call.cancelled:
+                return False
+            if call.seq is not None:
+                self._mark_stale()
+            self._push(call, delay)
+            return True
+
+    def pending(self) -> int:
+        """Количество ожидающих вызовов"""
+        with self._condition:
+            return len(self._heap) - self._stale
+
+    def _push(self, call: ScheduledCall, delay: float):
+        """Кладет актуальную запись вызова в кучу (под блокировкой)"""
+        call.when = time.monotonic() + delay
+        call.seq = next(self._counter)
+        heapq.heappush(self._heap, (call.when, call.seq, call))
+        if self._thread is None:
+            # Поток создается при первом вызове, а не при импорте модуля
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+        elif self._heap[0][2] is call:
+            # Новый вызов раньше всех остальных — будим поток, чтобы он пересчитал ожидание
+            self._condition.notify()
+
+    def _mark_stale(self):
+        """Учитывает неактуальную запись и при необходимости пересобирает кучу (под блокировкой)"""
+        self._stale += 1
+        if self._stale >= COMPACT_MIN_STALE and self._stale * 2 > len(self._heap):
+            self._heap = [entry for entry in self._heap if entry[1] == entry[2].seq]
+            heapq.heapify(self._heap)
+            self._stale = 0
+
+    def _run(self):
+        """Цикл потока планировщика"""
+        while True:
+            with self._condition:
+                call = self._next_due()
+            try:
+                call.func(*call.args)
+                outcome = 'executed'
+            except Exception as e:
+                outcome = 'errors'
+                logger.error("Ошибка в отложенном вызове %s: %s", getattr(call.func, '__name__', call.func), e)
+            with self._condition:
+                self.stats[outcome] += 1
+
+    def _next_due(self) -> ScheduledCall:
+        """Ждет ближайший актуальный вызов и снимает его с кучи (под блокировкой)"""
+        while True:
+            if not self._heap:
+                self._condition.wait()
+                continue
+            when, seq, call = self._heap[0]
+            if seq != call.seq:
+                # Отмененная или перенесенная запись
+                heapq.heappop(self._heap)
+                self._stale -= 1
+                continue
+            delay = when - time.monotonic()
+            if delay > 0:
+                self._condition.wait(delay)
+                continue
+            heapq.heappop(self._heap)
+            call.seq = None
+            return call
@@ -17,7 +17,7 @@ def is_allowed_chat(chat_id: int) -> bool:
     """
     is_allowed = chat_id in ALLOWED_CHAT_IDS
     if not is_allowed:
-        logger.warning(f"Попытка доступа из неразрешенного чата: {chat_id}")
+        logger.warning("Попытка доступа из неразрешенного чата: %s", chat_id)
     return is_allowed
 
 
@@ -80,7 +80,7 @@ def check_owner_permission(user_id: int) -> bool:
         True если пользователь является владельцем
     """
     if not is_owner(user_id):
-        logger.warning(f"Попытка доступа от неавторизованного пользователя: {user_id}")
+        logger.warning("Попытка доступа от неавторизованного пользователя: %s", user_id)
         return False
     return True
 
@@ -0,0 +1,59 @@
+"""Кэш имен пользователей из входящих обновлений"""
+import threading
+from collections import OrderedDict
+
+
+class UserCache:
+    """
+    Ограниченный по размеру LRU-кэш имен пользователей Telegram.
+
+    Заполняется из каждого входящего обновления (сообщения, нажатия кнопок),
+    поэтому имя победителя обычно известно без запроса get_chat_member.
+    Каждое новое обновление от пользователя обновляет его имя.
+    """
+
+    def __init__(self, max_size: int):
+        """
+        Args:
+            max_size: Максимальное количество пользователей (0 — кэш выключен)
+        """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        # {user_id: имя для упоминания (username или first_name)}
+        self._names = OrderedDict()
+        self._lock = threading.Lock()
+
+    def remember(self, user):
+        """Запоминает имя пользователя из обновления (telebot.types.User или None)"""
+        if user is None or self.max_size <= 0:
+            return
+        name = user.username or user.first_name
+        if not name:
+            return
+        with self._lock:
+            self._names[user.id] = name
+            self._names.move_to_end(user.id)
+            while len(self._names) > self.max_size:
+                self._names.popitem(last=False)
+
+    def get(self, user_id: int) -> str | None:
+        """Возвращает имя пользователя или None, если его нет в кэше"""
+        with self._lock:
+            name = self._names.get(user_id)
+            if name is None:
+                self.misses += 1
+                return None
+            self._names.move_to_end(user_id)
+            self.hits += 1
+            return name
+
+    def clear(self):
+        """Очищает кэш и счетчики"""
+        with self._lock:
+            self._names.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._names)
@@ -0,0 +1,79 @@
+"""Кэш вердиктов GigaChat для повторяющихся формулировок"""
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# Номера мест маскируются, чтобы "место 12" и "место 14" попадали в одну запись
+DIGITS_PATTERN = re.compile(r'\d+')
+SPACES_PATTERN = re.compile(r'\s+')
+
+
+def normalize_message(message_text: str) -> str:
+    """
+    Приводит текст сообщения к ключу кэша.
+    
+    Args:
+        message_text: Исходный текст сообщения
+        
+    Returns:
+        Текст в нижнем регистре, с маскированными числами и схлопнутыми пробелами
+    """
+    text = DIGITS_PATTERN.sub('#', message_text.lower())
+    return SPACES_PATTERN.sub(' ', text).strip()
+
+
+class VerdictCache:
+    """Ограниченный по размеру LRU-кэш вердиктов с временем жизни записей"""
+    
+    def __init__(self, max_size: int, ttl_seconds: float):
+        """
+        Args:
+            max_size: Максимальное количество записей (0 — кэш выключен)
+            ttl_seconds: Время жизни записи в секундах
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        # {ключ: (вердикт, время истечения)}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, message_text: str) -> bool | None:
+        """
+        Возвращает сохраненный вердикт или None, если записи нет или она устарела.
+        """
+        key = normalize_message(message_text)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+    
+    def put(self, message_text: str, verdict: bool):
+        """Сохраняет вердикт, вытесняя самую давно использованную запись при переполнении"""
+        if self.max_size <= 0:
+            return
+        key = normalize_message(message_text)
+        with self._lock:
+            self._entries[key] = (verdict, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        """Очищает кэш и счетчики"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+    
+    def __len__(self):
+        return len(self._entries)
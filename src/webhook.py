@@ -0,0 +1,157 @@
+"""Прием обновлений Telegram через webhook: встроенный HTTP-сервер вместо long polling"""
+import hmac
+import logging
+import queue
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from telebot import types
+
+logger = logging.getLogger(__name__)
+
+# Заголовок, в котором Telegram передает secret_token из setWebhook
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+# Обновления больше этого размера не принимаются (обычное обновление — несколько килобайт)
+MAX_BODY_BYTES = 1024 * 1024
+
+
+class WebhookServer:
+    """
+    HTTP-сервер для обновлений Telegram.
+
+    - Запрос без правильного секретного токена отклоняется (403).
+    - Обновление кладется в ограниченную очередь, и Telegram сразу получает ответ 200:
+      обработчики не задерживают ответ и следующие обновления.
+    - Если очередь переполнена, отвечаем 503 — Telegram повторит доставку позже.
+    - Один рабочий поток разбирает обновления и передает их тем же обработчикам,
+      что и при long polling (bot.process_new_updates). Поток один, чтобы обновления
+      одного чата доходили до дорожек обработки в порядке поступления.
+    """
+
+    def __init__(self, bot, host: str, port: int, path: str, secret_token: str,
+                 queue_size: int = 100):
+        """
+        Args:
+            bot: TeleBot с зарегистрированными обработчиками
+            host: Адрес, на котором слушает сервер
+            port: Порт (0 — выбрать свободный, см. server_port)
+            path: Путь webhook, например "/webhook"
+            secret_token: Токен, переданный в setWebhook
+            queue_size: Сколько обновлений может ждать обработки
+        """
+        self.bot = bot
+        self.path = path
+        self.secret_token = secret_token
+        # Счетчики для мониторинга
+        self.stats = {'received': 0, 'processed': 0, 'rejected': 0, 'overflow': 0, 'errors': 0}
+        self._stats_lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._threads = []
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+
+    @property
+    def server_port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self):
+        """Запускает сервер и рабочий поток в фоне"""
+        self._start_worker()
+        thread = threading.Thread(target=self._server.serve_forever, name="webhook-server", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def serve_forever(self):
+        """Запускает рабочий поток и обслуживает запросы в текущем потоке (до stop())"""
+        self._start_worker()
+        self._server.serve_forever()
+
+    def stop(self):
+        """Останавливает прием запросов"""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def wait_idle(self, timeout: float = 5.0) -> bool:
+        """Ждет, пока все принятые обновления будут обработаны"""
+        done = threading.Event()
+
+        def wait():
+            self._queue.join()
+            done.set()
+
+        threading.Thread(target=wait, daemon=True).start()
+        return done.wait(timeout)
+
+    def accept(self, headers, body: bytes) -> int:
+        """
+        Проверяет запрос Telegram и ставит обновление в очередь.
+
+        Returns:
+            HTTP-код ответа
+        """
+        token = headers.get(SECRET_HEADER) or ""
+        if not hmac.compare_digest(token.encode(), self.secret_token.encode()):
+            self._count('rejected')
+            return 403
+        try:
+            self._queue.put_nowait(body)
+        except queue.Full:
+            self._count('overflow')
+            logger.warning("Очередь обновлений webhook переполнена, Telegram повторит доставку")
+            return 503
+        self._count('received')
+        return 200
+
+    def _count(self, name: str):
+        # Запросы принимаются в нескольких потоках сервера
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def _start_worker(self):
+        thread = threading.Thread(target=self._worker, name="webhook-worker", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        logger.info(f"Webhook-сервер слушает порт {self.server_port}, путь {self.path}")
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.path != server.path:
+                    self._respond(404)
+                    return
+                length = int(self.headers.get("Content-Length") or 0)
+                if length > MAX_BODY_BYTES:
+                    self._respond(413)
+                    return
+                self._respond(server.accept(self.headers, self.rfile.read(length)))
+
+            def do_GET(self):
+                # Проверка работоспособности для платформы деплоя
+                self._respond(200 if self.path == "/health" else 404)
+
+            def _respond(self, status: int):
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                # Каждый запрос Telegram в лог не пишем
+                logger.debug("Webhook: " + format, *args)
+
+        return Handler
+
+    def _worker(self):
+        """Цикл рабочего потока: разбирает обновление и передает его обработчикам бота"""
+        while True:
+            body = self._queue.get()
+            try:
+                update = types.Update.de_json(body.decode("utf-8"))
+                self.bot.process_new_updates([update])
+                self._count('processed')
+            except Exception as e:
+                self._count('errors')
+                logger.error("Ошибка обработки обновления из webhook: %s", e)
+            finally:
+                self._queue.task_done()
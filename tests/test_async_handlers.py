@@ -0,0 +1,188 @@
+"""Тесты для обработчиков асинхронного режима"""
+import asyncio
+import time
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+from src import async_handlers
+from src.gigachat_client import RULE_UNSURE
+from src.handlers import raffle_store, set_gigachat_client, user_cache
+
+
+class FakeAsyncBot:
+    """Подмена AsyncTeleBot: записывает вызовы"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def reply_to(self, message, text, reply_markup=None):
+        self.calls.append(("reply_to", text))
+        return SimpleNamespace(message_id=message.message_id + 1)
+
+    async def answer_callback_query(self, callback_id, text, show_alert=False):
+        self.calls.append(("answer_callback_query", text))
+
+    async def edit_message_text(self, text, chat_id=None, message_id=None, reply_markup=None):
+        self.calls.append(("edit_message_text", text))
+
+    async def get_chat_member(self, chat_id, user_id):
+        self.calls.append(("get_chat_member", user_id))
+        return SimpleNamespace(user=SimpleNamespace(username=f"user{user_id}", first_name=""))
+
+    async def send_message(self, chat_id, text):
+        self.calls.append(("send_message", text))
+
+    async def delete_message(self, chat_id, message_id):
+        self.calls.append(("delete_message", message_id))
+
+    def texts(self, method):
+        return [text for name, text in self.calls if name == method]
+
+
+def make_message(text, chat_id=-100, message_id=10):
+    return SimpleNamespace(
+        text=text, message_id=message_id,
+        from_user=SimpleNamespace(id=1, username="author", first_name="Автор"),
+        chat=SimpleNamespace(id=chat_id, type="supergroup", title="Дом"),
+    )
+
+
+def make_click(raffle_id, user_id):
+    return SimpleNamespace(id=f"cb{user_id}", data=f"want_{raffle_id}",
+                           from_user=SimpleNamespace(id=user_id, username=f"neighbour{user_id}", first_name="Сосед"))
+
+
+def setup_function():
+    raffle_store.clear()
+    user_cache.clear()
+
+
+def test_raffle_runs_as_task_and_finishes():
+    """Тест: розыгрыш от объявления до победителя в одном цикле событий, нажатия объединяются в правки"""
+    bot = FakeAsyncBot()
+
+    async def scenario():
+        await async_handlers.handle_text_message(bot, make_message("Свободно место 12"))
+        raffle = raffle_store.get("-100_10_12")
+        for user_id in range(1, 21):
+            await async_handlers.handle_callback(bot, make_click(raffle.raffle_id, user_id))
+        await raffle.timer
+
+    with patch.object(async_handlers, 'raffle_timer_seconds', return_value=0.3), \
+         patch.object(async_handlers, 'BUTTON_EDIT_INTERVAL_SECONDS', 0.05):
+        asyncio.run(scenario())
+
+    raffle = raffle_store.get("-100_10_12")
+    assert raffle.finished and raffle.winner_id in range(1, 21)
+    assert len(bot.texts("answer_callback_query")) == 20
+    assert 1 <= len(bot.texts("edit_message_text")) <= 3
+    # Имя победителя известно по его нажатию — без запроса get_chat_member
+    assert f"@neighbour{raffle.winner_id}" in bot.texts("send_message")[0]
+    assert bot.texts("get_chat_member") == []
+    assert bot.texts("delete_message") == [11]
+
+
+def test_unsure_message_is_checked_off_the_event_loop():
+    """Тест: запрос к GigaChat выполняется в потоке, цикл событий в это время не блокируется"""
+    bot = FakeAsyncBot()
+    client = Mock()
+    client.check_without_llm.return_value = (RULE_UNSURE, 12, 0)
+    client.ask_llm.side_effect = lambda text, place: time.sleep(0.2) or (True, place)
+    ticks = []
+
+    async def ticker():
+        for _ in range(10):
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.01)
+
+    async def scenario():
+        await asyncio.gather(async_handlers.handle_text_message(bot, make_message("Место 12 кому-нибудь?")), ticker())
+        raffle_store.get("-100_10_12").timer.cancel()
+
+    set_gigachat_client(client)
+    try:
+        asyncio.run(scenario())
+    finally:
+        set_gigachat_client(None)
+
+    assert len(ticks) == 10 and ticks[-1] - ticks[0] < 0.2
+    assert bot.texts("reply_to")
+
+
+def test_llm_deadline_falls_back_to_rules():
+    """Тест: GigaChat не ответил в срок — розыгрыш не запускается"""
+    bot = FakeAsyncBot()
+    client = Mock()
+    client.check_without_llm.return_value = (RULE_UNSURE, 12, 0)
+    client.ask_llm.side_effect = lambda text, place: time.sleep(0.3) or (True, place)
+
+    set_gigachat_client(client)
+    try:
+        with patch.object(async_handlers, 'LLM_DEADLINE_SECONDS', 0.05):
+            asyncio.run(async_handlers.handle_text_message(bot, make_message("Место 12 кому-нибудь?")))
+    finally:
+        set_gigachat_client(None)
+
+    assert bot.calls == []
+    assert len(raffle_store) == 0
+
+
+def test_timed_out_llm_calls_keep_their_slots():
+    """Тест: запрос к GigaChat, не уложившийся в срок, занимает поток до конца — одновременных не больше LLM_WORKERS"""
+    bot = FakeAsyncBot()
+    client = Mock()
+    client.check_without_llm.return_value = (RULE_UNSURE, 12, 0)
+    active = []
+    peak = []
+
+    def slow_ask_llm(text, place):
+        active.append(1)
+        peak.append(len(active))
+        time.sleep(0.2)
+        active.pop()
+        return True, place
+
+    client.ask_llm.side_effect = slow_ask_llm
+
+    async def scenario():
+        await asyncio.gather(*(
+            async_handlers.handle_text_message(bot, make_message("Место 12 кому-нибудь?", message_id=i))
+            for i in range(4)
+        ))
+
+    set_gigachat_client(client)
+    try:
+        with patch.object(async_handlers, 'LLM_DEADLINE_SECONDS', 0.05), \
+             patch.object(async_handlers, '_llm_executor', None), \
+             patch.object(async_handlers, 'LLM_WORKERS', 1):
+            asyncio.run(scenario())
+            time.sleep(0.5)
+    finally:
+        set_gigachat_client(None)
+
+    assert bot.calls == []
+    assert max(peak) == 1
+
+
+def test_concurrent_announcements_respect_chat_limit():
+    """Тест: объявления одного чата, пришедшие одновременно, не превышают лимит розыгрышей"""
+    class SlowReplyBot(FakeAsyncBot):
+        async def reply_to(self, message, text, reply_markup=None):
+            await asyncio.sleep(0.05)
+            return await super().reply_to(message, text, reply_markup)
+
+    bot = SlowReplyBot()
+
+    async def scenario():
+        await asyncio.gather(*(
+            async_handlers.handle_text_message(bot, make_message(f"Свободно место {place}", message_id=place * 10))
+            for place in (11, 12, 13)
+        ))
+        for raffle in raffle_store.all():
+            raffle.timer.cancel()
+
+    with patch.object(async_handlers, 'max_active_raffles', return_value=1), \
+         patch('src.handlers.outbound'):
+        asyncio.run(scenario())
+
+    assert raffle_store.count(-100) == 1
+    assert len(bot.texts("reply_to")) == 3
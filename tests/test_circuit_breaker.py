@@ -0,0 +1,72 @@
+"""Тесты для автоматического выключателя GigaChat"""
+from unittest.mock import patch, MagicMock
+from src.circuit_breaker import CircuitBreaker, STATE_CLOSED, STATE_OPEN, STATE_HALF_OPEN
+
+
+def test_opens_after_consecutive_failures():
+    """Тест открытия после серии ошибок подряд"""
+    breaker = CircuitBreaker(failure_threshold=3, slow_call_seconds=10, open_seconds=60)
+    
+    for _ in range(2):
+        assert breaker.allow_request()
+        breaker.record_failure()
+    assert breaker.state == STATE_CLOSED
+    
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == STATE_OPEN
+    assert not breaker.allow_request()
+
+
+def test_success_resets_failures():
+    """Тест сброса счетчика ошибок после успешного ответа"""
+    breaker = CircuitBreaker(failure_threshold=2, slow_call_seconds=10, open_seconds=60)
+    breaker.record_failure()
+    breaker.record_success(0.5)
+    breaker.record_failure()
+    assert breaker.state == STATE_CLOSED
+
+
+def test_slow_call_counts_as_failure():
+    """Тест: слишком медленный ответ считается ошибкой"""
+    breaker = CircuitBreaker(failure_threshold=1, slow_call_seconds=2, open_seconds=60)
+    breaker.record_success(5.0)
+    assert breaker.state == STATE_OPEN
+
+
+def test_half_open_trial():
+    """Тест пробного запроса после паузы"""
+    breaker = CircuitBreaker(failure_threshold=1, slow_call_seconds=10, open_seconds=60)
+    with patch('src.circuit_breaker.time.monotonic', return_value=1000.0):
+        breaker.record_failure()
+    
+    with patch('src.circuit_breaker.time.monotonic', return_value=1061.0):
+        # Пропускается только один пробный запрос
+        assert breaker.allow_request()
+        assert breaker.state == STATE_HALF_OPEN
+        assert not breaker.allow_request()
+        # Ошибка пробного запроса снова открывает выключатель
+        breaker.record_failure()
+        assert breaker.state == STATE_OPEN
+    
+    with patch('src.circuit_breaker.time.monotonic', return_value=1122.0):
+        assert breaker.allow_request()
+        breaker.record_success(0.5)
+    assert breaker.state == STATE_CLOSED
+
+
+def test_gigachat_client_rule_only_while_open():
+    """Тест: при открытом выключателе GigaChat не вызывается"""
+    from src.gigachat_client import GigaChatClient
+    
+    client = GigaChatClient()
+    client.breaker = CircuitBreaker(failure_threshold=2, slow_call_seconds=10, open_seconds=60)
+    
+    with patch.object(client.client, 'chat', side_effect=Exception("API Error")) as mock_chat:
+        assert client.check_parking_message("Сегодня 5 градусов") == (False, None)
+        assert client.check_parking_message("Сегодня 7 градусов") == (False, None)
+        assert client.breaker.state == STATE_OPEN
+        
+        assert client.check_parking_message("Сегодня 9 градусов") == (False, None)
+        assert mock_chat.call_count == 2
+    assert "недоступен" in client.breaker.describe()
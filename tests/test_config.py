@@ -38,3 +38,21 @@ def test_config_values_loaded():
     assert GIGACHAT_CLIENT_ID is not None or os.getenv("GIGACHAT_CLIENT_ID") is None
     assert GIGACHAT_CLIENT_SECRET is not None or os.getenv("GIGACHAT_CLIENT_SECRET") is None
 
+
+
+def test_parse_places():
+    """Проверка разбора списка номеров мест с диапазонами"""
+    from src.config import parse_places
+    
+    assert parse_places("") is None
+    assert parse_places("1-3, 7,10-11") == frozenset({1, 2, 3, 7, 10, 11})
+    assert parse_places("5") == frozenset({5})
+
+
+def test_parse_by_chat():
+    """Проверка разбора настроек для отдельных чатов"""
+    from src.config import parse_by_chat, parse_places
+    
+    assert parse_by_chat("", int) == {}
+    assert parse_by_chat("-1001:60; -1002:180", int) == {-1001: 60, -1002: 180}
+    assert parse_by_chat("-1001:1-3,5", parse_places) == {-1001: frozenset({1, 2, 3, 5})}
@@ -0,0 +1,58 @@
+"""Тесты для распределения обновлений по дорожкам чатов"""
+import threading
+import time
+from src.dispatcher import ChatDispatcher
+
+
+def test_updates_of_one_chat_keep_order():
+    """Тест: обновления одного чата выполняются по порядку поступления"""
+    dispatcher = ChatDispatcher(lanes=4, queue_size=1000)
+    handled = {-100: [], -101: []}
+
+    def handle(chat_id, number):
+        # Случайные паузы перемешали бы порядок в общем пуле потоков
+        time.sleep(0.001 * (number % 3))
+        handled[chat_id].append(number)
+
+    for number in range(50):
+        for chat_id in handled:
+            assert dispatcher.submit(chat_id, handle, chat_id, number)
+    assert dispatcher.wait_idle()
+
+    assert handled[-100] == list(range(50))
+    assert handled[-101] == list(range(50))
+    assert dispatcher.stats['processed'] == 100
+
+
+def test_slow_chat_does_not_block_other_chats():
+    """Тест: медленная обработка в одном чате не задерживает другой чат"""
+    dispatcher = ChatDispatcher(lanes=2, queue_size=10)
+    release = threading.Event()
+    handled = threading.Event()
+    slow_chat, fast_chat = -100, -101
+    assert dispatcher.lane(slow_chat) != dispatcher.lane(fast_chat)
+
+    dispatcher.submit(slow_chat, release.wait, 5)
+    dispatcher.submit(fast_chat, handled.set)
+    assert handled.wait(1)
+    release.set()
+    assert dispatcher.wait_idle()
+
+
+def test_full_lane_drops_updates_and_reports_depth():
+    """Тест: переполненная дорожка отбрасывает обновления, ошибка обработчика не останавливает ее"""
+    dispatcher = ChatDispatcher(lanes=1, queue_size=2)
+    started = threading.Event()
+    release = threading.Event()
+
+    dispatcher.submit(-100, lambda: started.set() or release.wait(5))
+    assert started.wait(1)
+    results = [dispatcher.submit(-100, lambda: 1 / 0) for _ in range(3)]
+    assert results == [True, True, False]
+    assert dispatcher.depths() == [2]
+    release.set()
+    assert dispatcher.wait_idle()
+
+    assert dispatcher.stats['dropped'] == 1
+    assert dispatcher.stats['errors'] == 2
+    assert dispatcher.stats['max_depth'] == 2
@@ -1,5 +1,6 @@
 """Тесты для клиента GigaChat"""
 from unittest.mock import Mock, patch, MagicMock
+import pytest
 from src.gigachat_client import GigaChatClient
 
 
@@ -125,3 +126,145 @@ def test_check_parking_message_gigachat_error():
         assert is_parking == False
         assert place_num is None
 
+
+
+def test_match_rules_verdicts():
+    """Тест однопроходных правил распознавания"""
+    from src.gigachat_client import match_rules, RULE_PARKING, RULE_NOT_PARKING, RULE_UNSURE
+    
+    assert match_rules("Место 5 свободно") == (RULE_PARKING, 5)
+    assert match_rules("Место 5 занято") == (RULE_NOT_PARKING, None)
+    assert match_rules("Где свободное место 3") == (RULE_NOT_PARKING, None)
+    assert match_rules("Привет всем") == (RULE_NOT_PARKING, None)
+    assert match_rules("Отдам место 31 до вечера") == (RULE_UNSURE, 31)
+
+
+def test_match_rules_same_as_legacy():
+    """Тест совпадения вердиктов с прежней реализацией правил"""
+    from src.gigachat_client import match_rules, RULE_PARKING, RULE_NOT_PARKING
+    from benchmarks.bench_rules import SAMPLE_MESSAGES, legacy_match_rules, comparable_messages
+    
+    for message in comparable_messages(SAMPLE_MESSAGES):
+        assert match_rules(message) == legacy_match_rules(message), f"Расхождение для: {message}"
+
+
+def test_match_rules_ignores_time_and_dates():
+    """Тест: время и даты не считаются номерами мест"""
+    from src.gigachat_client import match_rules, RULE_PARKING, RULE_NOT_PARKING
+    
+    assert match_rules("Завтра отключат воду с 10:00 до 14") == (RULE_NOT_PARKING, None)
+    assert match_rules("Место 5 свободно до 18") == (RULE_PARKING, 5)
+    assert match_rules("Свободно место 7 с 9:00 до 18.00") == (RULE_PARKING, 7)
+    assert match_rules("Свободно место 3 с 9 утра, заберите к 18ч") == (RULE_PARKING, 3)
+    assert match_rules("Свободно место 12.05.2025") == (RULE_NOT_PARKING, None)
+
+
+def test_match_rules_keeps_places_after_prepositions():
+    """Тест: "с" и "к" перед числом без минут и единиц времени не делают его временем"""
+    from src.gigachat_client import match_rules, extract_places, RULE_UNSURE, RULE_PARKING
+    
+    assert match_rules("подъезжайте к 12 месту") == (RULE_UNSURE, 12)
+    assert extract_places("подъезжайте к 12 месту") == [12]
+    assert match_rules("место с 5 по 7 свободны") == (RULE_PARKING, 5)
+    assert extract_places("место с 5 по 7 свободны") == [5]
+    assert extract_places("место с 5 по 7 свободны", frozenset(range(1, 11))) == [5, 7]
+
+
+def test_scan_rules_place_inventory():
+    """Тест: числа не из списка мест чата отбрасываются сразу"""
+    from src.gigachat_client import scan_rules, RULE_PARKING, RULE_NOT_PARKING
+    
+    places = frozenset(range(1, 51))
+    assert scan_rules("Освободилось место 300", places) == (RULE_NOT_PARKING, None, 0)
+    assert scan_rules("Освободилось место 300, а еще 12", places) == (RULE_PARKING, 12, 1)
+    assert scan_rules("Освободилось место 300") == (RULE_PARKING, 300, 1)
+
+
+def test_extract_places():
+    """Тест извлечения всех номеров мест из объявления"""
+    from src.gigachat_client import extract_places
+    
+    assert extract_places("места 12 и 47 свободны") == [12, 47]
+    assert extract_places("Места 3, 5, 3 свободны с 9:00 до 18") == [3, 5]
+    assert extract_places("места 12 и 470 свободны", frozenset(range(1, 101))) == [12]
+    assert extract_places("Свободно до 18") == []
+
+
+def test_extract_places_without_inventory_ignores_other_numbers():
+    """Тест: без списка мест этажи, телефоны и сроки не становятся номерами мест"""
+    from src.gigachat_client import extract_places
+    
+    assert extract_places("Место 5 свободно, я на 3 этаже, звоните 89161234567") == [5]
+    assert extract_places("место 7 свободно 2 дня") == [7]
+    assert extract_places("Я на 3 этаже, место №5 свободно") == [5]
+    assert extract_places("Освободилось 15, до 18:00") == [15]
+    assert extract_places("места 12 и 18:00 свободны") == [12]
+    assert extract_places("Свободное место 12 и 47, еще 300 до 18:00") == [12, 47]
+
+
+def test_check_parking_message_uses_verdict_cache():
+    """Тест повторного ответа из кэша без запроса к GigaChat"""
+    client = GigaChatClient()
+    
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock()]
+    mock_response.choices[0].message.content = "да"
+    
+    with patch.object(client.client, 'chat', return_value=mock_response) as mock_chat:
+        assert client.check_parking_message("Отдам место 12 до вечера") == (True, 12)
+        # Та же формулировка с другим номером — номер берется из исходного текста
+        assert client.check_parking_message("Отдам место 14 до вечера") == (True, 14)
+        assert mock_chat.call_count == 1
+    
+    assert client.verdict_cache.hits == 1
+
+
+def test_parse_batch_answer():
+    """Тест разбора пакетного ответа GigaChat"""
+    from src.gigachat_client import parse_batch_answer
+    
+    assert parse_batch_answer("1. да\n2. нет\n3) Да", 3) == [True, False, True]
+    # Неполный ответ или лишние номера не принимаются
+    assert parse_batch_answer("1. да\n2. нет", 3) is None
+    assert parse_batch_answer("1. да\n2. нет\n4. да", 2) is None
+    assert parse_batch_answer("Не могу ответить", 2) is None
+
+
+def test_ask_llm_batch_single_request():
+    """Тест пакетной проверки нескольких сообщений одним запросом"""
+    client = GigaChatClient()
+    
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock()]
+    mock_response.choices[0].message.content = "1. да\n2. нет"
+    
+    with patch.object(client.client, 'chat', return_value=mock_response) as mock_chat:
+        results = client.ask_llm_batch([("Отдам место 12 до вечера", 12), ("Сегодня 15 градусов", 15)])
+        assert results == [(True, 12), (False, None)]
+        assert mock_chat.call_count == 1
+
+
+def test_ask_llm_batch_fallback_to_single():
+    """Тест проверки по одному, если пакетный ответ не разобран"""
+    client = GigaChatClient()
+    
+    def make_response(content):
+        response = MagicMock()
+        response.choices = [MagicMock()]
+        response.choices[0].message.content = content
+        return response
+    
+    responses = [make_response("Первое похоже на объявление"), make_response("да"), make_response("нет")]
+    with patch.object(client.client, 'chat', side_effect=responses) as mock_chat:
+        results = client.ask_llm_batch([("Отдам место 12 до вечера", 12), ("Сегодня 15 градусов", 15)])
+        assert results == [(True, 12), (False, None)]
+        assert mock_chat.call_count == 3
+
+
+def test_ask_llm_batch_error_is_raised():
+    """Тест: ошибка пакетного запроса передается LLMStage, чтобы она была учтена в stats"""
+    client = GigaChatClient()
+    
+    with patch.object(client.client, 'chat', side_effect=ConnectionError("timeout")):
+        with pytest.raises(ConnectionError):
+            client.ask_llm_batch([("Отдам место 12 до вечера", 12), ("Сегодня 15 градусов", 15)])
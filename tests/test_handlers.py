@@ -1,16 +1,40 @@
 """Тесты для обработчиков сообщений"""
+import threading
 import time
 from unittest.mock import Mock, MagicMock, patch
+from src import handlers
 from src.handlers import (
     finish_raffle,
     remove_oldest_raffle,
-    active_raffles,
+    handle_text_message,
+    raffle_store,
+    user_cache,
 )
+from src.outbound import OutboundQueue
+from src.raffle_store import Raffle
+
+# Очередь запросов к Telegram без ограничений частоты, чтобы тесты не ждали токенов
+fast_outbound = OutboundQueue(2, 1000, 10000, 10000, 10000, 10000)
+outbound_patch = patch.object(handlers, 'outbound', fast_outbound)
 
 
 def setup_function():
     """Очистка активных розыгрышей перед каждым тестом"""
-    active_raffles.clear()
+    raffle_store.clear()
+    user_cache.clear()
+    outbound_patch.start()
+
+
+def teardown_function():
+    outbound_patch.stop()
+
+
+def add_raffle(raffle_id, place_number, participants=(), message_id=1, chat_id=-100, start_time=None):
+    """Добавляет розыгрыш в хранилище"""
+    raffle = Raffle(raffle_id, place_number, chat_id, message_id, start_time=start_time)
+    raffle.participants = dict.fromkeys(participants)
+    raffle_store.add(raffle)
+    return raffle
 
 
 def test_finish_raffle_with_winner():
@@ -23,24 +47,15 @@ def test_finish_raffle_with_winner():
     mock_bot.delete_message = Mock()
     
     raffle_id = "test_raffle_1"
-    from datetime import date
-    active_raffles[raffle_id] = {
-        'place_number': 5,
-        'participants': [123, 456, 789],
-        'message_id': 100,
-        'chat_id': -100,
-        'timer': None,
-        'timestamp': time.time(),
-        'date': date.today(),
-        'winner_id': None
-    }
+    add_raffle(raffle_id, 5, [123, 456, 789], message_id=100)
     
     # Запускаем завершение розыгрыша
     finish_raffle(mock_bot, raffle_id)
+    assert fast_outbound.wait_idle()
     
     # Проверяем, что розыгрыш остался в памяти (не удаляется сразу, только в конце дня)
-    assert raffle_id in active_raffles
-    winner_id = active_raffles[raffle_id]['winner_id']
+    assert raffle_id in raffle_store
+    winner_id = raffle_store.get(raffle_id).winner_id
     assert winner_id is not None  # Победитель должен быть выбран
     assert winner_id in [123, 456, 789]  # Победитель должен быть одним из участников
     
@@ -53,29 +68,91 @@ def test_finish_raffle_with_winner():
     assert "@test_user" in message_text
 
 
+def test_winner_name_comes_from_user_cache():
+    """Тест: имя победителя берется из его нажатия, get_chat_member — только при промахе кэша"""
+    from src.handlers import handle_callback
+    mock_bot = Mock()
+    add_raffle("cached", 5, message_id=100)
+    call = Mock()
+    call.data = "want_cached"
+    call.from_user.id = 123
+    call.from_user.username = "neighbour"
+    handle_callback(mock_bot, call)
+    add_raffle("restored", 6, [456], message_id=101)
+    mock_bot.get_chat_member.return_value.user.id = 456
+    mock_bot.get_chat_member.return_value.user.username = "from_api"
+
+    finish_raffle(mock_bot, "cached")
+    finish_raffle(mock_bot, "restored")
+    assert fast_outbound.wait_idle()
+
+    texts = [call_args[0][1] for call_args in mock_bot.send_message.call_args_list]
+    assert "@neighbour" in texts[0] and "@from_api" in texts[1]
+    mock_bot.get_chat_member.assert_called_once_with(-100, 456)
+    # После запроса к Telegram имя тоже запоминается
+    assert user_cache.get(456) == "from_api"
+
+
+def test_finish_raffle_does_not_wait_for_winner_lookup():
+    """Тест: поток планировщика не ждет get_chat_member — итоги уходят, когда придет ответ"""
+    mock_bot = Mock()
+    lookup_started = threading.Event()
+
+    def slow_get_chat_member(chat_id, user_id):
+        lookup_started.set()
+        time.sleep(0.5)
+        raise ConnectionError("timeout")
+
+    mock_bot.get_chat_member.side_effect = slow_get_chat_member
+    add_raffle("slow", 7, [789], message_id=102)
+
+    started = time.monotonic()
+    finish_raffle(mock_bot, "slow")
+    elapsed = time.monotonic() - started
+    assert lookup_started.wait(1)
+    assert elapsed < 0.1
+    assert fast_outbound.wait_idle()
+
+    text = mock_bot.send_message.call_args[0][1]
+    assert "@пользователь" in text
+    mock_bot.delete_message.assert_called_once_with(-100, 102)
+
+
+def test_final_delete_is_not_dropped_under_load():
+    """Тест: при переполненной очереди удаление сообщения розыгрыша не отбрасывается"""
+    from src.outbound import PRIORITY_EDIT
+    mock_bot = Mock()
+    release = threading.Event()
+    started = threading.Event()
+    outbound = OutboundQueue(1, 1, 10000, 10000, 10000, 10000)
+    outbound.submit(None, 0, lambda: started.set() or release.wait(2))
+    assert started.wait(1)
+    outbound.submit(-100, PRIORITY_EDIT, mock_bot.edit_message_text, "правка", droppable=True)
+    add_raffle("busy", 8, message_id=103)
+
+    with patch.object(handlers, 'outbound', outbound):
+        finish_raffle(mock_bot, "busy")
+        release.set()
+        assert outbound.wait_idle()
+
+    mock_bot.delete_message.assert_called_once_with(-100, 103)
+    assert not mock_bot.edit_message_text.called
+
+
 def test_finish_raffle_no_participants():
     """Тест завершения розыгрыша без участников"""
     mock_bot = Mock()
     mock_bot.delete_message = Mock()
     
     raffle_id = "test_raffle_2"
-    from datetime import date
-    active_raffles[raffle_id] = {
-        'place_number': 3,
-        'participants': [],
-        'message_id': 101,
-        'chat_id': -100,
-        'timer': None,
-        'timestamp': time.time(),
-        'date': date.today(),
-        'winner_id': None
-    }
+    add_raffle(raffle_id, 3, message_id=101)
     
     # Запускаем завершение розыгрыша
     finish_raffle(mock_bot, raffle_id)
+    assert fast_outbound.wait_idle()
     
     # Проверяем, что розыгрыш остался в памяти (даже без участников)
-    assert raffle_id in active_raffles
+    assert raffle_id in raffle_store
     
     # Проверяем, что отправлено сообщение о том, что место все еще свободно
     assert mock_bot.send_message.called
@@ -103,38 +180,17 @@ def test_remove_oldest_raffle():
     
     # Создаем несколько розыгрышей с разными timestamp
     current_time = time.time()
-    active_raffles["raffle_1"] = {
-        'place_number': 1,
-        'participants': [],
-        'message_id': 1,
-        'chat_id': -100,
-        'timer': None,
-        'timestamp': current_time - 100  # Самый старый
-    }
-    active_raffles["raffle_2"] = {
-        'place_number': 2,
-        'participants': [],
-        'message_id': 2,
-        'chat_id': -100,
-        'timer': None,
-        'timestamp': current_time - 50
-    }
-    active_raffles["raffle_3"] = {
-        'place_number': 3,
-        'participants': [],
-        'message_id': 3,
-        'chat_id': -100,
-        'timer': None,
-        'timestamp': current_time  # Самый новый
-    }
+    add_raffle("raffle_1", 1, message_id=1, start_time=current_time - 100)
+    add_raffle("raffle_2", 2, message_id=2, start_time=current_time - 50)
+    add_raffle("raffle_3", 3, message_id=3, start_time=current_time)
     
     # Удаляем самый старый
-    remove_oldest_raffle(mock_bot)
+    remove_oldest_raffle(mock_bot, -100)
     
     # Проверяем, что самый старый удален
-    assert "raffle_1" not in active_raffles
-    assert "raffle_2" in active_raffles
-    assert "raffle_3" in active_raffles
+    assert "raffle_1" not in raffle_store
+    assert "raffle_2" in raffle_store
+    assert "raffle_3" in raffle_store
 
 
 def test_remove_oldest_raffle_with_timer():
@@ -144,24 +200,15 @@ def test_remove_oldest_raffle_with_timer():
     mock_timer.cancel = Mock()
     
     raffle_id = "raffle_with_timer"
-    from datetime import date
-    active_raffles[raffle_id] = {
-        'place_number': 1,
-        'participants': [],
-        'message_id': 1,
-        'chat_id': -100,
-        'timer': mock_timer,
-        'timestamp': time.time() - 100,
-        'date': date.today(),
-        'winner_id': None
-    }
+    raffle = add_raffle(raffle_id, 1, message_id=1, start_time=time.time() - 100)
+    raffle.timer = mock_timer
     
     # Удаляем розыгрыш
-    remove_oldest_raffle(mock_bot)
+    remove_oldest_raffle(mock_bot, -100)
     
     # Проверяем, что таймер был отменен
     assert mock_timer.cancel.called
-    assert raffle_id not in active_raffles
+    assert raffle_id not in raffle_store
 
 
 def test_remove_oldest_raffle_empty():
@@ -169,18 +216,17 @@ def test_remove_oldest_raffle_empty():
     mock_bot = Mock()
     
     # Убеждаемся, что словарь пуст
-    assert len(active_raffles) == 0
+    assert len(raffle_store) == 0
     
     # Пытаемся удалить (не должно быть ошибки)
-    remove_oldest_raffle(mock_bot)
+    remove_oldest_raffle(mock_bot, -100)
     
     # Словарь должен остаться пустым
-    assert len(active_raffles) == 0
+    assert len(raffle_store) == 0
 
 
 def test_finish_raffle_excludes_previous_winner():
     """Тест исключения уже выигравшего пользователя из выбора победителя"""
-    from src.handlers import active_winners
     mock_bot = Mock()
     mock_bot.get_chat_member.return_value = MagicMock()
     mock_bot.get_chat_member.return_value.user = MagicMock()
@@ -188,54 +234,357 @@ def test_finish_raffle_excludes_previous_winner():
     mock_bot.send_message = Mock()
     mock_bot.delete_message = Mock()
     
-    # Очищаем активных победителей
-    active_winners.clear()
-    
     # Создаем первый розыгрыш и завершаем его (пользователь 123 выигрывает)
     raffle_id_1 = "test_raffle_1"
-    from datetime import date
-    active_raffles[raffle_id_1] = {
-        'place_number': 1,
-        'participants': [123, 456],
-        'message_id': 100,
-        'chat_id': -100,
-        'timer': None,
-        'timestamp': time.time(),
-        'date': date.today(),
-        'winner_id': None
-    }
+    add_raffle(raffle_id_1, 1, [123, 456], message_id=100)
     
     finish_raffle(mock_bot, raffle_id_1)
     
     # Проверяем, что был выбран победитель и он добавлен в список победителей
-    winner_id_1 = active_raffles[raffle_id_1]['winner_id']
+    winner_id_1 = raffle_store.get(raffle_id_1).winner_id
     assert winner_id_1 is not None
     assert winner_id_1 in [123, 456]  # Победитель должен быть одним из участников
-    assert winner_id_1 in active_winners
+    assert raffle_store.is_winner(-100, winner_id_1)
     
     # Создаем второй розыгрыш, где участвует победитель первого розыгрыша
     raffle_id_2 = "test_raffle_2"
-    active_raffles[raffle_id_2] = {
-        'place_number': 2,
-        'participants': [winner_id_1, 456, 789],  # Победитель первого розыгрыша участвует
-        'message_id': 101,
-        'chat_id': -100,
-        'timer': None,
-        'timestamp': time.time(),
-        'date': date.today(),
-        'winner_id': None
-    }
+    add_raffle(raffle_id_2, 2, [winner_id_1, 456, 789], message_id=101)
     
     # Завершаем второй розыгрыш
     finish_raffle(mock_bot, raffle_id_2)
     
     # Проверяем, что победитель второго розыгрыша НЕ является победителем первого
-    winner_id_2 = active_raffles[raffle_id_2]['winner_id']
+    winner_id_2 = raffle_store.get(raffle_id_2).winner_id
     assert winner_id_2 != winner_id_1
     assert winner_id_2 in [456, 789]  # Победитель должен быть из других участников
     
-    # Очищаем
-    del active_raffles[raffle_id_1]
-    del active_raffles[raffle_id_2]
-    active_winners.clear()
+    # После удаления первого розыгрыша его победитель снова может участвовать
+    raffle_store.remove(raffle_id_1)
+    assert not raffle_store.is_winner(-100, winner_id_1)
+
+
+
+def test_handle_text_message_does_not_wait_for_gigachat():
+    """Тест, что обработчик не ждет ответа GigaChat для спорных сообщений"""
+    import threading
+    from src import handlers
+    from src.llm_stage import LLMStage
+    
+    release = threading.Event()
+    answered = threading.Event()
+    
+    def slow_classify(text, place):
+        release.wait(2)
+        return True, place
+    
+    mock_bot = Mock()
+    mock_bot.reply_to.return_value.message_id = 200
+    mock_bot.reply_to.side_effect = lambda *args, **kwargs: answered.set() or mock_bot.reply_to.return_value
+    message = MagicMock()
+    message.text = "Отдам место 12 до вечера"
+    message.chat.id = -100
+    message.message_id = 10
+    
+    stage = LLMStage(slow_classify, workers=1, queue_size=5, deadline_seconds=5)
+    with patch.object(handlers, 'llm_stage', stage), \
+         patch.object(handlers.get_gigachat_client().verdict_cache, 'get', return_value=None), \
+         patch('src.handlers.scheduler'):
+        started = time.monotonic()
+        handle_text_message(mock_bot, message)
+        assert time.monotonic() - started < 0.5
+        assert not mock_bot.reply_to.called
+        
+        # После ответа GigaChat розыгрыш запускается в дорожке чата, а не в потоке GigaChat
+        started_in = []
+        real_start_raffles = handlers.start_raffles
+        with patch.object(handlers, 'start_raffles', side_effect=lambda *args: (
+                started_in.append(threading.current_thread().name), real_start_raffles(*args))):
+            release.set()
+            assert answered.wait(2)
+        deadline = time.time() + 2
+        while "-100_10_12" not in raffle_store and time.time() < deadline:
+            time.sleep(0.01)
+    
+    assert raffle_store.get("-100_10_12").place_number == 12
+    assert started_in == [f"dispatch-{handlers.dispatcher.lane(-100)}"]
+
+
+def test_gigachat_not_loaded_on_import():
+    """Тест, что пакет gigachat не загружается при импорте обработчиков"""
+    import subprocess
+    import sys
+    
+    result = subprocess.run(
+        [sys.executable, "-c", "import sys, src.handlers; print('gigachat' in sys.modules)"],
+        capture_output=True, text=True,
+    )
+    assert result.stdout.strip() == "False"
+
+
+def test_set_gigachat_client():
+    """Тест подмены клиента GigaChat через аксессор"""
+    from src.handlers import get_gigachat_client, set_gigachat_client
+    
+    fake_client = Mock()
+    set_gigachat_client(fake_client)
+    try:
+        assert get_gigachat_client() is fake_client
+    finally:
+        set_gigachat_client(None)
+    assert get_gigachat_client() is not fake_client
+
+
+def test_handle_text_message_starts_raffle_per_place():
+    """Тест: объявление о нескольких местах запускает розыгрыш на каждое место из списка чата"""
+    from src import handlers
+    
+    mock_bot = Mock()
+    mock_bot.reply_to.return_value.message_id = 300
+    message = MagicMock()
+    message.text = "Свободное место 12 и 47, еще 300 до 18:00"
+    message.chat.id = -200
+    message.message_id = 20
+    
+    with patch.object(handlers, 'PARKING_PLACES_BY_CHAT', {-200: frozenset(range(1, 101))}), \
+         patch('src.handlers.scheduler'):
+        handle_text_message(mock_bot, message)
+    
+    assert {raffle.raffle_id for raffle in raffle_store.all()} == {"-200_20_12", "-200_20_47"}
+    assert mock_bot.reply_to.call_count == 2
+
+
+def test_handle_text_message_without_inventory_starts_one_raffle():
+    """Тест: без списка мест этаж и телефон в объявлении не запускают лишних розыгрышей"""
+    from src import handlers
+    
+    mock_bot = Mock()
+    mock_bot.reply_to.return_value.message_id = 310
+    message = MagicMock()
+    message.text = "Место 5 свободно, я на 3 этаже, звоните 89161234567"
+    message.chat.id = -210
+    message.message_id = 21
+    
+    with patch.object(handlers, 'PARKING_PLACES', None), \
+         patch.object(handlers, 'PARKING_PLACES_BY_CHAT', {}), \
+         patch('src.handlers.scheduler'):
+        handle_text_message(mock_bot, message)
+    
+    assert [raffle.raffle_id for raffle in raffle_store.all()] == ["-210_21_5"]
+    assert mock_bot.reply_to.call_count == 1
+
+
+def test_click_storm_edits_are_coalesced():
+    """Тест: 30 нажатий подряд дают несколько правок сообщения вместо 30"""
+    from src import handlers
+    from src.handlers import handle_callback
+    from src.scheduler import Scheduler
+    
+    mock_bot = Mock()
+    mock_bot.reply_to.return_value.message_id = 400
+    message = MagicMock()
+    message.chat.id = -300
+    message.message_id = 30
+    
+    with patch.object(handlers, 'scheduler', Scheduler()), \
+         patch.object(handlers, 'BUTTON_EDIT_INTERVAL_SECONDS', 0.1), \
+         patch.dict(handlers.edit_stats, {'requested': 0, 'sent': 0, 'skipped_unchanged': 0}):
+        handlers.start_raffle(mock_bot, message, 8)
+        raffle_id = "-300_30_8"
+        
+        for user_id in range(1, 31):
+            call = Mock()
+            call.data = f"want_{raffle_id}"
+            call.from_user.id = user_id
+            handle_callback(mock_bot, call)
+            time.sleep(0.01)
+        
+        # Последняя отложенная правка показывает итоговое количество участников
+        deadline = time.time() + 2
+        raffle = raffle_store.get(raffle_id)
+        while raffle.edit_call is not None and time.time() < deadline:
+            time.sleep(0.01)
+        stats = dict(handlers.edit_stats)
+    assert fast_outbound.wait_idle()
+    
+    edits = mock_bot.edit_message_text.call_count
+    assert mock_bot.edit_message_reply_markup.call_count == 0
+    assert stats['requested'] == 30
+    assert edits == stats['sent'] <= 6
+    assert "Участников: 30" in mock_bot.edit_message_text.call_args[0][0]
+    raffle.update_timer.cancel()
+    raffle.timer.cancel()
+
+
+def test_callback_is_answered_without_waiting_for_edits():
+    """Тест: подтверждение нажатия приходит до медленной правки кнопки (задержки запросов как в сети)"""
+    from src.handlers import handle_callback
+    from src.scheduler import Scheduler
+    
+    clicked = {}
+    latencies = []
+    
+    class SlowBot:
+        """Подмена TeleBot: правка сообщения занимает 500 мс, остальные запросы — 20 мс"""
+        
+        def reply_to(self, message, text, reply_markup=None):
+            time.sleep(0.02)
+            return Mock(message_id=message.message_id + 1)
+        
+        def answer_callback_query(self, callback_id, text, show_alert=False):
+            time.sleep(0.02)
+            latencies.append(time.perf_counter() - clicked[callback_id])
+        
+        def edit_message_text(self, *args, **kwargs):
+            time.sleep(0.5)
+    
+    bot = SlowBot()
+    outbound = OutboundQueue(2, 1000, 10000, 10000, 10000, 10000)
+    scheduler = Scheduler()
+    with patch.object(handlers, 'outbound', outbound), \
+         patch.object(handlers, 'scheduler', scheduler), \
+         patch.object(handlers, 'BUTTON_EDIT_INTERVAL_SECONDS', 0):
+        for chat in range(4):
+            message = MagicMock()
+            message.chat.id = -500 - chat
+            message.message_id = 50
+            handlers.start_raffle(bot, message, chat + 1)
+        
+        # Наплыв нажатий в четырех чатах: каждая волна запускает правки во всех
+        for user_id in range(1, 4):
+            for chat in range(4):
+                call = Mock()
+                call.id = f"{chat}_{user_id}"
+                call.data = f"want_{-500 - chat}_50_{chat + 1}"
+                call.from_user.id = user_id * 10 + chat
+                clicked[call.id] = time.perf_counter()
+                handle_callback(bot, call)
+            time.sleep(0.05)
+        # Правки еще выполняются, ждем только подтверждения
+        deadline = time.time() + 2
+        while len(latencies) < 12 and time.time() < deadline:
+            time.sleep(0.01)
+        for raffle in raffle_store.all():
+            raffle.timer.cancel()
+            raffle.update_timer.cancel()
+    
+    assert len(latencies) == 12
+    # Правка занимает 500 мс; подтверждение ее не ждет
+    assert max(latencies) < 0.25
+
+
+def test_click_on_raffle_removed_after_join():
+    """Тест: розыгрыш удален сразу после записи участника — нажатие подтверждено, ошибки нет"""
+    from src.handlers import handle_callback
+    mock_bot = Mock()
+    add_raffle("evicted", 9)
+    call = Mock()
+    call.data = "want_evicted"
+    call.from_user.id = 321
+    real_join = raffle_store.join
 
+    def join_then_evict(raffle_id, user_id):
+        result = real_join(raffle_id, user_id)
+        raffle_store.remove(raffle_id)
+        return result
+
+    with patch.object(raffle_store, 'join', side_effect=join_then_evict):
+        handle_callback(mock_bot, call)
+    assert fast_outbound.wait_idle()
+
+    mock_bot.answer_callback_query.assert_called_once()
+    assert not mock_bot.edit_message_text.called
+
+
+def test_unchanged_raffle_message_is_not_edited():
+    """Тест: правка без изменений текста и кнопки не отправляется"""
+    from src import handlers
+    
+    mock_bot = Mock()
+    raffle = add_raffle("r9", 9, [1], message_id=500, chat_id=-400)
+    
+    with patch.dict(handlers.edit_stats, {'requested': 0, 'sent': 0, 'skipped_unchanged': 0}), \
+         patch('src.handlers.time.time', return_value=raffle.start_time):
+        handlers.edit_raffle_message(mock_bot, raffle)
+        handlers.edit_raffle_message(mock_bot, raffle)
+        stats = dict(handlers.edit_stats)
+    assert fast_outbound.wait_idle()
+    
+    assert mock_bot.edit_message_text.call_count == 1
+    assert stats['skipped_unchanged'] == 1
+
+
+def test_seconds_until_midnight_in_bot_timezone():
+    """Тест: смена дня планируется на полночь в часовом поясе бота, а не сервера"""
+    from datetime import datetime
+    from zoneinfo import ZoneInfo
+    from src import handlers
+    
+    timezone = ZoneInfo("Asia/Vladivostok")
+    with patch.object(handlers, 'local_timezone', timezone):
+        seconds = handlers.seconds_until_midnight()
+        midnight = datetime.fromtimestamp(time.time() + seconds, timezone)
+    
+    assert 0 < seconds <= 24 * 3600
+    assert (midnight.hour, midnight.minute) == (0, 0)
+
+
+def test_day_rollover_drops_yesterday_and_reschedules():
+    """Тест смены дня: вчерашние розыгрыши удаляются, следующая смена планируется на полночь"""
+    from datetime import date, timedelta
+    from src import handlers
+    
+    mock_bot = Mock()
+    yesterday_raffle = Raffle("yesterday", 1, -100, 1, raffle_date=date.today() - timedelta(days=1))
+    yesterday_raffle.timer = Mock()
+    raffle_store.add(yesterday_raffle)
+    add_raffle("today", 2)
+    
+    with patch('src.handlers.scheduler') as scheduler:
+        handlers.day_rollover(mock_bot)
+    
+    assert "yesterday" not in raffle_store and "today" in raffle_store
+    assert yesterday_raffle.timer.cancel.called
+    delay, func, bot = scheduler.schedule.call_args[0]
+    assert func is handlers.day_rollover and bot is mock_bot
+    assert abs(delay - handlers.seconds_until_midnight() - 1) < 1
+
+
+def test_limit_and_timer_are_per_chat():
+    """Тест: лимит одного чата не вытесняет розыгрыши другого, таймер переопределяется для чата"""
+    from src import handlers
+    
+    mock_bot = Mock()
+    mock_bot.reply_to.return_value.message_id = 600
+    add_raffle("other_chat", 1, chat_id=-2)
+    
+    def announce(chat_id, message_id, place_number):
+        message = MagicMock()
+        message.chat.id = chat_id
+        message.message_id = message_id
+        handlers.start_raffle(mock_bot, message, place_number)
+    
+    with patch.object(handlers, 'MAX_ACTIVE_RAFFLES_BY_CHAT', {-1: 2}), \
+         patch.object(handlers, 'RAFFLE_TIMER_SECONDS_BY_CHAT', {-1: 30}), \
+         patch('src.handlers.scheduler') as scheduler:
+        for message_id in range(3):
+            announce(-1, message_id, 5)
+    
+    assert raffle_store.count(-1) == 2
+    assert "-1_0_5" not in raffle_store
+    assert "other_chat" in raffle_store
+    assert scheduler.schedule.call_args_list[0][0][0] == 30
+    assert "Осталось: 30с" in mock_bot.reply_to.call_args[0][1]
+
+
+def test_benchmark_scenario_api_calls():
+    """Тест: сценарий бенчмарка обработчиков — один ответ на нажатие, итоги без get_chat_member"""
+    from benchmarks.bench_handlers import run_scenario
+    
+    result = run_scenario(chats=3, announcements=2, clicks=4)
+    
+    calls = result['api_calls']
+    assert calls['reply_to'] == calls['send_message'] == calls['delete_message'] == 6
+    assert calls['answer_callback_query'] == 24
+    assert 'get_chat_member' not in calls
+    assert result['handlers']['handle_callback']['count'] == 24
+    assert len(raffle_store) == 0
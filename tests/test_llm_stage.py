@@ -0,0 +1,212 @@
+"""Тесты для очереди запросов к GigaChat"""
+import threading
+import time
+from src.llm_stage import LLMStage, RULE_ONLY_VERDICT
+
+
+def collect_results():
+    """Создает обработчик результата, сохраняющий вердикты в список"""
+    results = []
+    done = threading.Event()
+    
+    def on_result(is_parking, place_number):
+        results.append((is_parking, place_number))
+        done.set()
+    
+    return results, done, on_result
+
+
+def test_submit_returns_llm_verdict():
+    """Тест получения ответа GigaChat через очередь"""
+    stage = LLMStage(lambda text, place: (True, place), workers=1, queue_size=5, deadline_seconds=5)
+    results, done, on_result = collect_results()
+    
+    assert stage.submit("отдам место 12", 12, on_result) is True
+    assert done.wait(2)
+    assert results == [(True, 12)]
+    assert stage.stats['completed'] == 1
+
+
+def test_deadline_gives_rule_only_verdict():
+    """Тест вердикта по правилам к сроку, пока запрос к GigaChat еще идет"""
+    release = threading.Event()
+    
+    def slow_classify(text, place):
+        release.wait(2)
+        return True, place
+    
+    stage = LLMStage(slow_classify, workers=1, queue_size=5, deadline_seconds=0.1)
+    results, done, on_result = collect_results()
+    
+    started = time.monotonic()
+    stage.submit("отдам место 12", 12, on_result)
+    assert done.wait(2)
+    elapsed = time.monotonic() - started
+    release.set()
+    assert results == [RULE_ONLY_VERDICT]
+    assert 0.1 <= elapsed < 0.2
+    assert stage.stats['timed_out'] == 1
+
+
+def test_slow_calls_do_not_exceed_workers():
+    """Тест: после срока запрос к GigaChat продолжается, но одновременных запросов не больше workers"""
+    release = threading.Event()
+    lock = threading.Lock()
+    active = []
+    peak = []
+    
+    def slow_classify(text, place):
+        with lock:
+            active.append(1)
+            peak.append(len(active))
+        release.wait(2)
+        with lock:
+            active.pop()
+        return True, place
+    
+    stage = LLMStage(slow_classify, workers=1, queue_size=5, deadline_seconds=0.05)
+    verdicts = []
+    for place in range(3):
+        stage.submit(f"отдам место {place}", place, lambda *result: verdicts.append(result))
+    deadline = time.time() + 2
+    while len(verdicts) < 3 and time.time() < deadline:
+        time.sleep(0.01)
+    release.set()
+    
+    assert verdicts == [RULE_ONLY_VERDICT] * 3
+    assert max(peak) == 1
+
+
+def test_expired_requests_do_not_pile_up_behind_slow_call():
+    """Тест: пока пул занят медленным запросом, новые запросы получают вердикт к сроку и не идут в GigaChat"""
+    release = threading.Event()
+    calls = []
+    
+    def slow_classify(text, place):
+        calls.append(place)
+        release.wait(2)
+        return True, place
+    
+    stage = LLMStage(slow_classify, workers=1, queue_size=5, deadline_seconds=0.05)
+    verdicts = []
+    for place in range(3):
+        stage.submit(f"отдам место {place}", place, lambda *result: verdicts.append(result))
+        time.sleep(0.1)
+        assert len(verdicts) == place + 1
+    release.set()
+    time.sleep(0.1)
+    
+    assert verdicts == [RULE_ONLY_VERDICT] * 3
+    assert calls == [0]
+    assert stage.stats['timed_out'] == 3
+    
+    stage.submit("отдам место 7", 7, lambda *result: verdicts.append(result))
+    deadline = time.time() + 2
+    while len(verdicts) < 4 and time.time() < deadline:
+        time.sleep(0.01)
+    assert calls == [0, 7]
+
+
+def test_error_gives_rule_only_verdict():
+    """Тест вердикта по правилам при ошибке классификации"""
+    def failing_classify(text, place):
+        raise RuntimeError("API Error")
+    
+    stage = LLMStage(failing_classify, workers=1, queue_size=5, deadline_seconds=5)
+    results, done, on_result = collect_results()
+    
+    stage.submit("отдам место 12", 12, on_result)
+    assert done.wait(2)
+    assert results == [RULE_ONLY_VERDICT]
+    assert stage.stats['errors'] == 1
+
+
+def test_overload_sheds_low_priority():
+    """Тест вытеснения менее важных запросов при переполнении очереди"""
+    release = threading.Event()
+    started = threading.Event()
+    
+    def blocked_classify(text, place):
+        started.set()
+        release.wait(2)
+        return True, place
+    
+    stage = LLMStage(blocked_classify, workers=1, queue_size=1, deadline_seconds=5)
+    verdicts = {}
+    
+    def remember(name):
+        return lambda is_parking, place: verdicts.__setitem__(name, is_parking)
+    
+    # Первый запрос занимает единственный рабочий поток
+    stage.submit("первое 1", 1, remember('busy'), priority=1)
+    assert started.wait(2)
+    
+    # Очередь из одного места: низкоприоритетный запрос вытесняется важным
+    assert stage.submit("второе 2", 2, remember('low'), priority=0) is True
+    assert stage.submit("третье 3", 3, remember('high'), priority=1) is True
+    assert verdicts['low'] is False
+    # Новый низкоприоритетный запрос не вытесняет важный и сразу отбрасывается
+    assert stage.submit("четвертое 4", 4, remember('late'), priority=0) is False
+    assert verdicts['late'] is False
+    assert stage.stats['shed'] == 2
+    
+    release.set()
+    deadline = time.time() + 2
+    while 'high' not in verdicts and time.time() < deadline:
+        time.sleep(0.01)
+    assert verdicts['high'] is True
+    # Потоков не больше, чем задано
+    assert len(stage._threads) == 1
+
+
+def test_batch_mode_groups_messages():
+    """Тест пакетной проверки сообщений, пришедших почти одновременно"""
+    batches = []
+    
+    def classify_batch(items):
+        batches.append(items)
+        return [(True, place) for _, place in items]
+    
+    def classify(text, place):
+        raise AssertionError("в пакетном режиме одиночный запрос не нужен")
+    
+    stage = LLMStage(classify, workers=1, queue_size=10, deadline_seconds=5,
+                     classify_batch=classify_batch, batch_size=3, batch_window_seconds=1)
+    results = []
+    done = threading.Event()
+    
+    def on_result(is_parking, place_number):
+        results.append(place_number)
+        if len(results) == 3:
+            done.set()
+    
+    for place in (1, 2, 3):
+        stage.submit(f"отдам место {place}", place, on_result)
+    
+    assert done.wait(2)
+    assert sorted(results) == [1, 2, 3]
+    assert len(batches) == 1
+    assert stage.stats['batches'] == 1
+
+
+def test_batch_error_is_counted():
+    """Тест: ошибка пакетного запроса учитывается для каждого сообщения пакета"""
+    def classify_batch(items):
+        raise ConnectionError("timeout")
+    
+    stage = LLMStage(lambda text, place: (True, place), workers=1, queue_size=10, deadline_seconds=5,
+                     classify_batch=classify_batch, batch_size=2, batch_window_seconds=1)
+    results = []
+    done = threading.Event()
+    
+    def on_result(is_parking, place_number):
+        results.append((is_parking, place_number))
+        if len(results) == 2:
+            done.set()
+    
+    stage.submit("отдам место 1", 1, on_result)
+    stage.submit("отдам место 2", 2, on_result)
+    
+    assert done.wait(2)
+    assert results == [RULE_ONLY_VERDICT] * 2
+    assert stage.stats['errors'] == 2
@@ -0,0 +1,56 @@
+"""Тесты для локальной модели распознавания"""
+from unittest.mock import patch
+from src.local_classifier import (
+    extract_ngrams,
+    train_model,
+    predict_parking_probability,
+    save_model,
+    load_model,
+)
+
+TRAINING_SAMPLES = [
+    ("Отдам место 12 до вечера", True),
+    ("место 7 сегодня не нужно", True),
+    ("Кому нужно место 30 на сегодня", True),
+    ("Уехал, место 4 можно занимать", True),
+    ("Сегодня 15 градусов", False),
+    ("Завтра отключат воду с 10 до 14", False),
+    ("Машина с номером 777 мешает проезду", False),
+    ("Доставка на 9 этаж приехала", False),
+]
+
+
+def test_extract_ngrams_masks_digits():
+    """Тест нормализации текста перед разбиением на n-граммы"""
+    assert extract_ngrams("Место 12") == extract_ngrams("место 47")
+
+
+def test_predict_parking_probability():
+    """Тест распознавания сообщений обученной моделью"""
+    model = train_model(TRAINING_SAMPLES)
+    assert predict_parking_probability(model, "Отдам место 25 до вечера") > 0.9
+    assert predict_parking_probability(model, "Завтра отключат свет с 9 до 12") < 0.1
+
+
+def test_save_and_load_model(tmp_path):
+    """Тест сохранения и загрузки модели"""
+    model = train_model(TRAINING_SAMPLES)
+    path = tmp_path / "model.json"
+    save_model(model, path)
+    
+    loaded = load_model(path)
+    text = "Кому нужно место 8"
+    assert predict_parking_probability(loaded, text) == predict_parking_probability(model, text)
+
+
+def test_local_model_avoids_gigachat():
+    """Тест ответа локальной модели без запроса к GigaChat"""
+    from src.gigachat_client import GigaChatClient
+    
+    client = GigaChatClient()
+    client.local_model = train_model(TRAINING_SAMPLES)
+    
+    with patch.object(client.client, 'chat') as mock_chat:
+        assert client.check_parking_message("Отдам место 25 до вечера") == (True, 25)
+        assert client.check_parking_message("Завтра отключат свет с 9 до 12") == (False, None)
+        assert not mock_chat.called
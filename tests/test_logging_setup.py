@@ -0,0 +1,92 @@
+"""Тесты для неблокирующего логирования"""
+import io
+import json
+import logging
+import queue
+import sys
+import time
+from src.logging_setup import (
+    parse_sampling,
+    setup_logging,
+    SamplingFilter,
+    JsonFormatter,
+    DroppingQueueHandler,
+)
+
+
+def make_record(name="test", level=logging.INFO, msg="Сообщение %s", args=(1,)):
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+
+def test_parse_sampling():
+    """Тест разбора настройки прореживания"""
+    assert parse_sampling("") == {}
+    assert parse_sampling("src.handlers.messages=10, other=0") == {"src.handlers.messages": 10, "other": 1}
+
+
+def test_sampling_filter_keeps_every_nth():
+    """Тест: из частых записей проходит каждая N-я, предупреждения — всегда"""
+    sampling_filter = SamplingFilter({"busy": 5})
+
+    passed = sum(sampling_filter.filter(make_record("busy")) for _ in range(100))
+    assert passed == 20
+    assert all(sampling_filter.filter(make_record("busy", logging.WARNING)) for _ in range(3))
+    assert all(sampling_filter.filter(make_record("quiet")) for _ in range(3))
+
+
+def test_json_formatter():
+    """Тест структурированного вывода"""
+    entry = json.loads(JsonFormatter().format(make_record("src.handlers", msg="Место №%s", args=(12,))))
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "src.handlers"
+    assert entry["message"] == "Место №12"
+
+
+def test_queue_handler_captures_message_and_does_not_block():
+    """Тест: сообщение и исключение фиксируются в момент записи, при переполнении запись отбрасывается"""
+    handler = DroppingQueueHandler(queue.Queue(2))
+    participants = {'count': 1}
+    handler.handle(make_record(msg="Участников: %(count)s", args=(participants,)))
+    participants['count'] = 2
+    try:
+        raise ValueError("ошибка")
+    except ValueError:
+        record = make_record(level=logging.ERROR)
+        record.exc_info = sys.exc_info()
+        handler.handle(record)
+    handler.handle(make_record())
+
+    first, second = handler.queue.get_nowait(), handler.queue.get_nowait()
+    assert first.getMessage() == "Участников: 1"
+    assert first.args is None
+    assert second.exc_info is None and "ValueError: ошибка" in second.exc_text
+    assert "ValueError: ошибка" in json.loads(JsonFormatter().format(second))["exception"]
+    assert handler.dropped == 1
+
+
+def test_setup_logging_writes_in_background():
+    """Тест: медленный вывод не задерживает логирование в обработчике"""
+    class SlowStream(io.StringIO):
+        def write(self, text):
+            time.sleep(0.05)
+            return super().write(text)
+
+    root = logging.getLogger()
+    old_handlers, old_level = root.handlers[:], root.level
+    stream = SlowStream()
+    listener = setup_logging("INFO", json_format=True, sampling={"busy": 2}, stream=stream)
+    try:
+        started = time.monotonic()
+        for i in range(10):
+            logging.getLogger("busy").info("Сообщение %s", i)
+        assert time.monotonic() - started < 0.05
+    finally:
+        listener.stop()
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        for handler in old_handlers:
+            root.addHandler(handler)
+        root.setLevel(old_level)
+
+    messages = [json.loads(line)["message"] for line in stream.getvalue().splitlines()]
+    assert messages == ["Сообщение 0", "Сообщение 2", "Сообщение 4", "Сообщение 6", "Сообщение 8"]
@@ -0,0 +1,126 @@
+"""Тесты для метрик бота"""
+import time
+import urllib.request
+from unittest.mock import MagicMock, patch
+from src import metrics
+from src.gigachat_client import GigaChatClient
+from src.metrics import Registry, MetricsServer, CLASSIFIER_DECISIONS, GIGACHAT_SECONDS
+from src.outbound import OutboundQueue
+
+
+class TooManyRequests(Exception):
+    """Как telebot.apihelper.ApiTelegramException для ответа 429"""
+
+    def __init__(self):
+        super().__init__("Too Many Requests")
+        self.error_code = 429
+        self.result_json = {'parameters': {'retry_after': 0.01}}
+
+
+def test_text_exposition_format():
+    """Тест вывода счетчика, гистограммы и значения из функции в формате Prometheus"""
+    registry = Registry()
+    updates = registry.counter("updates_total", "Обновления", ("type",))
+    latency = registry.histogram("request_seconds", "Время запроса", (0.1, 1), ("method",))
+    started = registry.counter("started_total", "Без меток")
+    registry.gauge("queue", "Очередь", lambda: {'a': 2}, "lane")
+
+    updates.inc("message")
+    updates.inc("message")
+    updates.inc('say "hi"\n')
+    for value in (0.05, 0.1, 0.5, 3):
+        latency.observe(value, "send_message")
+
+    text = registry.render()
+    assert "# TYPE parking_bot_updates_total counter" in text
+    assert 'parking_bot_updates_total{type="message"} 2' in text
+    assert 'parking_bot_updates_total{type="say \\"hi\\"\\n"} 1' in text
+    assert "parking_bot_started_total 0" in text
+    assert 'parking_bot_request_seconds_bucket{method="send_message",le="0.1"} 2' in text
+    assert 'parking_bot_request_seconds_bucket{method="send_message",le="1"} 3' in text
+    assert 'parking_bot_request_seconds_bucket{method="send_message",le="+Inf"} 4' in text
+    assert 'parking_bot_request_seconds_count{method="send_message"} 4' in text
+    assert 'parking_bot_queue{lane="a"} 2' in text
+
+
+def test_telegram_requests_are_measured_per_method():
+    """Тест: очередь запросов к Telegram учитывает время, ошибки и ответы 429 по методу"""
+    queue = OutboundQueue(1, 100, 1000, 1000, 1000, 1000)
+    attempts = []
+
+    def send_message():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise TooManyRequests()
+
+    def delete_message():
+        raise ValueError("message to delete not found")
+
+    before = {
+        'seconds': metrics.TELEGRAM_SECONDS.count("send_message"),
+        'limited': metrics.TELEGRAM_RATE_LIMITED.value("send_message"),
+        'errors': metrics.TELEGRAM_ERRORS.value("delete_message"),
+    }
+    queue.submit(None, 0, send_message)
+    queue.submit(None, 0, delete_message)
+    assert queue.wait_idle()
+
+    assert metrics.TELEGRAM_SECONDS.count("send_message") - before['seconds'] == 2
+    assert metrics.TELEGRAM_RATE_LIMITED.value("send_message") - before['limited'] == 1
+    assert metrics.TELEGRAM_ERRORS.value("delete_message") - before['errors'] == 1
+    assert metrics.TELEGRAM_ERRORS.value("send_message") == 0
+
+
+def test_classifier_decisions_by_tier():
+    """Тест: решения правил и ответы GigaChat учитываются по уровню и вердикту"""
+    client = GigaChatClient()
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = "да"
+    before = {key: CLASSIFIER_DECISIONS.value(*key) for key in
+              [("rules", "parking"), ("rules", "not_parking"), ("llm", "yes"), ("llm", "error")]}
+    requests_before = GIGACHAT_SECONDS.count()
+
+    client.check_without_llm("Место 5 свободно")
+    client.check_without_llm("Привет, как дела?")
+    with patch.object(client.client, 'chat', return_value=response):
+        client.ask_llm("Освободилось парковочное место номер 12", 12)
+    with patch.object(client.client, 'chat', side_effect=ConnectionError("timeout")):
+        client.ask_llm("Освободилось парковочное место номер 14", 14)
+
+    for key, value in before.items():
+        assert CLASSIFIER_DECISIONS.value(*key) - value == 1, key
+    assert GIGACHAT_SECONDS.count() - requests_before == 2
+
+
+def test_counter_is_cheap_enough_for_every_message():
+    """Тест: счетчик и гистограмма стоят единицы микросекунд"""
+    registry = Registry()
+    counter = registry.counter("updates_total", "Обновления", ("type",))
+    histogram = registry.histogram("request_seconds", "Время запроса", metrics.REQUEST_BUCKETS, ("method",))
+
+    started = time.perf_counter()
+    for _ in range(100000):
+        counter.inc("message")
+        histogram.observe(0.2, "send_message")
+    per_call = (time.perf_counter() - started) / 200000
+
+    assert counter.value("message") == 100000
+    assert per_call < 20e-6
+
+
+def test_exporter_serves_metrics():
+    """Тест: экспортер отдает метрики на локальном порту"""
+    registry = Registry()
+    registry.counter("updates_total", "Обновления", ("type",)).inc("message")
+    server = MetricsServer("127.0.0.1", 0, registry)
+    server.start()
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_port}/metrics", timeout=5) as response:
+            body = response.read().decode("utf-8")
+            content_type = response.headers["Content-Type"]
+    finally:
+        server.stop()
+
+    assert content_type.startswith("text/plain; version=0.0.4")
+    assert 'parking_bot_updates_total{type="message"} 1' in body
@@ -0,0 +1,202 @@
+"""Тесты для очереди исходящих запросов к Telegram"""
+import threading
+import time
+from src.outbound import (
+    OutboundQueue,
+    TokenBucket,
+    PRIORITY_WINNER,
+    PRIORITY_POST,
+    PRIORITY_CALLBACK,
+    PRIORITY_EDIT,
+    PRIORITY_DELETE,
+)
+
+
+class TooManyRequests(Exception):
+    """Как telebot.apihelper.ApiTelegramException для ответа 429"""
+
+    def __init__(self, retry_after):
+        super().__init__("Too Many Requests")
+        self.error_code = 429
+        self.result_json = {'parameters': {'retry_after': retry_after}}
+
+
+def make_queue(**kwargs):
+    options = dict(workers=1, queue_size=100, global_rate=1000, global_burst=1000, chat_rate=1000, chat_burst=1000)
+    options.update(kwargs)
+    return OutboundQueue(**options)
+
+
+def block_worker(queue: OutboundQueue) -> threading.Event:
+    """Занимает единственный рабочий поток, пока не будет установлено событие"""
+    release = threading.Event()
+    started = threading.Event()
+
+    def blocker():
+        started.set()
+        release.wait(2)
+
+    queue.submit(None, PRIORITY_WINNER, blocker)
+    assert started.wait(1)
+    return release
+
+
+def test_token_bucket():
+    """Тест ведра токенов: запросы подряд до capacity, затем ожидание"""
+    bucket = TokenBucket(rate=10, capacity=2)
+    now = bucket.updated
+    for _ in range(2):
+        assert bucket.wait_time(now) == 0
+        bucket.take()
+    assert abs(bucket.wait_time(now) - 0.1) < 1e-6
+    assert bucket.wait_time(now + 0.11) == 0
+
+
+def test_important_requests_go_first():
+    """Тест: итоги розыгрыша не ждут за правками и удалениями"""
+    queue = make_queue()
+    order = []
+    release = block_worker(queue)
+
+    for priority, name in [(PRIORITY_DELETE, "удаление"), (PRIORITY_EDIT, "правка"),
+                           (PRIORITY_CALLBACK, "ответ на нажатие"), (PRIORITY_POST, "розыгрыш"),
+                           (PRIORITY_WINNER, "победитель")]:
+        queue.submit(-1, priority, order.append, name)
+    release.set()
+
+    assert queue.wait_idle()
+    assert order == ["победитель", "розыгрыш", "ответ на нажатие", "правка", "удаление"]
+
+
+def test_chat_limit_does_not_block_other_chats():
+    """Тест: исчерпанный лимит одного чата не задерживает запросы в другие чаты"""
+    queue = make_queue(chat_rate=1, chat_burst=1)
+    sent = []
+
+    queue.submit(-1, PRIORITY_POST, sent.append, "чат 1, первый")
+    queue.submit(-1, PRIORITY_POST, sent.append, "чат 1, второй")
+    queue.submit(-2, PRIORITY_EDIT, sent.append, "чат 2")
+    time.sleep(0.2)
+
+    assert sent == ["чат 1, первый", "чат 2"]
+    assert queue.wait_idle(2)
+    assert sent[-1] == "чат 1, второй"
+
+
+def test_retry_after_429():
+    """Тест: на ответ 429 отправка в чат приостанавливается, запрос повторяется"""
+    queue = make_queue()
+    attempts = []
+
+    def send():
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            raise TooManyRequests(0.1)
+        return "ok"
+
+    assert queue.call(-1, PRIORITY_WINNER, send) == "ok"
+    assert len(attempts) == 2
+    assert attempts[1] - attempts[0] >= 0.09
+    assert queue.stats['retried'] == 1
+
+
+def test_droppable_requests_are_shed_when_full():
+    """Тест: при переполнении отбрасываются необязательные запросы, важные принимаются"""
+    queue = make_queue(queue_size=2)
+    done = []
+    release = block_worker(queue)
+
+    delete = queue.submit(-1, PRIORITY_DELETE, done.append, "удаление", droppable=True)
+    edit = queue.submit(-1, PRIORITY_EDIT, done.append, "правка", droppable=True)
+    winner = queue.submit(-1, PRIORITY_WINNER, done.append, "победитель")
+    release.set()
+
+    assert queue.wait_idle()
+    assert delete.result() is None
+    assert done == ["победитель", "правка"]
+    assert winner.done() and edit.done()
+    assert queue.stats['dropped'] == 1
+
+
+def test_newer_edit_replaces_pending_one():
+    """Тест: новая правка того же сообщения заменяет ожидающую"""
+    queue = make_queue()
+    edits = []
+    release = block_worker(queue)
+
+    first = queue.submit(-1, PRIORITY_EDIT, edits.append, "осталось 20с", droppable=True, replace_key=(-1, 5))
+    queue.submit(-1, PRIORITY_EDIT, edits.append, "осталось 10с", droppable=True, replace_key=(-1, 5))
+    release.set()
+
+    assert queue.wait_idle()
+    assert first.result() is None
+    assert edits == ["осталось 10с"]
+    assert queue.stats['replaced'] == 1
+
+
+def test_replaced_edits_do_not_fill_the_queue():
+    """Тест: замененные правки не занимают место в очереди, и новые запросы не отбрасываются"""
+    queue = make_queue(queue_size=2)
+    edits = []
+    release = block_worker(queue)
+
+    for seconds in range(30, 0, -1):
+        queue.submit(-1, PRIORITY_EDIT, edits.append, f"осталось {seconds}с", droppable=True, replace_key=(-1, 5))
+    other = queue.submit(-2, PRIORITY_EDIT, edits.append, "участников: 3", droppable=True, replace_key=(-2, 6))
+    assert queue.pending() == 2
+    release.set()
+
+    assert queue.wait_idle()
+    assert other.done()
+    assert edits == ["осталось 1с", "участников: 3"]
+    assert queue.stats['dropped'] == 0
+    assert queue.pending() == 0
+
+
+def test_call_raises_request_error():
+    """Тест: ошибка запроса пробрасывается вызывающему"""
+    queue = make_queue()
+
+    def fail():
+        raise ValueError("сообщение не найдено")
+
+    try:
+        queue.call(-1, PRIORITY_POST, fail)
+        assert False, "ожидалось исключение"
+    except ValueError:
+        pass
+    assert queue.stats['errors'] == 1
+
+
+def test_one_worker_stays_free_for_important_requests():
+    """Тест: медленные правки не занимают все потоки — ответ на нажатие не ждет их"""
+    queue = make_queue(workers=2)
+    release = threading.Event()
+    editing = []
+    answered = threading.Event()
+
+    def slow_edit():
+        editing.append(1)
+        release.wait(2)
+
+    for i in range(3):
+        queue.submit(-100 - i, PRIORITY_EDIT, slow_edit, droppable=True)
+    queue.submit(None, PRIORITY_CALLBACK, answered.set)
+
+    assert answered.wait(1)
+    assert len(editing) == 1
+    release.set()
+    assert queue.wait_idle()
+    assert len(editing) == 3
+
+
+def test_idle_workers_do_not_spin():
+    """Тест: после опустошения очереди рабочие потоки спят, а не будят друг друга"""
+    queue = make_queue(workers=4)
+    for i in range(8):
+        queue.submit(-100 - i, PRIORITY_POST, lambda: None)
+    assert queue.wait_idle()
+
+    started = time.process_time()
+    time.sleep(0.3)
+    assert time.process_time() - started < 0.1
@@ -0,0 +1,109 @@
+"""Тесты для профилирования по команде владельца"""
+import threading
+import tracemalloc
+import pytest
+from src.profiling import Profiler, parse_window, thread_group
+
+
+def busy_classifier_work(stop: threading.Event, kept: list):
+    """Нагрузка для профилировщика: считает и выделяет память, пока не остановят"""
+    while not stop.is_set():
+        sum(i * i for i in range(1000))
+        kept.append(bytearray(1024))
+
+
+def run_window(profiler: Profiler, seconds: float):
+    """Запускает окно и ждет результатов: (сводка, путь к отчету)"""
+    done = threading.Event()
+    result = []
+
+    def on_done(summary, path):
+        result.extend([summary, path])
+        done.set()
+
+    assert profiler.start(seconds, on_done)
+    assert done.wait(10)
+    return result
+
+
+def test_parse_window():
+    """Тест длительности окна из аргумента команды"""
+    assert parse_window(None, 30, 300) == 30
+    assert parse_window("60", 30, 300) == 60
+    assert parse_window("10000", 30, 300) == 300
+    with pytest.raises(ValueError):
+        parse_window("0", 30, 300)
+    with pytest.raises(ValueError):
+        parse_window("abc", 30, 300)
+
+
+def test_thread_group():
+    """Тест: потоки одного пула сводятся в одну группу"""
+    assert thread_group("outbound-3") == "outbound"
+    assert thread_group("dispatch-0") == "dispatch"
+    assert thread_group("ThreadPoolExecutor-0_1") == "ThreadPoolExecutor"
+    assert thread_group("Thread-5 (serve_forever)") == "Thread"
+    assert thread_group("scheduler") == "scheduler"
+
+
+def test_profiler_does_nothing_until_started(tmp_path):
+    """Тест: созданный профилировщик не запускает потоков и трассировки памяти"""
+    threads = threading.active_count()
+    profiler = Profiler(str(tmp_path / "profiles"))
+
+    assert not profiler.running
+    assert not profiler.stop()
+    assert threading.active_count() == threads
+    assert not tracemalloc.is_tracing()
+    assert not (tmp_path / "profiles").exists()
+
+
+def test_profile_window_reports_functions_threads_and_memory(tmp_path):
+    """Тест: сводка называет занятый поток, его функцию и место выделения памяти; отчет сохранен"""
+    profiler = Profiler(str(tmp_path), interval=0.005)
+    stop = threading.Event()
+    kept = []
+    worker = threading.Thread(target=busy_classifier_work, args=(stop, kept), name="classifier-0", daemon=True)
+    worker.start()
+    try:
+        summary, path = run_window(profiler, 0.5)
+    finally:
+        stop.set()
+        worker.join()
+
+    assert "classifier:" in summary
+    assert "busy_classifier_work" in summary
+    assert "test_profiling.py" in summary.split("Прирост памяти")[1]
+    assert len(summary) <= 4000
+    assert not profiler.running
+    assert not tracemalloc.is_tracing()
+
+    report = path.read_text(encoding="utf-8")
+    assert "# Свернутые стеки" in report
+    assert any(line.startswith("classifier;") and "busy_classifier_work" in line for line in report.splitlines())
+    snapshot = tracemalloc.Snapshot.load(str(path.with_suffix(".tracemalloc")))
+    assert snapshot.traces
+
+
+def test_only_one_window_and_early_stop(tmp_path):
+    """Тест: второе окно не запускается, пока идет первое; stop() завершает окно досрочно"""
+    profiler = Profiler(str(tmp_path))
+    done = threading.Event()
+
+    assert profiler.start(60, lambda summary, path: done.set())
+    assert not profiler.start(60, lambda summary, path: None)
+    assert profiler.stop()
+    assert done.wait(10)
+    assert not profiler.running
+
+
+def test_unwritable_directory_still_sends_summary(tmp_path):
+    """Тест: если отчет не удалось сохранить, сводка все равно отправляется"""
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    profiler = Profiler(str(blocker / "profiles"))
+
+    summary, path = run_window(profiler, 0.05)
+
+    assert path is None
+    assert "Полный отчет не сохранен" in summary
@@ -0,0 +1,90 @@
+"""Тесты для сохранения розыгрышей в SQLite"""
+import time
+from datetime import date, timedelta
+from unittest.mock import Mock, patch
+from src import handlers
+from src.config import RAFFLE_TIMER_SECONDS
+from src.outbound import OutboundQueue
+from src.raffle_db import RaffleDB
+from src.raffle_store import Raffle, RaffleStore, JOIN_OK, JOIN_WINNER
+from src.scheduler import Scheduler
+
+
+def test_state_survives_reopen(tmp_path):
+    """Тест: розыгрыши, участники в порядке нажатий и победители читаются после перезапуска"""
+    path = str(tmp_path / "raffles.db")
+    db = RaffleDB(path, flush_interval=0.01)
+    store = RaffleStore(db)
+    store.add(Raffle("r1", 5, -100, 10))
+    store.add(Raffle("r2", 6, -100, 11))
+    store.add(Raffle("old", 7, -100, 12, raffle_date=date.today() - timedelta(days=1)))
+    for user_id in (3, 1, 2):
+        store.join("r1", user_id)
+    store.finish("r1")
+    store.join("r2", 4)
+    store.remove("r2")
+    db.close()
+
+    db = RaffleDB(path)
+    raffle, = db.load(date.today())
+    assert raffle.raffle_id == "r1" and raffle.place_number == 5 and raffle.message_id == 10
+    assert list(raffle.participants) == [3, 1, 2]
+    assert raffle.finished and raffle.winner_id in (1, 2, 3)
+    assert db.stats['errors'] == 0
+    db.close()
+
+
+def test_restore_raffles(tmp_path):
+    """Тест восстановления: идущий розыгрыш продолжается, истекший завершается, победитель помнится"""
+    db = RaffleDB(str(tmp_path / "raffles.db"), flush_interval=0.01)
+    now = time.time()
+    running = Raffle("running", 1, -100, 10, start_time=now - 10)
+    expired = Raffle("expired", 2, -100, 11, start_time=now - RAFFLE_TIMER_SECONDS - 5)
+    won = Raffle("won", 3, -100, 12, start_time=now - RAFFLE_TIMER_SECONDS - 50)
+    writer = RaffleStore(db)
+    for raffle in (won, expired, running):
+        writer.add(raffle)
+    writer.join("won", 7)
+    writer.finish("won")
+    writer.join("expired", 8)
+    assert db.flush()
+
+    mock_bot = Mock()
+    scheduler = Scheduler()
+    with patch.object(handlers, 'raffle_store', RaffleStore()), \
+         patch.object(handlers, 'scheduler', scheduler), \
+         patch.object(handlers, 'outbound', OutboundQueue(1, 100, 1e6, 1e6, 1e6, 1e6)) as outbound:
+        handlers.restore_raffles(mock_bot, db)
+        store = handlers.raffle_store
+        assert outbound.wait_idle()
+
+        assert store.get("expired").finished and store.get("expired").winner_id == 8
+        assert not store.get("running").finished
+        assert store.get("running").timer.when - time.monotonic() > RAFFLE_TIMER_SECONDS - 15
+        assert store.join("running", 7) == JOIN_WINNER
+        assert store.join("running", 9) == JOIN_OK
+        store.get("running").timer.cancel()
+        store.get("running").update_timer.cancel()
+
+    # Изменения после восстановления тоже сохраняются
+    assert db.flush()
+    assert list(next(r for r in db.load(date.today()) if r.raffle_id == "running").participants) == [9]
+    db.close()
+
+
+def test_join_latency_with_db(tmp_path):
+    """Тест: сохранение в базу добавляет к нажатию меньше миллисекунды"""
+    def join_seconds(store):
+        store.add(Raffle("r1", 1, -100, 10))
+        started = time.perf_counter()
+        for user_id in range(5000):
+            store.join("r1", user_id)
+        return (time.perf_counter() - started) / 5000
+
+    db = RaffleDB(str(tmp_path / "raffles.db"))
+    in_memory = join_seconds(RaffleStore())
+    with_db = join_seconds(RaffleStore(db))
+    assert db.flush()
+    db.close()
+
+    assert with_db - in_memory < 0.001
@@ -0,0 +1,140 @@
+"""Тесты для хранилища активных розыгрышей"""
+import threading
+import time
+from datetime import date, timedelta
+from src.raffle_store import (
+    Raffle,
+    RaffleStore,
+    JOIN_OK,
+    JOIN_NOT_FOUND,
+    JOIN_FINISHED,
+    JOIN_ALREADY,
+    JOIN_WINNER,
+)
+
+
+def make_store(*raffles):
+    store = RaffleStore()
+    for raffle in raffles:
+        store.add(raffle)
+    return store
+
+
+def test_join_keeps_order_and_rejects_duplicates():
+    """Тест: участники хранятся в порядке нажатий, повторное нажатие отклоняется"""
+    store = make_store(Raffle("r1", 1, -100, 10))
+
+    assert store.join("r1", 3) == JOIN_OK
+    assert store.join("r1", 1) == JOIN_OK
+    assert store.join("r1", 3) == JOIN_ALREADY
+    assert store.join("нет", 1) == JOIN_NOT_FOUND
+    assert list(store.get("r1").participants) == [3, 1]
+
+
+def test_finish_once_and_block_winner():
+    """Тест: розыгрыш завершается один раз, победитель не может участвовать в других"""
+    store = make_store(Raffle("r1", 1, -100, 10), Raffle("r2", 2, -100, 11))
+    store.join("r1", 7)
+
+    raffle = store.finish("r1")
+    assert raffle.winner_id == 7 and raffle.finished
+    assert store.finish("r1") is None
+    assert store.join("r1", 8) == JOIN_FINISHED
+    assert store.join("r2", 7) == JOIN_WINNER
+
+    # Удаленный розыгрыш освобождает победителя
+    store.remove("r1")
+    assert store.join("r2", 7) == JOIN_OK
+
+
+def test_remove_oldest_and_not_from_today():
+    """Тест удаления самого старого (по порядку создания) и вчерашних розыгрышей"""
+    yesterday = date.today() - timedelta(days=1)
+    store = make_store(
+        Raffle("yesterday_1", 1, -100, 1, raffle_date=yesterday),
+        Raffle("old", 2, -100, 2),
+        Raffle("yesterday_2", 3, -100, 3, raffle_date=yesterday),
+        Raffle("new", 4, -100, 4),
+    )
+
+    assert store.remove_oldest(-100).raffle_id == "yesterday_1"
+    assert store.remove_oldest(-100).raffle_id == "old"
+    assert [raffle.raffle_id for raffle in store.remove_not_from(date.today())] == ["yesterday_2"]
+    assert store.remove_not_from(date.today()) == []
+    assert len(store) == 1 and "new" in store
+    assert list(store._by_date) == [date.today()]
+
+
+def test_snapshot():
+    """Тест снимка состояния для /status"""
+    store = make_store(Raffle("r1", 5, -100, 10))
+    store.join("r1", 1)
+    store.join("r1", 2)
+
+    snapshot, = store.snapshot()
+    assert snapshot.place_number == 5
+    assert snapshot.participants_count == 2
+    assert snapshot.winner_id is None and not snapshot.finished
+
+
+def test_concurrent_joins_and_finishes():
+    """Стресс-тест: одновременные нажатия и завершения — ни одно нажатие не теряется, никто не выигрывает дважды"""
+    raffles_count = 20
+    users_count = 50
+    store = make_store(*(Raffle(f"r{i}", i, -100, i) for i in range(raffles_count)))
+    start = threading.Barrier(users_count + raffles_count)
+    accepted = {f"r{i}": [] for i in range(raffles_count)}
+    finished = []
+
+    def user(user_id):
+        start.wait()
+        for i in range(raffles_count):
+            if store.join(f"r{i}", user_id) == JOIN_OK:
+                accepted[f"r{i}"].append(user_id)
+
+    def finisher(raffle_id):
+        start.wait()
+        # Участников больше, чем розыгрышей, — среди них всегда есть еще не выигравший
+        raffle = store.get(raffle_id)
+        while len(raffle.participants) < raffles_count:
+            time.sleep(0)
+        # Повторное завершение игнорируется
+        for _ in range(2):
+            raffle = store.finish(raffle_id)
+            if raffle is not None:
+                finished.append(raffle)
+
+    threads = [threading.Thread(target=user, args=(user_id,)) for user_id in range(users_count)]
+    threads += [threading.Thread(target=finisher, args=(f"r{i}",)) for i in range(raffles_count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Каждый розыгрыш завершен ровно один раз
+    assert sorted(raffle.raffle_id for raffle in finished) == sorted(accepted)
+    for raffle in finished:
+        # Принятые нажатия не потеряны, лишних нет
+        assert sorted(raffle.participants) == sorted(accepted[raffle.raffle_id])
+        if raffle.participants:
+            assert raffle.winner_id in raffle.participants
+    # Никто не выиграл дважды
+    winners = [raffle.winner_id for raffle in finished if raffle.winner_id is not None]
+    assert len(winners) == len(set(winners))
+
+
+def test_chats_are_independent():
+    """Тест: победа и вытеснение в одном чате не затрагивают другой чат"""
+    store = make_store(Raffle("a1", 1, -1, 10), Raffle("b1", 1, -2, 10), Raffle("a2", 2, -1, 11))
+    store.join("a1", 7)
+    store.finish("a1")
+
+    assert store.join("a2", 7) == JOIN_WINNER
+    assert store.join("b1", 7) == JOIN_OK
+    assert store.is_winner(-1, 7) and not store.is_winner(-2, 7)
+    assert store.count(-1) == 2 and store.count(-2) == 1
+
+    assert store.remove_oldest(-1).raffle_id == "a1"
+    assert store.remove_oldest(-2).raffle_id == "b1"
+    assert store.remove_oldest(-2) is None
+    assert store.count(-2) == 0 and len(store) == 1
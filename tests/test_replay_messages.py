@@ -0,0 +1,42 @@
+"""Тесты для прогона истории чата через классификатор"""
+import json
+from scripts.replay_messages import read_messages, replay, FakeGigaChat, percentile
+from src.gigachat_client import GigaChatClient, TIER_RULES, TIER_CACHE, TIER_LLM
+
+
+def test_read_telegram_export(tmp_path):
+    """Тест чтения экспорта Telegram с разметкой и служебными сообщениями"""
+    export = {
+        "name": "Парковка",
+        "messages": [
+            {"id": 1, "type": "message", "text": "Место 5 свободно"},
+            {"id": 2, "type": "message", "text": [{"type": "bold", "text": "Отдам"}, " место 12"]},
+            {"id": 3, "type": "service", "action": "pin_message", "text": ""},
+            {"id": 4, "type": "message", "text": "/status"},
+        ],
+    }
+    path = tmp_path / "result.json"
+    path.write_text(json.dumps(export, ensure_ascii=False), encoding='utf-8')
+    
+    assert list(read_messages(str(path))) == ["Место 5 свободно", "Отдам место 12"]
+
+
+def test_replay_reports_tiers():
+    """Тест прогона с заглушкой GigaChat и учетом уровней классификатора"""
+    client = GigaChatClient()
+    client._client = FakeGigaChat("да")
+    
+    verdicts, latencies, _ = replay(client, ["Место 5 свободно", "Отдам место 12", "Отдам место 14"])
+    
+    assert [v['tier'] for v in verdicts] == [TIER_RULES, TIER_LLM, TIER_CACHE]
+    assert [v['place_number'] for v in verdicts] == [5, 12, 14]
+    assert client._client.calls == 1
+    assert len(latencies[TIER_LLM]) == 1
+
+
+def test_percentile():
+    """Тест перцентилей по методу ближайшего ранга"""
+    values = list(range(1, 101))
+    assert percentile(values, 0.50) == 50
+    assert percentile(values, 0.99) == 99
+    assert percentile([7], 0.95) == 7
@@ -0,0 +1,146 @@
+"""Тесты для планировщика отложенных вызовов"""
+import logging
+import threading
+import time
+import tracemalloc
+from datetime import date, timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+from src.outbound import OutboundQueue
+from src.scheduler import Scheduler
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+
+def test_calls_run_in_time_order():
+    """Тест: вызовы выполняются по времени срабатывания, а не по порядку постановки"""
+    scheduler = Scheduler()
+    calls = []
+    scheduler.schedule(0.06, calls.append, "третий")
+    scheduler.schedule(0.02, calls.append, "первый")
+    scheduler.schedule(0.04, calls.append, "второй")
+
+    assert wait_for(lambda: len(calls) == 3)
+    assert calls == ["первый", "второй", "третий"]
+
+
+def test_cancel_and_reschedule():
+    """Тест отмены и переноса вызова"""
+    scheduler = Scheduler()
+    calls = []
+    cancelled = scheduler.schedule(0.02, calls.append, "отменен")
+    moved = scheduler.schedule(0.5, calls.append, "перенесен")
+
+    assert cancelled.cancel() is True
+    assert cancelled.cancel() is False
+    assert scheduler.reschedule(moved, 0.02) is True
+    assert scheduler.reschedule(cancelled, 0.02) is False
+
+    assert wait_for(lambda: calls == ["перенесен"])
+    time.sleep(0.05)
+    assert calls == ["перенесен"]
+    assert scheduler.pending() == 0
+
+
+def test_call_can_reschedule_itself():
+    """Тест: вызов повторяет себя через reschedule (как обновление обратного отсчета)"""
+    scheduler = Scheduler()
+    ticks = []
+
+    def tick():
+        ticks.append(1)
+        if len(ticks) < 3:
+            scheduler.reschedule(handle, 0.01)
+
+    handle = scheduler.schedule(0.01, tick)
+    assert wait_for(lambda: len(ticks) == 3)
+    time.sleep(0.05)
+    assert len(ticks) == 3
+
+
+def test_error_in_call_does_not_stop_scheduler():
+    """Тест: исключение в вызове логируется, следующие вызовы выполняются"""
+    scheduler = Scheduler()
+    calls = []
+    scheduler.schedule(0.01, lambda: 1 / 0)
+    scheduler.schedule(0.02, calls.append, "после ошибки")
+
+    assert wait_for(lambda: calls == ["после ошибки"])
+    assert scheduler.stats['errors'] == 1
+
+
+def test_cancelled_calls_are_compacted():
+    """Тест: отмененные записи не копятся в куче"""
+    scheduler = Scheduler()
+    handles = [scheduler.schedule(60, print) for _ in range(1000)]
+    for handle in handles[:990]:
+        handle.cancel()
+
+    assert scheduler.pending() == 10
+    assert len(scheduler._heap) < 100
+
+
+class FakeBot:
+    """Минимальная подмена TeleBot без записи истории вызовов"""
+
+    def reply_to(self, message, text, reply_markup=None):
+        return SimpleNamespace(message_id=message.message_id + 1)
+
+
+def test_thousands_of_raffles_use_one_thread():
+    """Стресс-тест: тысячи розыгрышей в сотне чатов — один поток и память не растет от волны к волне"""
+    from src import handlers
+
+    scheduler = Scheduler("stress-scheduler")
+    # Очередь запросов к Telegram без ограничений частоты; ее поток запускается заранее
+    outbound = OutboundQueue(1, 100, 1e6, 1e6, 1e6, 1e6)
+    outbound.call(None, 0, len, "")
+    bot = FakeBot()
+    raffles_count = 2000
+    threads_before = threading.active_count()
+    tomorrow = date.today() + timedelta(days=1)
+
+    def wave(first_message_id):
+        """Запускает raffles_count розыгрышей и удаляет их при смене дня; возвращает память на пике"""
+        for i in range(raffles_count):
+            message = SimpleNamespace(chat=SimpleNamespace(id=-1000 - i % 100), message_id=first_message_id + i, text="")
+            handlers.start_raffle(bot, message, i % 120 + 1)
+        peak = tracemalloc.get_traced_memory()[0]
+
+        assert len(handlers.raffle_store) == raffles_count
+        assert scheduler.pending() == raffles_count * 2
+        assert threading.active_count() <= threads_before + 1
+
+        # Наступил следующий день
+        with patch.object(handlers, 'today', return_value=tomorrow):
+            handlers.cleanup_old_raffles(bot)
+        assert len(handlers.raffle_store) == 0
+        assert scheduler.pending() == 0
+        return peak
+
+    # Записи логов, сохраненные pytest, исказили бы замер памяти
+    logging.disable(logging.CRITICAL)
+    tracemalloc.start()
+    try:
+        with patch.object(handlers, 'scheduler', scheduler), \
+             patch.object(handlers, 'outbound', outbound), \
+             patch.object(handlers, 'MAX_ACTIVE_RAFFLES', raffles_count + 1):
+            handlers.raffle_store.clear()
+            baseline = tracemalloc.get_traced_memory()[0]
+            first_peak = wave(0)
+            after_first = tracemalloc.get_traced_memory()[0]
+            wave(raffles_count)
+            after_second = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+        logging.disable(logging.NOTSET)
+
+    # Отмененные таймеры не копятся: после второй волны памяти занято не больше, чем после первой
+    assert len(scheduler._heap) < 100
+    assert after_second - after_first < (first_peak - baseline) / 20
+    assert threading.active_count() <= threads_before + 1
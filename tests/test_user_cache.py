@@ -0,0 +1,37 @@
+"""Тесты для кэша имен пользователей"""
+from types import SimpleNamespace
+from src.user_cache import UserCache
+
+
+def make_user(user_id, username=None, first_name="Сосед"):
+    return SimpleNamespace(id=user_id, username=username, first_name=first_name)
+
+
+def test_remember_prefers_username_and_updates_name():
+    """Тест: username важнее имени, новое обновление от пользователя меняет запись"""
+    cache = UserCache(max_size=10)
+    cache.remember(make_user(1, first_name="Иван"))
+    assert cache.get(1) == "Иван"
+
+    cache.remember(make_user(1, username="ivan"))
+    assert cache.get(1) == "ivan"
+    assert cache.get(2) is None
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_lru_eviction_and_disabled_cache():
+    """Тест вытеснения самого давно использованного пользователя и выключенного кэша"""
+    cache = UserCache(max_size=2)
+    cache.remember(make_user(1, "first"))
+    cache.remember(make_user(2, "second"))
+    # Обращаемся к первому, чтобы вытеснился второй
+    assert cache.get(1) == "first"
+    cache.remember(make_user(3, "third"))
+
+    assert len(cache) == 2
+    assert cache.get(2) is None
+
+    disabled = UserCache(max_size=0)
+    disabled.remember(make_user(1, "first"))
+    disabled.remember(None)
+    assert len(disabled) == 0
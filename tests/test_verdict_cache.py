@@ -0,0 +1,56 @@
+"""Тесты для кэша вердиктов GigaChat"""
+from unittest.mock import patch
+from src.verdict_cache import VerdictCache, normalize_message
+
+
+def test_normalize_message_masks_digits():
+    """Тест маскирования номеров мест в ключе кэша"""
+    assert normalize_message("Место 12  сегодня НЕ нужно") == normalize_message("место 14 сегодня не нужно")
+    assert normalize_message("место 12") != normalize_message("место 12 до вечера")
+
+
+def test_cache_hit_and_miss_counters():
+    """Тест счетчиков попаданий и промахов"""
+    cache = VerdictCache(max_size=10, ttl_seconds=60)
+    
+    assert cache.get("место 12 сегодня не нужно") is None
+    cache.put("место 12 сегодня не нужно", True)
+    assert cache.get("место 14 сегодня не нужно") is True
+    
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+
+def test_cache_lru_eviction():
+    """Тест вытеснения самой давно использованной записи"""
+    cache = VerdictCache(max_size=2, ttl_seconds=60)
+    cache.put("первое", True)
+    cache.put("второе", False)
+    
+    # Обращаемся к первой записи, чтобы вытеснилась вторая
+    assert cache.get("первое") is True
+    cache.put("третье", True)
+    
+    assert len(cache) == 2
+    assert cache.get("второе") is None
+    assert cache.get("первое") is True
+    assert cache.get("третье") is True
+
+
+def test_cache_ttl_expiry():
+    """Тест истечения времени жизни записи"""
+    cache = VerdictCache(max_size=10, ttl_seconds=60)
+    with patch('src.verdict_cache.time.monotonic', return_value=1000.0):
+        cache.put("место 5 отдаю", True)
+    with patch('src.verdict_cache.time.monotonic', return_value=1059.0):
+        assert cache.get("место 5 отдаю") is True
+    with patch('src.verdict_cache.time.monotonic', return_value=1061.0):
+        assert cache.get("место 5 отдаю") is None
+    assert len(cache) == 0
+
+
+def test_cache_disabled():
+    """Тест выключенного кэша (размер 0)"""
+    cache = VerdictCache(max_size=0, ttl_seconds=60)
+    cache.put("место 5 отдаю", True)
+    assert cache.get("место 5 отдаю") is None
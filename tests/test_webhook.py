@@ -0,0 +1,110 @@
+"""Тесты для приема обновлений через webhook"""
+import json
+import threading
+import urllib.error
+import urllib.request
+import telebot
+from src.webhook import WebhookServer, SECRET_HEADER
+
+SECRET = "test-secret"
+
+# Записанные обновления Telegram (сокращены до полей, которые разбирает telebot)
+MESSAGE_UPDATE = {
+    "update_id": 1001,
+    "message": {
+        "message_id": 10,
+        "date": 1700000000,
+        "from": {"id": 42, "is_bot": False, "first_name": "Иван", "username": "ivan"},
+        "chat": {"id": -100123, "type": "supergroup", "title": "Дом 5"},
+        "text": "Свободно место 12 до вечера",
+    },
+}
+CALLBACK_UPDATE = {
+    "update_id": 1002,
+    "callback_query": {
+        "id": "cb-1",
+        "chat_instance": "ci-1",
+        "from": {"id": 43, "is_bot": False, "first_name": "Петр"},
+        "data": "want_-100123_10_12",
+        "message": {
+            "message_id": 11,
+            "date": 1700000001,
+            "chat": {"id": -100123, "type": "supergroup", "title": "Дом 5"},
+            "text": "🎰 Розыгрыш места №12",
+        },
+    },
+}
+
+
+def make_server(bot, **kwargs):
+    server = WebhookServer(bot, "127.0.0.1", 0, "/webhook", SECRET, **kwargs)
+    server.start()
+    return server
+
+
+def post(server, update, secret=SECRET, path="/webhook"):
+    """Отправляет обновление как Telegram; возвращает HTTP-код"""
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{server.server_port}{path}",
+        data=json.dumps(update).encode(),
+        headers={"Content-Type": "application/json", SECRET_HEADER: secret},
+        method="POST",
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def test_updates_reach_bot_handlers():
+    """Тест: сообщение и нажатие кнопки доходят до обработчиков telebot"""
+    bot = telebot.TeleBot("123456:test", threaded=False)
+    received = []
+    bot.message_handler(func=lambda message: True)(lambda message: received.append(("message", message.text)))
+    bot.callback_query_handler(func=lambda call: True)(lambda call: received.append(("callback", call.data)))
+    server = make_server(bot)
+    try:
+        assert post(server, MESSAGE_UPDATE) == 200
+        assert post(server, CALLBACK_UPDATE) == 200
+        assert server.wait_idle()
+    finally:
+        server.stop()
+
+    assert sorted(received) == [("callback", "want_-100123_10_12"), ("message", "Свободно место 12 до вечера")]
+    assert server.stats['processed'] == 2
+
+
+def test_wrong_secret_and_path_are_rejected():
+    """Тест: запрос без секретного токена или на другой путь не обрабатывается"""
+    bot = telebot.TeleBot("123456:test", threaded=False)
+    server = make_server(bot)
+    try:
+        assert post(server, MESSAGE_UPDATE, secret="wrong") == 403
+        assert post(server, MESSAGE_UPDATE, path="/other") == 404
+    finally:
+        server.stop()
+
+    assert server.stats['rejected'] == 1
+    assert server.stats['received'] == 0
+
+
+def test_acknowledges_before_handlers_finish():
+    """Тест: Telegram получает ответ сразу, а при переполнении очереди — 503"""
+    started = threading.Event()
+    release = threading.Event()
+    bot = telebot.TeleBot("123456:test", threaded=False)
+    bot.message_handler(func=lambda message: True)(lambda message: started.set() or release.wait(5))
+    server = make_server(bot, queue_size=1)
+    try:
+        # Первое обновление занимает рабочий поток, второе ждет в очереди, третье не помещается
+        statuses = [post(server, dict(MESSAGE_UPDATE, update_id=1))]
+        assert started.wait(2)
+        statuses += [post(server, dict(MESSAGE_UPDATE, update_id=i)) for i in (2, 3)]
+        release.set()
+        assert server.wait_idle()
+    finally:
+        server.stop()
+
+    assert statuses == [200, 200, 503]
+    assert server.stats['processed'] == 2